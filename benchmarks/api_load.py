@@ -0,0 +1,525 @@
+"""
+Load benchmark of every route of the contacts API.
+
+Seeds the database of the application (`SQLALCHEMY_DATABASE_URL`, whose tables are dropped and recreated, so point it at a scratch database and pass `--recreate`) with `--users` confirmed users owning `--contacts` contacts each, in the shapes of `tests/data_set_for_tests.py`. Then drives every route of `src/routes/` with a fixed number of requests at a fixed concurrency through an in-process ASGI client, and writes the throughput, the p50/p95/p99 latency, the errors and the peak memory of every route to a JSON file. The whole application runs as in production, with its own sessions and middlewares; only the rate limiter is disabled and avatars are stored locally.
+
+Routes hashing a password with bcrypt are driven with `--slow-requests` requests only. The user cache requires the Redis server of the settings (`REDIS_HOST`, `REDIS_PORT`).
+
+Compare two runs with `python -m benchmarks.compare`.
+
+Usage:
+    SQLALCHEMY_DATABASE_URL=sqlite:///bench.db python -m benchmarks.api_load --recreate [--users 50] [--contacts 200] [--requests 1000] [--slow-requests 20] [--concurrency 16] [--output benchmarks/results/api_load.json]
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import httpx
+from fastapi_limiter.depends import RateLimiter
+from sqlalchemy import insert, select
+
+from main import app
+from src.database.models import Base, Contact, User
+from src.services.auth import auth_service
+from src.services.resources import resources
+from src.services.storage import LocalStorage
+
+PASSWORD = "Password1!"
+NEW_PASSWORD = "Password2!"
+AVATAR = b"\x89PNG\r\n\x1a\n" + bytes(4096)
+RESULTS_FOLDER = Path(__file__).parent / "results"
+
+
+@dataclass
+class Context:
+    """
+    The seeded data the requests are built from.
+
+    Attributes:
+        emails (list[str]): The emails of the confirmed users.
+        pending_emails (list[str]): The emails of the unconfirmed users.
+        access_tokens (list[str]): An access token of every confirmed user.
+        refresh_tokens (list[str]): The current refresh token of every confirmed user.
+        contact_ids (list[list[int]]): The ids of the seeded contacts of every confirmed user.
+        created_ids (list[list[int]]): The ids of the contacts created by the benchmark, per user.
+    """
+
+    emails: list[str]
+    pending_emails: list[str]
+    access_tokens: list[str] = field(default_factory=list)
+    refresh_tokens: list[str] = field(default_factory=list)
+    contact_ids: list[list[int]] = field(default_factory=list)
+    created_ids: list[list[int]] = field(default_factory=list)
+
+
+@dataclass
+class Scenario:
+    """
+    One benchmarked route.
+
+    Attributes:
+        name (str): The name of the scenario in the results, the method and the route template with an optional variant.
+        call (Callable): Sends the i-th request of the scenario.
+        expected (int): The expected status code.
+        slow (bool): Whether the route hashes a password, it is then driven with fewer requests.
+    """
+
+    name: str
+    call: Callable[[httpx.AsyncClient, Context, int], Awaitable[httpx.Response]]
+    expected: int = 200
+    slow: bool = False
+
+
+def contact_json(i: int) -> dict:
+    """
+    Builds the body of a created or updated contact, unique per `i`.
+
+    Args:
+        i (int): The number of the contact.
+
+    Returns:
+        dict: The `ContactIn` body.
+    """
+    return {
+        "first_name": f"firstname_new_{i}",
+        "last_name": f"lastname_new_{i}",
+        "email": f"contact_new_{i}@example.com",
+        "phone": f"+48 5{i:08d}",
+        "birth_date": date(1990, 1 + i % 12, 1 + i % 28).isoformat(),
+        "additional_info": {"company": f"company_{i % 10}"},
+    }
+
+
+def seed(engine, users: int, contacts: int, pending: int) -> Context:
+    """
+    Recreates the tables and inserts the users and contacts.
+
+    Args:
+        engine (Engine): The database to seed.
+        users (int): The number of confirmed users.
+        contacts (int): The number of contacts of every confirmed user.
+        pending (int): The number of unconfirmed users.
+
+    Returns:
+        Context: The seeded data.
+    """
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    # one bcrypt hash for every user, hashing thousands of passwords would dominate seeding
+    password, salt = auth_service.get_password_hash(PASSWORD)
+    context = Context(
+        emails=[f"user_{u}@example.com" for u in range(users)],
+        pending_emails=[f"pending_{u}@example.com" for u in range(pending)],
+    )
+    context.refresh_tokens = [
+        asyncio.run(auth_service.create_refresh_token(data={"sub": email}))
+        for email in context.emails
+    ]
+    rows = [
+        {
+            "username": email.split("@")[0],
+            "email": email,
+            "password": password,
+            "salt": salt,
+            "created_at": datetime.now(),
+            "confirmed": confirmed,
+            "refresh_token": refresh_token,
+            "avatar": "avatar_url",
+        }
+        for emails, confirmed, refresh_tokens in (
+            (context.emails, True, context.refresh_tokens),
+            (context.pending_emails, False, [None] * pending),
+        )
+        for email, refresh_token in zip(emails, refresh_tokens)
+    ]
+    with engine.begin() as connection:
+        connection.execute(insert(User), rows)
+        user_ids = dict(connection.execute(select(User.email, User.id)).all())
+        for u, email in enumerate(context.emails):
+            connection.execute(
+                insert(Contact),
+                [
+                    {
+                        "first_name": f"firstname_{i}",
+                        "last_name": f"lastname_{i}",
+                        "email": f"contact_{i}@example.com",
+                        "phone": f"+48 6{i:08d}",
+                        "birth_date": date(1990, 1 + i % 12, 1 + i % 28),
+                        "additional_info": {"company": f"company_{i % 10}"},
+                        "user_id": user_ids[email],
+                    }
+                    for i in range(contacts)
+                ],
+            )
+        contact_ids = connection.execute(
+            select(Contact.user_id, Contact.id).order_by(Contact.id)
+        ).all()
+    ids_by_user = {user_id: [] for user_id in user_ids.values()}
+    for user_id, contact_id in contact_ids:
+        ids_by_user[user_id].append(contact_id)
+    context.contact_ids = [ids_by_user[user_ids[email]] for email in context.emails]
+    context.created_ids = [[] for _ in context.emails]
+    context.access_tokens = [
+        asyncio.run(auth_service.create_access_token(data={"sub": email}))
+        for email in context.emails
+    ]
+    return context
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def scenarios(users: int, dialect: str) -> list[Scenario]:
+    """
+    Builds the scenarios of every route, in an order where every scenario finds the data it needs (e.g. contacts are created before they are updated and deleted).
+
+    Args:
+        users (int): The number of confirmed users, requests are spread over them round-robin.
+        dialect (str): The database dialect, the additional info filter needs PostgreSQL.
+
+    Returns:
+        list[Scenario]: The scenarios.
+    """
+
+    def user(i: int) -> int:
+        return i % users
+
+    async def signup(client, context, i):
+        return await client.post(
+            "/api/auth/signup",
+            json={
+                "username": f"signup_{i}",
+                "email": f"signup_{i}@example.com",
+                "password": PASSWORD,
+            },
+        )
+
+    async def login(client, context, i):
+        response = await client.post(
+            "/api/auth/login",
+            data={"username": context.emails[user(i)], "password": PASSWORD},
+        )
+        if response.status_code == 200:
+            # the login replaces the stored refresh token of the user
+            context.refresh_tokens[user(i)] = response.json()["refresh_token"]
+        return response
+
+    async def refresh_token(client, context, i):
+        response = await client.get(
+            "/api/auth/refresh_token",
+            headers=bearer(context.refresh_tokens[user(i)]),
+        )
+        if response.status_code == 200:
+            context.refresh_tokens[user(i)] = response.json()["refresh_token"]
+        return response
+
+    async def request_email(client, context, i):
+        return await client.post(
+            "/api/auth/request_email", json={"email": context.pending_emails[i]}
+        )
+
+    async def confirmed_email(client, context, i):
+        token, _ = auth_service.create_email_token({"sub": context.pending_emails[i]})
+        return await client.get(f"/api/auth/confirmed_email/{token}")
+
+    async def password_reset(client, context, i):
+        return await client.post(
+            "/api/auth/password-reset", json={"email": context.emails[user(i)]}
+        )
+
+    async def password_reset_token(client, context, i):
+        token, _ = auth_service.create_email_token({"sub": context.emails[user(i)]})
+        return await client.post(
+            f"/api/auth/password-reset/{token}",
+            params={"new_password": NEW_PASSWORD},
+        )
+
+    async def me(client, context, i):
+        return await client.get(
+            "/api/users/me/", headers=bearer(context.access_tokens[user(i)])
+        )
+
+    async def avatar(client, context, i):
+        return await client.patch(
+            "/api/users/me/avatar",
+            headers=bearer(context.access_tokens[user(i)]),
+            files={"file": ("avatar.png", AVATAR, "image/png")},
+        )
+
+    def list_contacts(params: dict):
+        async def call(client, context, i):
+            return await client.get(
+                "/api/contacts/",
+                params=params,
+                headers=bearer(context.access_tokens[user(i)]),
+            )
+
+        return call
+
+    async def read_contact(client, context, i):
+        ids = context.contact_ids[user(i)]
+        return await client.get(
+            f"/api/contacts/{ids[i // users % len(ids)]}",
+            headers=bearer(context.access_tokens[user(i)]),
+        )
+
+    async def create_contact(client, context, i):
+        response = await client.post(
+            "/api/contacts/",
+            json=contact_json(i),
+            headers=bearer(context.access_tokens[user(i)]),
+        )
+        if response.status_code == 201:
+            context.created_ids[user(i)].append(response.json()["id"])
+        return response
+
+    async def update_contact(client, context, i):
+        ids = context.created_ids[user(i)]
+        return await client.put(
+            f"/api/contacts/{ids[i // users % len(ids)]}",
+            # numbers above the created ones, unique for every update
+            json=contact_json(10_000_000 + i),
+            headers=bearer(context.access_tokens[user(i)]),
+        )
+
+    async def delete_contact(client, context, i):
+        return await client.delete(
+            f"/api/contacts/{context.created_ids[user(i)].pop()}",
+            headers=bearer(context.access_tokens[user(i)]),
+        )
+
+    async def metrics(client, context, i):
+        return await client.get("/metrics")
+
+    info_scenarios = (
+        [
+            Scenario(
+                "GET /api/contacts/ info", list_contacts({"info.company": "company_3"})
+            )
+        ]
+        if dialect == "postgresql"
+        else []
+    )
+    return [
+        Scenario("POST /api/auth/signup", signup, 201, slow=True),
+        Scenario("POST /api/auth/login", login, slow=True),
+        Scenario("GET /api/auth/refresh_token", refresh_token),
+        Scenario("POST /api/auth/request_email", request_email),
+        Scenario("GET /api/auth/confirmed_email/{token}", confirmed_email),
+        Scenario("POST /api/auth/password-reset", password_reset),
+        Scenario(
+            "POST /api/auth/password-reset/{token}", password_reset_token, slow=True
+        ),
+        Scenario("GET /api/users/me/", me),
+        Scenario("PATCH /api/users/me/avatar", avatar),
+        Scenario("GET /api/contacts/", list_contacts({})),
+        Scenario(
+            "GET /api/contacts/ search_name",
+            list_contacts({"search_name": "lastname_1"}),
+        ),
+        Scenario(
+            "GET /api/contacts/ upcoming_birthdays",
+            list_contacts({"upcoming_birthdays": "true"}),
+        ),
+        *info_scenarios,
+        Scenario("GET /api/contacts/{contact_id}", read_contact),
+        Scenario("POST /api/contacts/", create_contact, 201),
+        Scenario("PUT /api/contacts/{contact_id}", update_contact),
+        Scenario("DELETE /api/contacts/{contact_id}", delete_contact),
+        Scenario("GET /metrics", metrics),
+    ]
+
+
+def percentile(latencies: list[float], p: int) -> float:
+    """
+    Returns the p-th percentile of sorted latencies, in milliseconds.
+    """
+    return latencies[min(len(latencies) - 1, len(latencies) * p // 100)] * 1000
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    context: Context,
+    scenario: Scenario,
+    requests: int,
+    concurrency: int,
+) -> dict:
+    """
+    Sends the requests of a scenario from `concurrency` concurrent workers.
+
+    Args:
+        client (httpx.AsyncClient): The client bound to the application.
+        context (Context): The seeded data.
+        scenario (Scenario): The scenario to run.
+        requests (int): The number of requests.
+        concurrency (int): The number of concurrent requests.
+
+    Returns:
+        dict: The results of the scenario.
+    """
+    latencies = []
+    errors = 0
+    next_request = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in next_request:
+            start = time.perf_counter()
+            response = await scenario.call(client, context, i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != scenario.expected:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 2),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3),
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1] * 1000, 3),
+        },
+        # peak of the process so far, on Linux in KiB
+        "max_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+    }
+
+
+def configure_app(avatar_dir: str) -> None:
+    """
+    Disables the rate limiter and stores avatars locally.
+    """
+
+    async def no_rate_limit():
+        pass
+
+    for route in app.routes:
+        for dependency in getattr(route, "dependencies", []):
+            if isinstance(dependency.dependency, RateLimiter):
+                app.dependency_overrides[dependency.dependency] = no_rate_limit
+    app.state.storage = LocalStorage(Path(avatar_dir), "/static/avatars")
+    app.state.avatar_pipeline = None
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace, context: Context) -> dict:
+    """
+    Runs every scenario and collects the results.
+
+    Args:
+        args (argparse.Namespace): The command line arguments.
+        context (Context): The seeded data.
+
+    Returns:
+        dict: The results of every scenario by name.
+    """
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        for scenario in scenarios(args.users, resources.engine.dialect.name):
+            if args.routes and not any(r in scenario.name for r in args.routes):
+                continue
+            requests = args.slow_requests if scenario.slow else args.requests
+            results[scenario.name] = await run_scenario(
+                client, context, scenario, requests, args.concurrency
+            )
+            result = results[scenario.name]
+            print(
+                f"{scenario.name:<42} {result['throughput_rps']:>9,.1f} req/s  "
+                f"p50 {result['latency_ms']['p50']:>8.2f} ms  "
+                f"p95 {result['latency_ms']['p95']:>8.2f} ms  "
+                f"p99 {result['latency_ms']['p99']:>8.2f} ms  "
+                f"errors {result['errors']}"
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--recreate",
+        action="store_true",
+        help="Confirm that the tables of SQLALCHEMY_DATABASE_URL may be dropped",
+    )
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--contacts", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--slow-requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--routes", nargs="*", help="Only run matching scenarios")
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+    if not args.recreate:
+        parser.error(
+            f"--recreate is required, the tables of {resources.engine.url} are dropped"
+        )
+    if args.concurrency > args.users:
+        # concurrent requests of one user would race for its refresh token
+        parser.error("--concurrency must not be larger than --users")
+
+    context = seed(resources.engine, args.users, args.contacts, args.requests)
+    resources.redis.delete(*(f"user:{email}" for email in context.emails))
+    with tempfile.TemporaryDirectory() as avatar_dir:
+        configure_app(avatar_dir)
+        results = asyncio.run(run(args, context))
+
+    commit = git_commit()
+    output = args.output or RESULTS_FOLDER / f"api_load-{commit or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(
+            {
+                "benchmark": "api_load",
+                "commit": commit,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "database": resources.engine.dialect.name,
+                "parameters": {
+                    "users": args.users,
+                    "contacts": args.contacts,
+                    "requests": args.requests,
+                    "slow_requests": args.slow_requests,
+                    "concurrency": args.concurrency,
+                },
+                "routes": results,
+            },
+            indent=2,
+        )
+    )
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
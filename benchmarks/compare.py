@@ -0,0 +1,87 @@
+"""
+Comparison of two runs of the API load benchmark.
+
+Prints the change of the throughput and of the p50/p95/p99 latency of every route found in both result files, and exits with status 1 if a route regressed by more than the threshold: its throughput dropped or its p95 latency grew by more than `--threshold` percent, or it returned errors the baseline did not.
+
+Usage:
+    python -m benchmarks.compare benchmarks/results/api_load-<base>.json benchmarks/results/api_load-<new>.json [--threshold 10]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def change(base: float, new: float) -> float:
+    """
+    Returns the relative change from `base` to `new` in percent.
+    """
+    return (new - base) / base * 100 if base else 0.0
+
+
+def compare(base: dict, new: dict, threshold: float) -> tuple[list[str], list[str]]:
+    """
+    Compares the routes of two benchmark results.
+
+    Args:
+        base (dict): The baseline results.
+        new (dict): The results to check.
+        threshold (float): The tolerated degradation in percent.
+
+    Returns:
+        tuple[list[str], list[str]]: The report lines and the descriptions of the regressions.
+    """
+    lines = [
+        f"{'route':<42} {'req/s':>9} {'change':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    ]
+    regressions = []
+    for name, result in new["routes"].items():
+        baseline = base["routes"].get(name)
+        if baseline is None:
+            lines.append(f"{name:<42} {result['throughput_rps']:>9,.1f}     new")
+            continue
+        throughput = change(baseline["throughput_rps"], result["throughput_rps"])
+        latency = {
+            p: change(baseline["latency_ms"][p], result["latency_ms"][p])
+            for p in ("p50", "p95", "p99")
+        }
+        lines.append(
+            f"{name:<42} {result['throughput_rps']:>9,.1f} {throughput:>+7.1f}% "
+            f"{latency['p50']:>+7.1f}% {latency['p95']:>+7.1f}% {latency['p99']:>+7.1f}%"
+        )
+        if throughput < -threshold:
+            regressions.append(f"{name}: throughput {throughput:+.1f}%")
+        if latency["p95"] > threshold:
+            regressions.append(f"{name}: p95 latency {latency['p95']:+.1f}%")
+        if result["errors"] > baseline["errors"]:
+            regressions.append(
+                f"{name}: {result['errors']} errors, baseline {baseline['errors']}"
+            )
+    return lines, regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("base", type=Path)
+    parser.add_argument("new", type=Path)
+    parser.add_argument("--threshold", type=float, default=10)
+    args = parser.parse_args()
+    base = json.loads(args.base.read_text())
+    new = json.loads(args.new.read_text())
+    if base["parameters"] != new["parameters"]:
+        print(
+            "Warning: the runs used different parameters, "
+            f"{base['parameters']} and {new['parameters']}"
+        )
+    print(f"{base.get('commit')} -> {new.get('commit')}")
+    lines, regressions = compare(base, new, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\nRegressions above {args.threshold}%:")
+        print("\n".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of `ContactIn` / `ContactOut` validation throughput.
+
+Validates a configurable number of contact rows (100 000 by default) drawn from a smaller pool of distinct phone numbers and email addresses, the way real traffic repeats the same values. Every run is done twice: with the normalizer caches cleared before each model ("cold") and with the caches kept ("warm").
+
+Usage:
+    python -m benchmarks.contact_validation [--rows 100000] [--distinct 10000]
+"""
+
+import argparse
+import time
+from datetime import date
+
+from src.schemas import ContactIn, ContactOut
+from src.services.normalization import clear_normalizer_caches
+
+
+def make_rows(rows: int, distinct: int) -> list[dict]:
+    """
+    Builds contact rows in the shape used by `tests/data_set_for_tests.py`.
+
+    Args:
+        rows (int): The number of rows to build.
+        distinct (int): The number of distinct phone numbers and emails.
+
+    Returns:
+        list[dict]: The contact rows.
+    """
+    return [
+        {
+            "id": i + 1,
+            "first_name": f"firstname_{i}",
+            "last_name": f"lastname_{i}",
+            "email": f"contact_{i % distinct}@example.com",
+            "phone": f"+48 6{i % distinct:08d}",
+            "birth_date": date(1990, 1 + i % 12, 1 + i % 28),
+        }
+        for i in range(rows)
+    ]
+
+
+def run(model, rows: list[dict], cold: bool) -> float:
+    """
+    Validates all rows with the given model.
+
+    Args:
+        model: The pydantic model class to validate the rows with.
+        rows (list[dict]): The rows to validate.
+        cold (bool): Clear the normalizer caches before every row.
+
+    Returns:
+        float: The throughput in rows per second.
+    """
+    clear_normalizer_caches()
+    start = time.perf_counter()
+    for row in rows:
+        if cold:
+            clear_normalizer_caches()
+        model.model_validate(row)
+    return len(rows) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--distinct", type=int, default=10_000)
+    args = parser.parse_args()
+    rows = make_rows(args.rows, args.distinct)
+    for model in (ContactIn, ContactOut):
+        for cold in (True, False):
+            throughput = run(model, rows, cold)
+            print(
+                f"{model.__name__:<10} {'cold' if cold else 'warm':<5} "
+                f"{throughput:>12,.0f} rows/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Benchmark of email rendering and delivery throughput.
+
+Renders a configurable number of emails (10 000 by default) with a fresh Jinja environment per message, the way fastapi-mail's template loader does, and with the precompiled templates of `src.services.email`. Then queues the same number of emails in an in-memory outbox and drains it with the `OutboxWorker` against a local aiosmtpd sink, once with a new SMTP connection per message and once over the connection pool. The sink runs in the same process on loopback without STARTTLS and AUTH, so the gain of the pool against a real SMTP server is larger.
+
+Usage:
+    python -m benchmarks.email_delivery [--messages 10000] [--pool-size 4]
+"""
+
+import argparse
+import asyncio
+import socket
+import time
+
+from aiosmtpd.controller import Controller
+from fastapi_mail import ConnectionConfig
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.database.models import Base, EmailOutbox
+from src.repository.outbox import PostgresOutboxRepository
+from src.services import email
+from src.services.mail_transport import SMTPConnectionPool
+from src.services.outbox import OutboxWorker
+from src.services.resources import resources
+
+TEMPLATE_BODY = {
+    "username": "testuser",
+    "host": "http://localhost:8000/",
+    "request_type": email.CONFIRMATION_EMAIL,
+    "token": "token",
+    "expiration": "2024-01-01 00:00:00",
+}
+
+
+class CountingHandler:
+    """
+    aiosmtpd handler counting the received messages.
+    """
+
+    def __init__(self) -> None:
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 Message accepted for delivery"
+
+
+def sink_config(port: int) -> ConnectionConfig:
+    """
+    Builds the mail configuration of the local SMTP sink.
+
+    Args:
+        port (int): The port of the sink.
+
+    Returns:
+        ConnectionConfig: The mail configuration.
+    """
+    return ConnectionConfig(
+        MAIL_USERNAME="user",
+        MAIL_PASSWORD="password",
+        MAIL_FROM="noreply@example.com",
+        MAIL_PORT=port,
+        MAIL_SERVER="127.0.0.1",
+        MAIL_FROM_NAME="Contacts",
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=False,
+        VALIDATE_CERTS=False,
+        TEMPLATE_FOLDER=email.TEMPLATE_FOLDER,
+    )
+
+
+def render(messages: int, cached: bool) -> float:
+    """
+    Renders the confirmation email template.
+
+    Args:
+        messages (int): The number of emails to render.
+        cached (bool): Use the precompiled templates instead of a new environment per email.
+
+    Returns:
+        float: The throughput in emails per second.
+    """
+    template_name = email.REQUEST_TEMPLATES[email.CONFIRMATION_EMAIL]
+    start = time.perf_counter()
+    for _ in range(messages):
+        if cached:
+            template = email.get_template(email.CONFIRMATION_EMAIL)
+        else:
+            template = email.get_config().template_engine().get_template(template_name)
+        template.render(**TEMPLATE_BODY)
+    return messages / (time.perf_counter() - start)
+
+
+async def deliver(messages: int, transport: SMTPConnectionPool) -> float:
+    """
+    Queues emails in an in-memory outbox and drains it with the outbox worker.
+
+    Args:
+        messages (int): The number of emails to queue.
+        transport (SMTPConnectionPool): The SMTP transport used by `send_email`.
+
+    Returns:
+        float: The throughput in emails per second.
+    """
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with SessionLocal() as session:
+        session.execute(
+            insert(EmailOutbox),
+            [
+                {
+                    "recipient": f"user{i}@example.com",
+                    "request_type": email.CONFIRMATION_EMAIL,
+                    "template_body": {
+                        "username": f"user{i}",
+                        "host": TEMPLATE_BODY["host"],
+                    },
+                }
+                for i in range(messages)
+            ],
+        )
+        session.commit()
+    resources.mail_transport = transport
+    worker = OutboxWorker(
+        lambda: PostgresOutboxRepository(SessionLocal()), email.send_email
+    )
+    start = time.perf_counter()
+    while await worker.run_once():
+        pass
+    elapsed = time.perf_counter() - start
+    await transport.close()
+    return messages / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--pool-size", type=int, default=4)
+    args = parser.parse_args()
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    handler = CountingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        config = sink_config(port)
+        email.get_config = lambda: config
+        for cached in (False, True):
+            throughput = render(args.messages, cached)
+            print(
+                f"render  {'cached' if cached else 'fresh':<16} "
+                f"{throughput:>10,.0f} emails/s"
+            )
+        for per_message in (True, False):
+            transport = SMTPConnectionPool(
+                config,
+                size=args.pool_size,
+                max_messages_per_connection=1 if per_message else 100,
+            )
+            throughput = asyncio.run(deliver(args.messages, transport))
+            print(
+                f"deliver {'connection/email' if per_message else 'pooled':<16} "
+                f"{throughput:>10,.0f} emails/s "
+                f"({transport.connections_opened} connections)"
+            )
+    finally:
+        controller.stop()
+    print(f"sink received {handler.received} emails")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+from jose import jwt
+from redis.exceptions import RedisError
+
+from benchmarks.micro.conftest import EMAIL
+from src.repository.users import PostgresUserRepository
+from src.services.auth import Auth
+
+PAYLOAD = {"sub": EMAIL, "scope": "access_token"}
+
+
+@pytest.fixture(scope="module")
+def repository(session):
+    return PostgresUserRepository(session)
+
+
+@pytest.fixture(scope="module")
+def auth():
+    auth = Auth()
+    try:
+        auth.redis_base.ping()
+    except RedisError as e:
+        pytest.skip(f"Redis is not reachable: {e}")
+    return auth
+
+
+@pytest.fixture(scope="module")
+def token(run, auth):
+    return run(auth.create_access_token(PAYLOAD))
+
+
+def test_jwt_encode(benchmark):
+    payload = {**PAYLOAD, "exp": datetime.utcnow() + timedelta(minutes=15)}
+
+    token = benchmark(jwt.encode, payload, Auth.SECRET_KEY, algorithm=Auth.ALGORITHM)
+
+    assert token.count(".") == 2
+
+
+def test_jwt_decode(benchmark):
+    token = jwt.encode(
+        {**PAYLOAD, "exp": datetime.utcnow() + timedelta(minutes=15)},
+        Auth.SECRET_KEY,
+        algorithm=Auth.ALGORITHM,
+    )
+
+    payload = benchmark(jwt.decode, token, Auth.SECRET_KEY, algorithms=[Auth.ALGORITHM])
+
+    assert payload["sub"] == EMAIL
+
+
+def test_get_current_user_cache_hit(benchmark, run, auth, token, repository):
+    run(auth.get_current_user(token, repository))
+
+    user = benchmark(lambda: run(auth.get_current_user(token, repository)))
+
+    assert user.email == EMAIL
+
+
+def test_get_current_user_cache_miss(benchmark, run, auth, token, repository):
+    def evict():
+        auth.redis_base.delete(f"user:{EMAIL}")
+
+    user = benchmark.pedantic(
+        lambda: run(auth.get_current_user(token, repository)),
+        setup=evict,
+        rounds=500,
+        warmup_rounds=10,
+    )
+
+    assert user.email == EMAIL
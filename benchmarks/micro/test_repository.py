@@ -0,0 +1,36 @@
+import pytest
+
+from src.repository.contacts import PostgresContactRepository
+
+GET_CONTACTS_CASES = {
+    "all": {},
+    "search_name": {"search_name": "name_42"},
+    "search_email": {"search_email": "contact_42@"},
+    "search_phone": {"search_phone": "+48 600 000 042"},
+    "upcoming_birthdays": {"upcoming_birthdays": True},
+}
+
+
+@pytest.fixture(scope="module")
+def repository(session):
+    return PostgresContactRepository(session)
+
+
+@pytest.mark.parametrize("case", GET_CONTACTS_CASES)
+def test_get_contacts(benchmark, run, repository, user, case):
+    params = {
+        "search_name": None,
+        "search_email": None,
+        "upcoming_birthdays": None,
+        **GET_CONTACTS_CASES[case],
+    }
+
+    contacts = benchmark(lambda: run(repository.get_contacts(user=user, **params)))
+
+    assert contacts
+
+
+def test_get_contact(benchmark, run, repository, user):
+    contact = benchmark(lambda: run(repository.get_contact(42, user)))
+
+    assert contact.id == 42
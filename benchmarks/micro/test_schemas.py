@@ -0,0 +1,49 @@
+from datetime import date
+
+from src.schemas import ContactIn, ContactOut, UserIn
+from src.services.normalization import clear_normalizer_caches
+
+CONTACT = {
+    "first_name": "firstname",
+    "last_name": "lastname",
+    "email": "Contact@Example.com",
+    "phone": "+48 654 789 654",
+    "birth_date": date(1990, 1, 1),
+}
+PASSWORD = "Password1!"
+
+
+def test_contact_in(benchmark):
+    contact = benchmark(ContactIn.model_validate, CONTACT)
+
+    assert contact.phone == "+48654789654"
+
+
+def test_contact_in_cold_caches(benchmark):
+    contact = benchmark.pedantic(
+        ContactIn.model_validate,
+        args=(CONTACT,),
+        setup=clear_normalizer_caches,
+        rounds=2000,
+    )
+
+    assert contact.email == "Contact@example.com"
+
+
+def test_contact_out(benchmark):
+    contact = benchmark(ContactOut.model_validate, {"id": 1, **CONTACT})
+
+    assert contact.id == 1
+
+
+def test_validate_password(benchmark):
+    assert benchmark(UserIn.validate_password, PASSWORD) == PASSWORD
+
+
+def test_user_in(benchmark):
+    user = benchmark(
+        UserIn.model_validate,
+        {"username": "benchmark", "email": "user@example.com", "password": PASSWORD},
+    )
+
+    assert user.password == PASSWORD
@@ -0,0 +1,163 @@
+"""
+Cold start report of the application, from `python -X importtime -c "import main"`.
+
+Importing the application is the bulk of the cold start of a worker: the clients are created on first use (`src.services.resources`), so the application startup itself takes milliseconds. Runs the import `--runs` times in fresh interpreters, takes the median time of every module and prints the total, the packages and the modules taking most of it, and the lazily imported dependencies that were imported anyway. `tests/test_startup.py` fails when the import takes longer than `COLD_START_BUDGET_SECONDS`.
+
+`-X importtime` adds its own overhead, the numbers are larger than a plain import and only comparable between runs on the same machine.
+
+Usage:
+    python -m benchmarks.startup [--runs 5] [--top 15] [--output benchmarks/results/startup.json]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+# budget of the median `import main`, measured 1.65 s on 1 vCPU (2.23 s before the lazy imports)
+COLD_START_BUDGET_SECONDS = 2.0
+# heavy dependencies only some processes use, imported on first use
+LAZY_MODULES = (
+    "cloudinary",
+    "fastapi_mail",
+    "jinja2",
+    "libgravatar",
+    "passlib",
+    "phonenumbers",
+)
+
+
+def parse_importtime(output: str) -> dict[str, tuple[int, int]]:
+    """
+    Parses the report `-X importtime` writes to stderr.
+
+    Args:
+        output (str): The stderr of the interpreter.
+
+    Returns:
+        dict[str, tuple[int, int]]: The self and cumulative import time in microseconds of every imported module.
+    """
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure(module: str = "main", runs: int = 5) -> list[dict[str, tuple[int, int]]]:
+    """
+    Imports a module in fresh interpreters, with the environment of the current process.
+
+    Args:
+        module (str, optional): The module to import (default is "main").
+        runs (int, optional): The number of interpreters (default is 5).
+
+    Returns:
+        list[dict[str, tuple[int, int]]]: The parsed report of every run.
+    """
+    reports = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        reports.append(parse_importtime(result.stderr))
+    return reports
+
+
+def median_report(reports: list[dict]) -> dict[str, tuple[float, float]]:
+    """
+    Takes the median self and cumulative time of every module over the runs it was imported in.
+
+    Args:
+        reports (list[dict]): The reports of `measure`.
+
+    Returns:
+        dict[str, tuple[float, float]]: The median self and cumulative time in microseconds by module.
+    """
+    names = {name for report in reports for name in report}
+    return {
+        name: (
+            statistics.median(r[name][0] for r in reports if name in r),
+            statistics.median(r[name][1] for r in reports if name in r),
+        )
+        for name in names
+    }
+
+
+def by_package(report: dict[str, tuple[float, float]]) -> dict[str, float]:
+    """
+    Sums the self time of the modules of every top-level package.
+
+    Args:
+        report (dict[str, tuple[float, float]]): The report of `median_report`.
+
+    Returns:
+        dict[str, float]: The import time in microseconds by package.
+    """
+    packages = {}
+    for name, (self_us, _) in report.items():
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    return packages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    reports = measure(args.module, args.runs)
+    total = statistics.median(r[args.module][1] for r in reports) / 1e6
+    report = median_report(reports)
+    print(
+        f"import {args.module}: {total:.3f} s (median of {args.runs}), "
+        f"budget {COLD_START_BUDGET_SECONDS:.3f} s"
+    )
+    print(f"\n{'package':<40} {'ms':>9}")
+    for package, us in sorted(by_package(report).items(), key=lambda p: -p[1])[
+        : args.top
+    ]:
+        print(f"{package:<40} {us / 1000:>9.1f}")
+    print(f"\n{'module':<60} {'self ms':>9} {'cumul. ms':>9}")
+    for name, (self_us, cumulative_us) in sorted(
+        report.items(), key=lambda m: -m[1][0]
+    )[: args.top]:
+        print(f"{name:<60} {self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}")
+    eager = [name for name in LAZY_MODULES if name in report]
+    if eager:
+        print(f"\nImported eagerly: {', '.join(eager)}")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(
+            json.dumps(
+                {
+                    "benchmark": "startup",
+                    "python": sys.version.split()[0],
+                    "runs": args.runs,
+                    "import_seconds": total,
+                    "packages_ms": {
+                        package: us / 1000 for package, us in by_package(report).items()
+                    },
+                    "eager_lazy_modules": eager,
+                },
+                indent=2,
+            )
+        )
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
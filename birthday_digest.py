@@ -0,0 +1,48 @@
+"""
+Entry point of the birthday reminder digest job.
+
+Enqueues one email per user listing their contacts' birthdays in the coming days; the emails are sent by the email worker. Schedule it once a day, e.g. with cron or Heroku Scheduler: `python birthday_digest.py [--days 7] [--chunk-size 1000] [--date YYYY-MM-DD]`. The contacts are read from the read replica when one is configured.
+"""
+
+import argparse
+from datetime import date
+
+from dotenv import load_dotenv
+
+from src.services.birthdays import BirthdayDigest, UPCOMING_BIRTHDAYS_DAYS
+from src.services.resources import resources
+
+load_dotenv()
+
+
+def main() -> None:
+    """
+    Runs the birthday digest job once.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--days", type=int, default=UPCOMING_BIRTHDAYS_DAYS)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument(
+        "--date",
+        type=date.fromisoformat,
+        default=date.today(),
+        help="first day of the reminder window (default is today)",
+    )
+    args = parser.parse_args()
+    write_session = resources.session()
+    read_session = resources.replica_session()
+    if read_session is None:
+        read_session = write_session
+    try:
+        enqueued = BirthdayDigest(read_session, write_session, args.chunk_size).run(
+            args.date, args.days
+        )
+    finally:
+        if read_session is not write_session:
+            read_session.close()
+        write_session.close()
+    print(f"Enqueued {enqueued} birthday digests")
+
+
+if __name__ == "__main__":
+    main()
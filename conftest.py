@@ -0,0 +1 @@
+pytest_plugins = ["tests.plugins.query_budget"]
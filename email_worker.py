@@ -0,0 +1,52 @@
+"""
+Entry point of the email worker process.
+
+The worker drains the `email_outbox` table filled by the API: `python email_worker.py`. It stops gracefully on SIGINT/SIGTERM after finishing the current batch and closing its SMTP connections and database pool.
+"""
+
+import asyncio
+import signal
+
+from dotenv import load_dotenv
+
+from src.conf.config import settings
+from src.repository.outbox import PostgresOutboxRepository
+from src.services.email import send_email
+from src.services.outbox import OutboxWorker
+from src.services.resources import resources
+from src.services.tracing import configure_tracing
+
+load_dotenv()
+
+
+async def main() -> None:
+    """
+    Runs the email worker until the process receives SIGINT or SIGTERM.
+    """
+    tracer_provider = configure_tracing(settings)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, stop.set)
+    worker = OutboxWorker(
+        lambda: PostgresOutboxRepository(resources.session()),
+        send_email,
+        batch_size=settings.outbox_batch_size,
+        max_attempts=settings.outbox_max_attempts,
+        backoff_seconds=settings.outbox_backoff_seconds,
+        max_backoff_seconds=settings.outbox_max_backoff_seconds,
+        lease_seconds=settings.outbox_lease_seconds,
+        poll_seconds=settings.outbox_poll_seconds,
+        retention_days=settings.outbox_retention_days,
+        cleanup_interval_seconds=settings.outbox_cleanup_interval_seconds,
+    )
+    try:
+        await worker.run(stop)
+    finally:
+        await resources.close()
+        if tracer_provider is not None:
+            tracer_provider.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Production server profile: gunicorn supervising uvicorn workers, `gunicorn main:app` (see the `Procfile`). Every setting can be overridden on the command line or with `GUNICORN_CMD_ARGS`.
+
+Workers: `WEB_CONCURRENCY`, by default twice the CPUs available to the process. The routes run their SQLAlchemy queries and Redis calls synchronously on the event loop, so a worker waiting on the database serves nothing else meanwhile; a second worker per CPU keeps the CPUs busy. Every worker holds its own database pool (`pool_size` + `max_overflow` connections, 15 by default), so `workers * 15` must stay below the connection limit of the database.
+
+Throughput of `python loadtest.py --mix me=1 --concurrency 16` (authenticated `GET /api/users/me/`, cached user), measured on 1 vCPU shared with the load generator, Redis and SQLite:
+
+    workers  req/s  p95 (ms)
+    1          177       282
+    2          171       282
+    4          192       268
+
+On one CPU the workers only compete for it; throughput grows with the workers until the CPUs are saturated, so measure with `loadtest.py` on the target machine, with the database and Redis on their own hosts, before changing the default.
+
+The application is imported once in the master (`preload_app`): a broken configuration fails before any worker starts, and the workers share the imported code copy-on-write. Importing the application opens no connection, the clients are created on first use (`src.services.resources`); a database pool used in the master anyway is dropped in every worker after the fork (`post_fork`), so each worker creates its own. The Redis clients check the process id and reconnect after a fork by themselves. Prometheus metrics are written to `PROMETHEUS_MULTIPROC_DIR` (a temporary directory by default) and merged on `/metrics`.
+
+A worker that does not report to the master for `timeout` seconds is killed with SIGKILL, with the in-flight requests of all its clients. The routes run their SQL synchronously on the event loop, so a statement running until the deadline of its request (`request_timeout_seconds`, `route_timeouts`, see `src.services.deadlines`) blocks the heartbeat of the worker until the database cancels it. The timeout is therefore derived from the longest request budget plus `WORKER_TIMEOUT_MARGIN_SECONDS` (60 seconds with the default settings), so the deadline always stops a request before gunicorn kills the worker; raise the budgets in the settings rather than overriding `--timeout`.
+
+On SIGTERM gunicorn stops accepting connections and every worker finishes its in-flight requests and their background tasks, then runs the application shutdown (avatar uploads, tracing, connection pools), for at most `graceful_timeout` seconds before it is killed. Heroku sends SIGKILL 30 seconds after SIGTERM.
+"""
+
+import math
+import os
+import tempfile
+
+from uvicorn.workers import UvicornWorker
+
+
+# time left between the longest request budget and the worker timeout, for the database to cancel the statement
+WORKER_TIMEOUT_MARGIN_SECONDS = 30
+
+
+def default_workers() -> int:
+    """
+    Returns the default number of workers, twice the CPUs available to the process.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return 2 * len(os.sched_getaffinity(0))
+    return 2 * (os.cpu_count() or 1)
+
+
+def worker_timeout() -> int:
+    """
+    Returns the worker timeout, the longest request budget of the settings plus `WORKER_TIMEOUT_MARGIN_SECONDS`.
+    """
+    # imported after PROMETHEUS_MULTIPROC_DIR is set, the application imports prometheus_client
+    from src.conf.config import settings
+    from src.services.deadlines import longest_budget
+
+    return math.ceil(longest_budget(settings)) + WORKER_TIMEOUT_MARGIN_SECONDS
+
+
+class ProductionUvicornWorker(UvicornWorker):
+    """
+    Uvicorn worker running on uvloop with the httptools HTTP parser (both installed with `uvicorn[standard]`). A failing application startup stops the worker instead of being ignored.
+    """
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
+
+
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    # set before the application imports prometheus_client
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", default_workers()))
+worker_class = ProductionUvicornWorker
+preload_app = True
+graceful_timeout = 25
+timeout = worker_timeout()
+keepalive = 5
+forwarded_allow_ips = "*"
+
+
+def post_fork(server, worker) -> None:
+    """
+    Drops the database connections inherited from the master, without closing them for the master, so the worker opens its own.
+    """
+    from src.services.resources import resources
+
+    resources.after_fork()
+
+
+def child_exit(server, worker) -> None:
+    """
+    Removes the live metrics (gauges) of a stopped worker from the merged Prometheus metrics.
+    """
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,615 @@
+"""
+Load and soak test of a running instance of the contacts API.
+
+Signs up `--users` synthetic users, confirms them through the load test hook (the instance must run with `LOADTEST_HOOK_TOKEN` set to `--hook-token`, no email is sent) and logs them in. Then `--concurrency` workers send a weighted mix of contact CRUD, search, birthday and profile (`me`, not rate limited) requests for `--duration` seconds; access tokens that expire during a soak test are refreshed. Every `--report-interval` seconds the throughput, errors and rate-limiter rejections (429) of the interval are printed, at the end the latency histogram and percentiles of every operation. Latencies are counted in logarithmic buckets, so the memory used does not grow with the duration.
+
+Usage:
+    python loadtest.py --url http://localhost:8000 --hook-token <token> [--users 20] [--concurrency 16] [--duration 60] [--mix list=20,create=10,...] [--output loadtest.json]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+import httpx
+
+PASSWORD = "Password1!"
+DEFAULT_MIX = {
+    "list": 20,
+    "search_name": 15,
+    "search_email": 10,
+    "search_phone": 10,
+    "birthdays": 10,
+    "read": 15,
+    "create": 10,
+    "update": 5,
+    "delete": 5,
+    "me": 5,
+}
+SINGLE_CONTACT = {"read", "update", "delete"}
+REPORT_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+_refreshing: dict[str, asyncio.Lock] = {}
+
+
+class LatencyHistogram:
+    """
+    Counts latencies in logarithmic buckets, each one `GROWTH` times wider than the previous one, so percentiles are exact to within 5% and the memory used is bounded.
+    """
+
+    MIN_MS = 0.01
+    GROWTH = 1.05
+
+    def __init__(self) -> None:
+        self.counts: Counter = Counter()
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def _bucket(self, ms: float) -> int:
+        return max(0, math.ceil(math.log(ms / self.MIN_MS, self.GROWTH)))
+
+    def _upper_bound(self, bucket: int) -> float:
+        return self.MIN_MS * self.GROWTH**bucket
+
+    def record(self, seconds: float) -> None:
+        """
+        Adds a latency to the histogram.
+
+        Args:
+            seconds (float): The latency in seconds.
+        """
+        ms = max(seconds * 1000, self.MIN_MS)
+        self.counts[self._bucket(ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """
+        Adds the latencies of another histogram to this one.
+
+        Args:
+            other (LatencyHistogram): The histogram to add.
+        """
+        self.counts.update(other.counts)
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def percentile(self, q: float) -> float:
+        """
+        Returns a percentile of the recorded latencies.
+
+        Args:
+            q (float): The percentile, between 0 and 100.
+
+        Returns:
+            float: The upper bound of the bucket holding the percentile in milliseconds, at most the largest latency, or 0 if nothing was recorded.
+        """
+        if not self.count:
+            return 0.0
+        rank = math.ceil(q / 100 * self.count)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self._upper_bound(bucket), self.max_ms)
+        return self.max_ms
+
+    def coarse(self, bounds: tuple = REPORT_BOUNDS_MS) -> list[tuple[float, int]]:
+        """
+        Regroups the buckets under coarser bounds for the report.
+
+        Args:
+            bounds (tuple): The upper bounds of the coarse buckets in milliseconds, a last bucket without bound collects the remaining latencies.
+
+        Returns:
+            list[tuple[float, int]]: The upper bound and the number of latencies of every coarse bucket.
+        """
+        counts = [0] * (len(bounds) + 1)
+        for bucket, count in self.counts.items():
+            upper = self._upper_bound(bucket)
+            index = next((i for i, b in enumerate(bounds) if upper <= b), len(bounds))
+            counts[index] += count
+        return list(zip((*bounds, math.inf), counts))
+
+
+@dataclass
+class OperationStats:
+    """
+    The results of one operation of the mix.
+
+    Attributes:
+        latency (LatencyHistogram): The latencies of the responses.
+        statuses (Counter): The number of responses per status code, "error" for requests that failed without a response.
+        errors (int): The responses with an unexpected status code, rate-limited ones excepted, and the failed requests.
+        rate_limited (int): The requests rejected by the rate limiter.
+    """
+
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    statuses: Counter = field(default_factory=Counter)
+    errors: int = 0
+    rate_limited: int = 0
+
+    def record(self, seconds: float, status: int | str, expected: int) -> None:
+        """
+        Adds the outcome of a request.
+
+        Args:
+            seconds (float): The latency of the request.
+            status (int | str): The status code of the response, "error" if the request failed.
+            expected (int): The status code of a successful response.
+        """
+        self.latency.record(seconds)
+        self.statuses[status] += 1
+        if status == 429:
+            self.rate_limited += 1
+        elif status != expected:
+            self.errors += 1
+
+    def merge(self, other: "OperationStats") -> None:
+        """
+        Adds the results of another instance.
+
+        Args:
+            other (OperationStats): The results to add.
+        """
+        self.latency.merge(other.latency)
+        self.statuses.update(other.statuses)
+        self.errors += other.errors
+        self.rate_limited += other.rate_limited
+
+
+@dataclass
+class VirtualUser:
+    """
+    A synthetic user, shared by the workers sending its requests.
+
+    Attributes:
+        email (str): The email of the user.
+        access_token (str): The current access token.
+        refresh_token (str): The current refresh token.
+    """
+
+    email: str
+    access_token: str = ""
+    refresh_token: str = ""
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.access_token}"}
+
+
+@dataclass
+class Worker:
+    """
+    The state of one worker.
+
+    Attributes:
+        number (int): The number of the worker, used to keep the contacts it creates unique.
+        user (VirtualUser): The user the worker sends requests as.
+        random (random.Random): The random generator choosing the operations.
+        contact_ids (list[int]): The contacts created by the worker and not deleted yet.
+        created (int): The number of contacts created by the worker.
+    """
+
+    number: int
+    user: VirtualUser
+    random: random.Random
+    contact_ids: list[int] = field(default_factory=list)
+    created: int = 0
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    """
+    Parses the weights of the operations of the mix.
+
+    Args:
+        value (str): Comma separated `operation=weight` pairs, operations left out are not sent.
+
+    Returns:
+        dict[str, int]: The weight of every operation.
+
+    Raises:
+        argparse.ArgumentTypeError: If an operation is unknown or a weight is not a positive integer.
+    """
+    mix = {}
+    for pair in value.split(","):
+        name, _, weight = pair.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(
+                f"unknown operation {name!r}, choose from {', '.join(DEFAULT_MIX)}"
+            )
+        if not weight.strip().isdigit() or int(weight) < 1:
+            raise argparse.ArgumentTypeError(f"invalid weight of {name!r}: {weight!r}")
+        mix[name] = int(weight)
+    return mix
+
+
+def contact_body(worker: Worker) -> dict:
+    """
+    Builds a contact with an email and a phone number unique among the contacts of the worker's user.
+
+    Args:
+        worker (Worker): The worker creating the contact.
+
+    Returns:
+        dict: The JSON body of the contact.
+    """
+    worker.created += 1
+    n = worker.number * 1_000_000 + worker.created
+    birth_date = date.today() + timedelta(days=worker.random.randrange(365))
+    return {
+        "first_name": f"firstname_{n}",
+        "last_name": f"lastname_{n}",
+        "email": f"contact_{n}@example.com",
+        "phone": f"+48 6{n % 100_000_000:08d}",
+        "birth_date": date(1990, birth_date.month, min(birth_date.day, 28)).isoformat(),
+    }
+
+
+async def send(
+    client: httpx.AsyncClient, worker: Worker, operation: str
+) -> tuple[httpx.Response, int]:
+    """
+    Sends the request of an operation.
+
+    Args:
+        client (httpx.AsyncClient): The client of the instance.
+        worker (Worker): The worker sending the request.
+        operation (str): The operation of the mix, one on a single contact requires contacts created by the worker.
+
+    Returns:
+        tuple[httpx.Response, int]: The response and the status code of a successful response.
+    """
+    headers = worker.user.headers
+    if operation == "create":
+        response = await client.post(
+            "/api/contacts/", json=contact_body(worker), headers=headers
+        )
+        if response.status_code == 201:
+            worker.contact_ids.append(response.json()["id"])
+        return response, 201
+    if operation in ("read", "update"):
+        contact_id = worker.random.choice(worker.contact_ids)
+        if operation == "read":
+            return await client.get(f"/api/contacts/{contact_id}", headers=headers), 200
+        response = await client.put(
+            f"/api/contacts/{contact_id}", json=contact_body(worker), headers=headers
+        )
+        return response, 200
+    if operation == "delete":
+        contact_id = worker.contact_ids.pop(
+            worker.random.randrange(len(worker.contact_ids))
+        )
+        response = await client.delete(f"/api/contacts/{contact_id}", headers=headers)
+        if response.status_code not in (200, 404):
+            worker.contact_ids.append(contact_id)
+        return response, 200
+    if operation == "me":
+        return await client.get("/api/users/me/", headers=headers), 200
+    n = worker.number * 1_000_000 + worker.random.randint(1, max(worker.created, 1))
+    params = {
+        "list": {},
+        "search_name": {"search_name": f"name_{n}"},
+        "search_email": {"search_email": f"contact_{n}@"},
+        "search_phone": {"search_phone": f"+48 6{n % 100_000_000:08d}"},
+        "birthdays": {"upcoming_birthdays": "true"},
+    }[operation]
+    return await client.get("/api/contacts/", params=params, headers=headers), 200
+
+
+async def refresh(client: httpx.AsyncClient, user: VirtualUser) -> None:
+    """
+    Replaces the expired tokens of a user, once for all the workers sharing it.
+
+    Args:
+        client (httpx.AsyncClient): The client of the instance.
+        user (VirtualUser): The user whose access token expired.
+    """
+    expired = user.access_token
+    async with _refreshing.setdefault(user.email, asyncio.Lock()):
+        if user.access_token != expired:
+            return
+        response = await client.get(
+            "/api/auth/refresh_token",
+            headers={"Authorization": f"Bearer {user.refresh_token}"},
+        )
+        response.raise_for_status()
+        tokens = response.json()
+        user.access_token = tokens["access_token"]
+        user.refresh_token = tokens["refresh_token"]
+
+
+async def prepare_users(
+    client: httpx.AsyncClient, count: int, hook_token: str, concurrency: int
+) -> list[VirtualUser]:
+    """
+    Signs up, confirms and logs in the synthetic users of a run.
+
+    Args:
+        client (httpx.AsyncClient): The client of the instance.
+        count (int): The number of users.
+        hook_token (str): The token of the load test hook of the instance.
+        concurrency (int): The number of users prepared at the same time.
+
+    Returns:
+        list[VirtualUser]: The logged in users.
+
+    Raises:
+        httpx.HTTPStatusError: If a user could not be signed up, confirmed or logged in.
+    """
+    run_id = uuid.uuid4().hex[:8]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def prepare(i: int) -> VirtualUser:
+        user = VirtualUser(email=f"loadtest-{run_id}-{i}@example.com")
+        async with semaphore:
+            response = await client.post(
+                "/api/auth/signup",
+                json={
+                    "username": f"loadtest-{run_id}-{i}",
+                    "email": user.email,
+                    "password": PASSWORD,
+                },
+            )
+            response.raise_for_status()
+            response = await client.post(
+                "/api/loadtest/confirm",
+                json={"email": user.email},
+                headers={"X-Loadtest-Token": hook_token},
+            )
+            response.raise_for_status()
+            response = await client.post(
+                "/api/auth/login", data={"username": user.email, "password": PASSWORD}
+            )
+            response.raise_for_status()
+        tokens = response.json()
+        user.access_token = tokens["access_token"]
+        user.refresh_token = tokens["refresh_token"]
+        return user
+
+    return list(await asyncio.gather(*(prepare(i) for i in range(count))))
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    users: list[VirtualUser],
+    mix: dict[str, int],
+    duration: float,
+    concurrency: int,
+    report_interval: float,
+    seed: int | None = None,
+) -> dict[str, OperationStats]:
+    """
+    Sends the mix of requests until the end of the run, printing the results of every interval.
+
+    Args:
+        client (httpx.AsyncClient): The client of the instance.
+        users (list[VirtualUser]): The users the requests are sent as, shared round robin by the workers.
+        mix (dict[str, int]): The weight of every operation.
+        duration (float): The length of the run in seconds.
+        concurrency (int): The number of workers.
+        report_interval (float): The time between two interval reports in seconds, 0 disables them.
+        seed (int, optional): The seed of the random choice of the operations (default is None, a different mix every run).
+
+    Returns:
+        dict[str, OperationStats]: The results of every operation.
+    """
+    operations, weights = list(mix), list(mix.values())
+    # operations on a single contact create one while the worker has none
+    names = operations
+    if SINGLE_CONTACT & set(mix) and "create" not in mix:
+        names = operations + ["create"]
+    stats = {name: OperationStats() for name in names}
+    interval = {name: OperationStats() for name in names}
+    start = time.perf_counter()
+    deadline = start + duration
+    seeds = random.Random(seed)
+
+    async def work(worker: Worker) -> None:
+        while time.perf_counter() < deadline:
+            operation = worker.random.choices(operations, weights)[0]
+            if operation in SINGLE_CONTACT and not worker.contact_ids:
+                operation = "create"
+            started = time.perf_counter()
+            try:
+                response, expected = await send(client, worker, operation)
+                status = response.status_code
+            except httpx.HTTPError:
+                status, expected = "error", 200
+            elapsed = time.perf_counter() - started
+            interval[operation].record(elapsed, status, expected)
+            if status == 401:
+                try:
+                    await refresh(client, worker.user)
+                except httpx.HTTPError:
+                    await asyncio.sleep(1)
+
+    async def report() -> None:
+        last = start
+        while True:
+            await asyncio.sleep(report_interval)
+            now = time.perf_counter()
+            current = dict(interval)
+            for name in names:
+                interval[name] = OperationStats()
+                stats[name].merge(current[name])
+            print(format_interval(now - start, now - last, current.values()))
+            last = now
+
+    workers = [
+        Worker(i, users[i % len(users)], random.Random(seeds.random()))
+        for i in range(concurrency)
+    ]
+    reporter = asyncio.create_task(report()) if report_interval > 0 else None
+    try:
+        await asyncio.gather(*(work(worker) for worker in workers))
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+    for name in names:
+        stats[name].merge(interval[name])
+    return stats
+
+
+def format_interval(elapsed: float, length: float, results) -> str:
+    """
+    Formats the results of one interval of the run.
+
+    Args:
+        elapsed (float): The time since the start of the run.
+        length (float): The length of the interval.
+        results (Iterable[OperationStats]): The results of every operation during the interval.
+
+    Returns:
+        str: One line with the throughput, the errors and the rejections of the interval.
+    """
+    total = OperationStats()
+    for result in results:
+        total.merge(result)
+    requests = total.latency.count
+    return (
+        f"[{elapsed:7.1f}s] {requests / length:8.1f} req/s  "
+        f"p95 {total.latency.percentile(95):8.1f} ms  "
+        f"errors {total.errors:5d}  rate-limited {total.rate_limited:5d}"
+    )
+
+
+def format_report(stats: dict[str, OperationStats], duration: float) -> str:
+    """
+    Formats the results of the run.
+
+    Args:
+        stats (dict[str, OperationStats]): The results of every operation.
+        duration (float): The length of the run in seconds.
+
+    Returns:
+        str: A table of the throughput, error and rejection rates and latency percentiles of every operation, followed by the latency histogram of all the requests.
+    """
+    lines = [
+        f"{'operation':<14} {'requests':>9} {'req/s':>8} {'errors':>7} {'429':>7} "
+        f"{'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    ]
+    total = OperationStats()
+    for name, result in [*stats.items(), ("total", total)]:
+        if name != "total":
+            total.merge(result)
+        count = result.latency.count
+        if not count:
+            continue
+        lines.append(
+            f"{name:<14} {count:>9} {count / duration:>8.1f} "
+            f"{result.errors / count:>7.1%} {result.rate_limited / count:>7.1%} "
+            + " ".join(
+                f"{value:>8.1f}"
+                for value in (
+                    result.latency.percentile(50),
+                    result.latency.percentile(95),
+                    result.latency.percentile(99),
+                    result.latency.max_ms,
+                )
+            )
+        )
+    lines.append("")
+    lines.append("latency (ms)  requests")
+    histogram = total.latency.coarse()
+    largest = max((count for _, count in histogram), default=0) or 1
+    for bound, count in histogram:
+        label = f"<= {bound:g}" if bound != math.inf else f"> {REPORT_BOUNDS_MS[-1]}"
+        lines.append(f"{label:>10}  {count:>9}  {'#' * round(40 * count / largest)}")
+    return "\n".join(lines)
+
+
+def to_json(stats: dict[str, OperationStats], duration: float) -> dict:
+    """
+    Converts the results of the run for the `--output` file.
+
+    Args:
+        stats (dict[str, OperationStats]): The results of every operation.
+        duration (float): The length of the run in seconds.
+
+    Returns:
+        dict: The throughput, errors, rejections, status codes, latency percentiles and histogram of every operation.
+    """
+    return {
+        name: {
+            "requests": result.latency.count,
+            "throughput_rps": result.latency.count / duration,
+            "errors": result.errors,
+            "rate_limited": result.rate_limited,
+            "statuses": {str(status): n for status, n in result.statuses.items()},
+            "latency_ms": {
+                "p50": result.latency.percentile(50),
+                "p95": result.latency.percentile(95),
+                "p99": result.latency.percentile(99),
+                "max": result.latency.max_ms,
+                "histogram": [
+                    [None if bound == math.inf else bound, count]
+                    for bound, count in result.latency.coarse()
+                ],
+            },
+        }
+        for name, result in stats.items()
+    }
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=args.url, timeout=args.timeout, limits=limits
+    ) as client:
+        started = time.perf_counter()
+        users = await prepare_users(
+            client, args.users, args.hook_token, args.concurrency
+        )
+        print(f"Prepared {len(users)} users in {time.perf_counter() - started:.1f}s")
+        stats = await run_load(
+            client,
+            users,
+            args.mix,
+            args.duration,
+            args.concurrency,
+            args.report_interval,
+            args.seed,
+        )
+    print(format_report(stats, args.duration))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(
+                {"parameters": vars(args), "operations": to_json(stats, args.duration)},
+                file,
+                indent=2,
+            )
+
+
+def main() -> None:
+    """
+    Runs a load test against a running instance.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--hook-token", required=True)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument("--report-interval", type=float, default=10, help="seconds")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
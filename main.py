@@ -1,51 +1,134 @@
+import math
+import time
+from contextlib import asynccontextmanager
+
 from dotenv import load_dotenv
 
 import uvicorn
-import redis.asyncio as redis
 from fastapi import FastAPI
-from fastapi_limiter import FastAPILimiter
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 
-from src.routes import contacts, auth, users
+from src.routes import contacts, auth, users, metrics, profiling, loadtest, health
 from src.conf.config import settings
+from src.database.instrumentation import QueryLogMiddleware
+from src.services.deadlines import (
+    DeadlineMiddleware,
+    longest_budget,
+    route_budgets,
+)
+from src.services.idempotency import IdempotencyMiddleware
+from src.services.metrics import (
+    OutboxDepthCollector,
+    PrometheusMiddleware,
+    metrics_registry,
+)
+from src.services.profiling import ProfileRequestMiddleware
+from src.services.rate_limit import init_rate_limiter
+from src.services.resources import resources
+from src.services.images import ImmutableStaticFiles, create_avatar_pipeline
+from src.services.tracing import TracingMiddleware, configure_tracing
+from src.services.uploads import MULTIPART_OVERHEAD, UploadSizeLimitMiddleware
 
 load_dotenv()
-app = FastAPI()
+
+outbox_depth = OutboxDepthCollector(resources.session)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Sets up the application when a worker starts and tears it down when it stops, after the in-flight requests finished.
+
+    At startup it initializes the FastAPILimiter with the Redis client of the resources, which implements rate limiting for the API endpoints to prevent abuse and ensure fair usage of the application; the application starts even if Redis is unavailable, the requests are then rate limited per process. It also creates the avatar storage once, configuring the storage client, and the optional avatar pipeline, registers the email outbox depth metric and installs the OpenTelemetry exporter if tracing is enabled. The time the startup took is stored in `app.state.startup_seconds`.
+
+    At shutdown it waits for running avatar uploads and resizes and stops their worker pools, flushes the remaining spans and closes the shared clients (`resources.close`): the Redis clients, the SMTP connections and the database connection pools.
+    """
+    start = time.perf_counter()
+    await init_rate_limiter(resources.async_redis)
+    app.state.storage = resources.storage
+    app.state.avatar_pipeline = create_avatar_pipeline(settings, app.state.storage)
+    metrics_registry().register(outbox_depth)
+    app.state.tracer_provider = configure_tracing(settings)
+    app.state.startup_seconds = time.perf_counter() - start
+    try:
+        yield
+    finally:
+        if app.state.avatar_pipeline is not None:
+            app.state.avatar_pipeline.close()
+        metrics_registry().unregister(outbox_depth)
+        if app.state.tracer_provider is not None:
+            app.state.tracer_provider.shutdown()
+        await resources.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 ORIGINS = ["http://localhost:3000"]
 
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    UploadSizeLimitMiddleware,
+    max_bytes=settings.avatar_max_bytes + MULTIPART_OVERHEAD,
+    paths=["/api/users/me/avatar"],
 )
 
+if settings.avatar_storage == "local":
+    # avatars of the pipeline are content-addressed and never change
+    static_files = ImmutableStaticFiles if settings.avatar_pipeline else StaticFiles
+    app.mount(
+        settings.avatar_local_url,
+        static_files(directory=settings.avatar_local_dir, check_dir=False),
+        name="avatars",
+    )
 
 app.include_router(auth.router, prefix="/api")
 app.include_router(contacts.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
+app.include_router(metrics.router)
+app.include_router(health.router)
 
+if settings.profiling_enabled:
+    app.include_router(profiling.router, prefix="/api")
+    app.add_middleware(ProfileRequestMiddleware)
 
-async def startup_event():
-    """
-    This function is called during the startup of the FastAPI application. It creates a Redis connection using the settings from the application configuration, and then initializes the FastAPILimiter with the Redis connection.
+if settings.loadtest_hook_token:
+    app.include_router(loadtest.router, prefix="/api")
 
-    The FastAPILimiter is used to implement rate limiting for the API endpoints, to prevent abuse and ensure fair usage of the application.
-    """
-    redis_base = await redis.Redis(
-        host=settings.redis_host,
-        port=settings.redis_port,
-        # password=settings.redis_password,
-        db=0,
-        encoding="utf-8",
-        decode_responses=True,
-    )
-    await FastAPILimiter.init(redis_base)
+app.add_middleware(
+    QueryLogMiddleware,
+    max_queries=settings.query_log_max_queries,
+    max_seconds=settings.query_log_max_seconds,
+    slow_query_seconds=settings.query_log_slow_seconds,
+    repeated_queries=settings.query_log_repeated,
+)
+
+app.add_middleware(
+    DeadlineMiddleware,
+    timeout=settings.request_timeout_seconds,
+    route_timeouts=route_budgets(settings),
+)
+
+# outside the deadline, so a request stopped by it releases its key
+app.add_middleware(
+    IdempotencyMiddleware,
+    paths=settings.idempotent_paths,
+    ttl_seconds=settings.idempotency_ttl_seconds,
+    lock_seconds=math.ceil(longest_budget(settings)),
+)
 
+# added after the application middlewares, so they time the whole request
+app.add_middleware(PrometheusMiddleware)
+app.add_middleware(TracingMiddleware)
 
-app.add_event_handler("startup", startup_event)
+# outermost, so the responses of the other middlewares (413, 409, 504...) carry the CORS headers too
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=ORIGINS,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
 
 if __name__ == "__main__":
+    # development server, production runs `gunicorn main:app` (see gunicorn.conf.py)
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,62 @@
+"""Optional hash partitioning of contacts
+
+Converts the `contacts` table into a PostgreSQL table hash-partitioned on `user_id`.
+The conversion is opt-in and only runs when the number of partitions is passed to Alembic:
+
+    alembic -x contacts_partitions=32 upgrade head
+
+Without the argument (or on a database other than PostgreSQL) the revision is a no-op.
+To partition a database that is already past this revision, do not downgrade: the downgrade
+passes through the later revisions and drops their tables (e.g. the email outbox). Convert the
+table in place instead, at the current revision:
+
+    python partition_contacts.py --partitions 32
+
+The downgrade converts a partitioned table back into a plain one and does nothing otherwise.
+See `src.database.partitioning` for the conversion.
+
+Revision ID: bc04bd199c6b
+Revises: d6229df61282
+Create Date: 2026-10-19 11:20:07.551932
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import context, op
+
+from src.database.partitioning import partition_contacts, unpartition_contacts
+
+
+# revision identifiers, used by Alembic.
+revision: str = "bc04bd199c6b"
+down_revision: Union[str, None] = "d6229df61282"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _partitions() -> int:
+    """
+    Returns the number of partitions requested with `-x contacts_partitions=N`, 0 when not requested.
+    """
+    partitions = int(
+        context.get_x_argument(as_dictionary=True).get("contacts_partitions", 0)
+    )
+    if partitions < 0:
+        raise ValueError("contacts_partitions must be a positive number")
+    return partitions
+
+
+def upgrade() -> None:
+    partitions = _partitions()
+    connection = op.get_bind()
+    if not partitions or connection.dialect.name != "postgresql":
+        return
+    partition_contacts(connection, partitions)
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != "postgresql":
+        return
+    unpartition_contacts(connection)
@@ -0,0 +1,51 @@
+"""Additional info JSONB with GIN index
+
+Revision ID: cc60aa6f3f69
+Revises: d6ee4a1d798f
+Create Date: 2026-10-19 09:12:31.402118
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "cc60aa6f3f69"
+down_revision: Union[str, None] = "d6ee4a1d798f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        "contacts",
+        "additional_info",
+        existing_type=sa.JSON(),
+        type_=postgresql.JSONB(),
+        existing_nullable=True,
+        postgresql_using="additional_info::jsonb",
+    )
+    op.create_index(
+        "ix_contacts_additional_info",
+        "contacts",
+        ["additional_info"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"additional_info": "jsonb_path_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_contacts_additional_info", table_name="contacts")
+    op.alter_column(
+        "contacts",
+        "additional_info",
+        existing_type=postgresql.JSONB(),
+        type_=sa.JSON(),
+        existing_nullable=True,
+        postgresql_using="additional_info::json",
+    )
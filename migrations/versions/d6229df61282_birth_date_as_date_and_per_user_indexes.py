@@ -0,0 +1,52 @@
+"""Birth date as date and per user indexes
+
+Revision ID: d6229df61282
+Revises: cc60aa6f3f69
+Create Date: 2026-10-19 10:02:54.118604
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d6229df61282"
+down_revision: Union[str, None] = "cc60aa6f3f69"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        "contacts",
+        "birth_date",
+        existing_type=sa.DateTime(),
+        type_=sa.Date(),
+        existing_nullable=False,
+        postgresql_using="birth_date::date",
+    )
+    op.create_index(
+        "ix_contacts_user_id_id", "contacts", ["user_id", "id"], unique=False
+    )
+    op.create_index(
+        "ix_contacts_user_id_name",
+        "contacts",
+        ["user_id", "last_name", "first_name"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_contacts_user_id_name", table_name="contacts")
+    op.drop_index("ix_contacts_user_id_id", table_name="contacts")
+    op.alter_column(
+        "contacts",
+        "birth_date",
+        existing_type=sa.Date(),
+        type_=sa.DateTime(),
+        existing_nullable=False,
+        postgresql_using="birth_date::timestamp",
+    )
@@ -0,0 +1,36 @@
+"""Birthday key index
+
+Revision ID: f474e1cfc19c
+Revises: 3951865ea0dd
+Create Date: 2026-10-19 04:15:39.348812
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f474e1cfc19c"
+down_revision: Union[str, None] = "3951865ea0dd"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_contacts_birthday_key",
+        "contacts",
+        [
+            sa.text(
+                "(EXTRACT(month FROM birth_date) * 100 + EXTRACT(day FROM birth_date))"
+            )
+        ],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_contacts_birthday_key", table_name="contacts")
@@ -0,0 +1,42 @@
+"""
+Entry point of the hash partitioning of the contacts table.
+
+Converts the `contacts` table of the PostgreSQL database in place, at any migration revision: `python partition_contacts.py --partitions 32`, or back into a plain table with `python partition_contacts.py --undo`. The table is locked while its rows are copied, run it in a maintenance window.
+"""
+
+import argparse
+
+from dotenv import load_dotenv
+
+from src.database.partitioning import partition_contacts, unpartition_contacts
+from src.services.resources import resources
+
+load_dotenv()
+
+
+def main() -> None:
+    """
+    Converts the contacts table once.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--partitions", type=int, help="number of hash partitions")
+    group.add_argument(
+        "--undo", action="store_true", help="convert back into a plain table"
+    )
+    args = parser.parse_args()
+    if resources.engine.dialect.name != "postgresql":
+        parser.error("partitioning needs a PostgreSQL database")
+    try:
+        with resources.engine.begin() as connection:
+            if args.undo:
+                converted = unpartition_contacts(connection)
+            else:
+                converted = partition_contacts(connection, args.partitions)
+    finally:
+        resources.engine.dispose()
+    print("Converted the contacts table" if converted else "Nothing to convert")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,8 @@ class Settings(BaseSettings):
         postgres_host (str, optional): PostgreSQL host (default is "localhost").
         postgres_port (int): PostgreSQL port.
         sqlalchemy_database_url (str): SQLAlchemy database URL.
+        sqlalchemy_replica_url (str, optional): SQLAlchemy URL of a read-only replica (default is None, all queries go to the primary).
+        read_your_writes_seconds (int, optional): How long reads of a user who has just written are routed to the primary (default is 5).
         secret_key (str): Secret key for cryptographic operations.
         algorithm (str): Algorithm for token generation (e.g., "HS256").
         salt_length (int): Length of salt for password hashing.
@@ -25,9 +27,51 @@ class Settings(BaseSettings):
         mail_ssl_tls (bool): Enable SSL/TLS for secure email communication.
         use_credentials (bool): Flag indicating whether to use credentials for email.
         validate_certs (bool): Flag indicating whether to validate SSL certificates.
+        mail_pool_size (int, optional): Maximum number of SMTP connections a process keeps open (default is 4).
+        mail_pool_max_messages (int, optional): Number of emails sent over one SMTP connection before it is replaced (default is 100).
+        mail_timeout_seconds (int, optional): Timeout of the connection to the SMTP server and of every SMTP command (default is 10).
+        mail_pool_idle_seconds (float, optional): How long an unused SMTP connection is kept open (default is 30).
+        outbox_batch_size (int, optional): Number of emails the email worker claims at once (default is 50).
+        outbox_max_attempts (int, optional): Failed delivery attempts after which an email is dead-lettered (default is 8).
+        outbox_backoff_seconds (float, optional): Delay before the first retry of a failed email, doubled with every attempt (default is 30).
+        outbox_max_backoff_seconds (float, optional): Upper limit of the retry delay (default is 3600).
+        outbox_lease_seconds (int, optional): How long emails claimed by a worker are hidden from other workers (default is 300).
+        outbox_poll_seconds (float, optional): How long the email worker waits when the outbox is empty (default is 2).
+        outbox_retention_days (float, optional): How long sent emails are kept in the outbox (default is 30, None keeps them forever).
+        outbox_cleanup_interval_seconds (float, optional): How often the email worker deletes the sent emails past the retention (default is 3600).
+        query_log_max_queries (int, optional): Number of SQL statements above which a request is logged (default is 20).
+        query_log_max_seconds (float, optional): Total database time above which a request is logged (default is 0.5).
+        query_log_slow_seconds (float, optional): Execution time above which a single statement is logged as slow (default is 0.1).
+        query_log_repeated (int, optional): Executions of the same statement in one request logged as a possible N+1 query (default is 5).
+        profiling_enabled (bool, optional): Expose the profiling endpoints and the `X-Profile` request mode (default is False).
+        profiling_admin_emails (list[str], optional): Emails of the users allowed to profile the application (default is []).
+        profiling_max_seconds (float, optional): Longest profile the profiling endpoints record (default is 60).
+        loadtest_hook_token (str, optional): Token of the load test hook confirming users without an email, sent in the `X-Loadtest-Token` header; never set it in production (default is None, the hook is disabled).
+        request_timeout_seconds (float, optional): Time budget of a request, after which its statements are cancelled and it gets a 504 (default is 30).
+        route_timeouts (dict[str, float], optional): Time budgets of single routes by method and route template, e.g. {"GET /api/contacts/": 5} (default is {}).
+        idempotent_paths (list[str], optional): Paths whose POST requests can carry an `Idempotency-Key` header (default is ["/api/contacts/"]).
+        idempotency_ttl_seconds (int, optional): How long the response of a request with an `Idempotency-Key` is replayed to its retries (default is 86400).
+        health_check_timeout_seconds (float, optional): Time after which a readiness check fails (default is 1).
+        health_cache_seconds (float, optional): How long the result of a readiness check is reused (default is 5).
+        health_outbox_max_pending (int, optional): Pending emails above which the readiness check fails (default is None, the backlog is only reported and the check is not critical).
         redis_host (str, optional): Redis server hostname (default is "localhost").
         redis_port (int, optional): Redis server port (default is 6379).
         redis_password (str): Redis server password (default is "password").
+        redis_timeout_seconds (float, optional): Connect and read timeout of the Redis clients (default is 0.5).
+        redis_breaker_failures (int, optional): Consecutive Redis failures after which Redis is skipped (default is 5).
+        redis_breaker_reset_seconds (float, optional): How long Redis is skipped before it is tried again (default is 10).
+        avatar_storage (str, optional): Avatar storage backend, "cloudinary" or "local" (default is "cloudinary").
+        avatar_local_dir (str, optional): Directory of the "local" avatar storage (default is "static/avatars").
+        avatar_local_url (str, optional): URL prefix the "local" avatar storage is served under (default is "/static/avatars").
+        avatar_max_bytes (int, optional): Maximum size of an uploaded avatar (default is 5 MiB).
+        avatar_upload_workers (int, optional): Number of threads uploading avatars (default is 4).
+        avatar_pipeline (bool, optional): Resize avatars locally into content-addressed files, requires the "local" avatar storage and Pillow (default is False).
+        avatar_sizes (list[int], optional): Edge lengths of the resized avatars in pixels, the largest one is the user's avatar (default is [64, 128, 250]).
+        avatar_process_workers (int, optional): Number of processes resizing avatars (default is 2).
+        tracing_exporter (str, optional): OpenTelemetry span exporter, "otlp" or "file" (default is None, tracing is disabled).
+        tracing_endpoint (str, optional): OTLP/HTTP endpoint of the "otlp" exporter (default is "http://localhost:4318/v1/traces").
+        tracing_file (str, optional): File the "file" exporter appends the spans to as JSON lines (default is "traces.jsonl").
+        tracing_service_name (str, optional): Service name reported with the spans (default is "contacts-api").
         cloudinary_name (str): Cloudinary account name.
         cloudinary_api_key (str): Cloudinary API key.
         cloudinary_api_secret (str): Cloudinary API secret.
@@ -43,6 +87,8 @@ class Settings(BaseSettings):
     postgres_host: str = "localhost"
     postgres_port: int
     sqlalchemy_database_url: str
+    sqlalchemy_replica_url: str | None = None
+    read_your_writes_seconds: int = 5
     secret_key: str
     algorithm: str
     salt_length: int
@@ -56,9 +102,51 @@ class Settings(BaseSettings):
     mail_ssl_tls: bool
     use_credentials: bool
     validate_certs: bool
+    mail_pool_size: int = 4
+    mail_pool_max_messages: int = 100
+    mail_pool_idle_seconds: float = 30
+    mail_timeout_seconds: int = 10
+    outbox_batch_size: int = 50
+    outbox_max_attempts: int = 8
+    outbox_backoff_seconds: float = 30
+    outbox_max_backoff_seconds: float = 3600
+    outbox_lease_seconds: int = 300
+    outbox_poll_seconds: float = 2
+    outbox_retention_days: float | None = 30
+    outbox_cleanup_interval_seconds: float = 3600
+    query_log_max_queries: int = 20
+    query_log_max_seconds: float = 0.5
+    query_log_slow_seconds: float = 0.1
+    query_log_repeated: int = 5
+    profiling_enabled: bool = False
+    profiling_admin_emails: list[str] = []
+    profiling_max_seconds: float = 60
+    loadtest_hook_token: str | None = None
+    request_timeout_seconds: float = 30
+    route_timeouts: dict[str, float] = {}
+    idempotent_paths: list[str] = ["/api/contacts/"]
+    idempotency_ttl_seconds: int = 86400
+    health_check_timeout_seconds: float = 1
+    health_cache_seconds: float = 5
+    health_outbox_max_pending: int | None = None
     redis_host: str = "localhost"
     redis_port: int = 6379
     redis_password: str = "password"
+    redis_timeout_seconds: float = 0.5
+    redis_breaker_failures: int = 5
+    redis_breaker_reset_seconds: float = 10
+    avatar_storage: str = "cloudinary"
+    avatar_local_dir: str = "static/avatars"
+    avatar_local_url: str = "/static/avatars"
+    avatar_max_bytes: int = 5 * 1024 * 1024
+    avatar_upload_workers: int = 4
+    avatar_pipeline: bool = False
+    avatar_sizes: list[int] = [64, 128, 250]
+    avatar_process_workers: int = 2
+    tracing_exporter: str | None = None
+    tracing_endpoint: str = "http://localhost:4318/v1/traces"
+    tracing_file: str = "traces.jsonl"
+    tracing_service_name: str = "contacts-api"
     cloudinary_name: str
     cloudinary_api_key: str
     cloudinary_api_secret: str
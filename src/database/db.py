@@ -1,20 +1,35 @@
 """
-Provides a database connection and session management for the application.
+Provides the creation of the database engines of the application.
 
 The `SQLALCHEMY_DATABASE_URL` constant holds the URL for the database connection, which is loaded from the application settings.
 
-The `engine` object is a SQLAlchemy engine that manages the database connection pool.
+`create_database_engine` creates a SQLAlchemy engine that manages the database connection pool. The engines and session factories of the primary database and of the optional read-only replica (`SQLALCHEMY_REPLICA_URL`) are created on first use by `src.services.resources.resources`, nothing connects to the database when the module is imported. Sessions are used to interact with the database, such as querying, inserting, updating, and deleting data.
 
-The `SessionLocal` object is a SQLAlchemy session factory that can be used to create database sessions. Sessions are used to interact with the database, such as querying, inserting, updating, and deleting data.
+The engines are instrumented for the Prometheus metrics: every statement is timed and counted for the current request, and the pool records how long checkouts wait (see `src.database.instrumentation`). Every statement is also traced as a span of the current request (see `src.services.tracing`) and stopped at the deadline of the current request (see `src.services.deadlines`).
 """
 
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import Engine
 
 from src.conf.config import settings
+from src.database.instrumentation import TimedQueuePool, instrument_engine
+from src.services.deadlines import enforce_deadlines
+from src.services.tracing import trace_engine
 
 SQLALCHEMY_DATABASE_URL = settings.sqlalchemy_database_url
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def create_database_engine(url: str) -> Engine:
+    """
+    Creates an instrumented and traced engine enforcing the request deadlines.
+
+    Args:
+        url (str): The SQLAlchemy URL of the database.
+
+    Returns:
+        Engine: The new engine, which connects on first use.
+    """
+    # the deadline check is registered first: a statement it refuses is never timed nor traced,
+    # SQLAlchemy does not run the handle_error listeners for a before_cursor_execute listener that raises
+    engine = enforce_deadlines(create_engine(url, poolclass=TimedQueuePool))
+    return trace_engine(instrument_engine(engine))
@@ -1,3 +1,5 @@
+from typing import Iterator
+
 from src.repository.abstract_repository import (
     AbstractContactsRepository,
     AbstractUsersRepository,
@@ -5,20 +7,34 @@ from src.repository.abstract_repository import (
 
 from src.repository.contacts import PostgresContactRepository
 from src.repository.users import PostgresUserRepository
-from src.database.db import SessionLocal
+from src.services.resources import resources
+
+
+def _close(*sessions) -> None:
+    for session in sessions:
+        if session is not None:
+            session.close()
 
 
-def get_contact_repository() -> AbstractContactsRepository:
+def get_contact_repository() -> Iterator[AbstractContactsRepository]:
     """
-    Returns an instance of the PostgresContactRepository, which implements the AbstractContactsRepository interface.
-    The repository is initialized with a session from the SessionLocal database connection.
+    Yields an instance of the PostgresContactRepository, which implements the AbstractContactsRepository interface.
+    The repository is initialized with a session of the primary database and, when a replica is configured, a read-only session of the replica. The sessions are closed when the response has been sent, returning their connections to the pool.
     """
-    return PostgresContactRepository(SessionLocal())
+    session, read_session = resources.session(), resources.replica_session()
+    try:
+        yield PostgresContactRepository(session, read_session, resources.recent_writes)
+    finally:
+        _close(session, read_session)
 
 
-def get_user_repository() -> AbstractUsersRepository:
+def get_user_repository() -> Iterator[AbstractUsersRepository]:
     """
-    Returns an instance of the PostgresUserRepository, which implements the AbstractUsersRepository interface.
-    The repository is initialized with a session from the SessionLocal database connection.
+    Yields an instance of the PostgresUserRepository, which implements the AbstractUsersRepository interface.
+    The repository is initialized with a session of the primary database and, when a replica is configured, a read-only session of the replica. The sessions are closed when the response has been sent, returning their connections to the pool.
     """
-    return PostgresUserRepository(SessionLocal())
+    session, read_session = resources.session(), resources.replica_session()
+    try:
+        yield PostgresUserRepository(session, read_session, resources.recent_writes)
+    finally:
+        _close(session, read_session)
@@ -0,0 +1,272 @@
+"""
+Query statistics of the current request.
+
+`instrument_engine` times every statement an engine executes and adds it to the `QueryStats` of the current request, which the metrics and the query log middlewares read when the response is sent. The statistics live in a context variable, so they follow the request into the threads FastAPI runs synchronous dependencies in. `TimedQueuePool` measures how long a checkout waits for a free connection.
+
+`QueryLogMiddleware` logs requests that run too many statements, spend too long in the database, run a slow statement or repeat the same statement (usually an N+1 lazy load). Statements are grouped by their normalized SQL, with literals and parameters replaced by "?".
+"""
+
+import functools
+import logging
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Execution time of a single database statement.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+logger = logging.getLogger(__name__)
+
+_STRING_LITERALS = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERALS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETERS = re.compile(r"%\([^)]*\)s|%s|\$\d+")
+_PARAMETER_LISTS = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_seconds",
+    "Time to check a connection out of the pool, including waiting for a free connection.",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(statement: str) -> str:
+    """
+    Normalizes a statement so that executions differing only in their parameters are grouped together.
+
+    Args:
+        statement (str): The SQL statement.
+
+    Returns:
+        str: The statement on one line, with literals and parameters replaced by "?" and parameter lists by "?, ...".
+    """
+    statement = _STRING_LITERALS.sub("?", statement)
+    statement = _PARAMETERS.sub("?", statement)
+    statement = _NUMBER_LITERALS.sub("?", statement)
+    statement = _PARAMETER_LISTS.sub("?, ...", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+@dataclass
+class StatementStats:
+    """
+    The executions of one normalized statement during a request.
+
+    Attributes:
+        count (int): The number of executions.
+        duration (float): The total execution time in seconds.
+        max_duration (float): The longest execution time in seconds.
+    """
+
+    count: int = 0
+    duration: float = 0.0
+    max_duration: float = 0.0
+
+
+@dataclass
+class QueryStats:
+    """
+    The database statistics of one request.
+
+    Attributes:
+        count (int): The number of executed statements.
+        duration (float): The total execution time of the statements in seconds.
+        statements (dict[str, StatementStats]): The executions grouped by normalized SQL.
+    """
+
+    count: int = 0
+    duration: float = 0.0
+    statements: dict[str, StatementStats] = field(default_factory=dict)
+
+    def record(self, statement: str, duration: float) -> None:
+        """
+        Adds an executed statement to the statistics.
+
+        Args:
+            statement (str): The SQL statement.
+            duration (float): Its execution time in seconds.
+        """
+        self.count += 1
+        self.duration += duration
+        sql = normalize_sql(statement)
+        executions = self.statements.get(sql)
+        if executions is None:
+            executions = self.statements[sql] = StatementStats()
+        executions.count += 1
+        executions.duration += duration
+        executions.max_duration = max(executions.max_duration, duration)
+
+
+query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def start_query_stats() -> QueryStats:
+    """
+    Starts collecting the query statistics of the current request.
+
+    Returns:
+        QueryStats: The statistics, updated in place by every statement of the request.
+    """
+    stats = QueryStats()
+    query_stats.set(stats)
+    return stats
+
+
+def request_query_stats(scope) -> QueryStats:
+    """
+    Returns the query statistics of an HTTP request, starting them if the request has none yet. Every middleware of the request shares the same statistics.
+
+    Args:
+        scope (Scope): The ASGI scope of the request.
+
+    Returns:
+        QueryStats: The statistics of the request.
+    """
+    stats = scope.get("query_stats")
+    if stats is None:
+        stats = scope["query_stats"] = start_query_stats()
+    return stats
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _record_statement(conn, statement: str) -> None:
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+    DB_QUERY_DURATION.observe(duration)
+    stats = query_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    _record_statement(conn, statement)
+
+
+def _handle_error(context):
+    # a failed statement never reaches after_cursor_execute, it is timed and counted here;
+    # errors outside a statement (connect, fetching rows) have no timer
+    connection = context.connection
+    if connection is None or connection.invalidated:
+        return
+    if connection.info.get("query_start_time"):
+        _record_statement(connection, context.statement or "")
+
+
+def instrument_engine(engine: Engine) -> Engine:
+    """
+    Times every statement executed by the engine, including the statements that fail.
+
+    Args:
+        engine (Engine): The engine to instrument.
+
+    Returns:
+        Engine: The same engine.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    return engine
+
+
+class TimedQueuePool(QueuePool):
+    """
+    A `QueuePool` recording how long every checkout takes, including waiting for a connection when the pool is exhausted.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+class QueryLogMiddleware:
+    """
+    Logs a warning for every HTTP request whose database usage crosses one of the thresholds, with the normalized SQL of the offending statements. Every request is also logged at DEBUG level with its statement count, which the query budget test plugin relies on.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+        max_queries (int): The number of statements a request may run.
+        max_seconds (float): The total time a request may spend in the database.
+        slow_query_seconds (float): The execution time above which a single statement is slow.
+        repeated_queries (int): The number of executions of the same normalized statement reported as a possible N+1 query.
+    """
+
+    def __init__(
+        self,
+        app,
+        max_queries: int = 20,
+        max_seconds: float = 0.5,
+        slow_query_seconds: float = 0.1,
+        repeated_queries: int = 5,
+    ) -> None:
+        self.app = app
+        self.max_queries = max_queries
+        self.max_seconds = max_seconds
+        self.slow_query_seconds = slow_query_seconds
+        self.repeated_queries = repeated_queries
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = request_query_stats(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = scope.get("route")
+            path = route.path if route is not None else scope["path"]
+            self.report(f"{scope['method']} {path}", stats)
+
+    def problems(self, stats: QueryStats) -> list[str]:
+        """
+        Checks the statistics of a request against the thresholds.
+
+        Args:
+            stats (QueryStats): The statistics of the request.
+
+        Returns:
+            list[str]: A description of every crossed threshold, empty if there is none.
+        """
+        problems = []
+        if stats.count > self.max_queries:
+            problems.append(f"{stats.count} queries")
+        if stats.duration > self.max_seconds:
+            problems.append(f"{stats.duration:.3f}s in the database")
+        for sql, executions in stats.statements.items():
+            if executions.count >= self.repeated_queries:
+                problems.append(f"possible N+1, {executions.count} times: {sql}")
+            if executions.max_duration > self.slow_query_seconds:
+                problems.append(f"slow query, {executions.max_duration:.3f}s: {sql}")
+        return problems
+
+    def report(self, route: str, stats: QueryStats) -> None:
+        """
+        Logs the statistics of a finished request.
+
+        Args:
+            route (str): The method and route template of the request, e.g. "GET /api/contacts".
+            stats (QueryStats): The statistics of the request.
+        """
+        logger.debug(
+            "%s: %d queries in %.3fs",
+            route,
+            stats.count,
+            stats.duration,
+            extra={"route": route, "queries": stats.count},
+        )
+        problems = self.problems(stats)
+        if problems:
+            logger.warning("%s: %s", route, "; ".join(problems))
@@ -1,19 +1,46 @@
+from datetime import datetime
+
 from sqlalchemy import (
     Column,
     Integer,
     String,
     DateTime,
+    Date,
     JSON,
     ForeignKey,
     func,
     UniqueConstraint,
     Boolean,
+    Index,
+    text,
+    extract,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
 Base = declarative_base()
 
+OUTBOX_PENDING = "pending"
+OUTBOX_SENT = "sent"
+OUTBOX_DEAD = "dead"
+
+
+def birthday_key(birth_date):
+    """
+    Builds the SQL expression month * 100 + day of a date column, e.g. 412 for April 12.
+
+    Comparing it with the keys of a range of days finds birthdays regardless of the birth year, and the
+    expression index on it lets a single query find the birthdays of all users.
+
+    Args:
+        birth_date: The date column.
+
+    Returns:
+        ColumnElement: The birthday key expression.
+    """
+    return extract("month", birth_date) * 100 + extract("day", birth_date)
+
 
 class Contact(Base):
     """
@@ -25,8 +52,8 @@ class Contact(Base):
         last_name (str): Last name of the contact.
         email (str): Email address of the contact (unique per user).
         phone (str): Phone number of the contact (unique per user).
-        birth_date (datetime): Birth date of the contact.
-        additional_info (dict): Additional information about the contact (stored as JSON).
+        birth_date (date): Birth date of the contact.
+        additional_info (dict): Additional information about the contact (stored as JSONB on PostgreSQL).
         user_id (int): Foreign key referencing the associated user.
         user (User): Relationship to the associated user (one-to-many).
 
@@ -36,25 +63,50 @@ class Contact(Base):
     Constraints:
         - Unique constraint on (email, user_id)
         - Unique constraint on (phone, user_id)
+
+    Indexes:
+        - GIN index (jsonb_path_ops) on additional_info, used by key/value containment filters
+        - Index on (user_id, id), used by per-user lookups and keyset pagination
+        - Index on (user_id, last_name, first_name), used by the sorted contacts list
+        - Expression index on the birthday key (month * 100 + day of birth_date), used by the upcoming birthdays search
+
+    Partitioning:
+        On PostgreSQL the table can be hash-partitioned on user_id by the optional migration
+        bc04bd199c6b (`alembic -x contacts_partitions=N upgrade head`) on a new database, or in place
+        at any revision with `python partition_contacts.py --partitions N`. The primary key then becomes
+        (id, user_id); every query of the repository is already scoped by user_id.
     """
     __tablename__ = "contacts"
     __table_args__ = (
         UniqueConstraint("email", "user_id", name="unique_email_user"),
         UniqueConstraint("phone", "user_id", name="unique_phone_user"),
+        Index(
+            "ix_contacts_additional_info",
+            "additional_info",
+            postgresql_using="gin",
+            postgresql_ops={"additional_info": "jsonb_path_ops"},
+        ),
+        Index("ix_contacts_user_id_id", "user_id", "id"),
+        Index("ix_contacts_user_id_name", "user_id", "last_name", "first_name"),
     )
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     first_name = Column(String(150), nullable=False)
     last_name = Column(String(150), nullable=False)
     email = Column(String(150), nullable=False)
     phone = Column(String(50), nullable=False)
-    birth_date = Column(DateTime, nullable=False)
-    additional_info = Column(JSON, nullable=True)
+    birth_date = Column(Date, nullable=False)
+    additional_info = Column(
+        JSON().with_variant(JSONB(), "postgresql"), nullable=True
+    )
     user_id = Column(
         "user_id", ForeignKey("users.id", ondelete="CASCADE"), default=None
     )
     user = relationship("User", backref="contacts")
 
 
+Index("ix_contacts_birthday_key", birthday_key(Contact.birth_date))
+
+
 class User(Base):
     """
     Represents a user in the database.
@@ -83,3 +135,47 @@ class User(Base):
     refresh_token = Column(String(255), nullable=True)
     confirmed = Column(Boolean, default=False)
     avatar = Column(String(255), nullable=True)
+
+
+class EmailOutbox(Base):
+    """
+    Represents an email waiting in the outbox to be sent by the email worker.
+
+    Rows are written in the same transaction as the user change that triggers the email, so an email is never lost and never sent for a change that was rolled back.
+
+    Attributes:
+        id (int): Primary key for the message.
+        recipient (str): Email address of the recipient.
+        request_type (str): Type of the email (e.g. "Confirmation email", "Reset password").
+        template_body (dict): Data used to render the email template (stored as JSON).
+        status (str): "pending", "sent" or "dead" (dead-lettered after too many failed attempts).
+        attempts (int): Number of failed delivery attempts.
+        next_attempt_at (datetime): Time after which the message can be (re)tried.
+        last_error (str): Error of the last failed delivery attempt (nullable).
+        created_at (datetime): Timestamp of message creation.
+        sent_at (datetime): Timestamp of successful delivery (nullable).
+
+    Table Name:
+        "email_outbox"
+
+    Indexes:
+        - Partial index on next_attempt_at of pending messages, used by the worker to pick the next batch
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index(
+            "ix_email_outbox_pending",
+            "next_attempt_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    recipient = Column(String(150), nullable=False)
+    request_type = Column(String(50), nullable=False)
+    template_body = Column(JSON, nullable=False)
+    status = Column(String(20), nullable=False, default=OUTBOX_PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(String(500), nullable=True)
+    created_at = Column("created_at", DateTime, default=func.now())
+    sent_at = Column(DateTime, nullable=True)
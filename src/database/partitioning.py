@@ -0,0 +1,163 @@
+"""
+Hash partitioning of the `contacts` table on PostgreSQL.
+
+The conversion copies the table into a new one and swaps them in one transaction, so it can run on a database at any migration revision: the copy takes its columns and defaults from the current table (`LIKE contacts`), and the constraints and indexes are recreated from their definitions in the catalog, including those added by later revisions. Run it with `python partition_contacts.py --partitions N`, or on a new database with `alembic -x contacts_partitions=N upgrade head` (revision bc04bd199c6b).
+
+A partitioned table requires every unique constraint to contain the partition key, so the primary key becomes (id, user_id) and `user_id` becomes NOT NULL; `unique_email_user` and `unique_phone_user` already contain `user_id`. The table is locked while its rows are copied.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+PARTITIONED_PRIMARY_KEY = "PRIMARY KEY (id, user_id)"
+PRIMARY_KEY = "PRIMARY KEY (id)"
+
+
+def is_partitioned(connection: Connection) -> bool:
+    """
+    Checks whether the contacts table is partitioned.
+
+    Args:
+        connection (Connection): A connection to the PostgreSQL database.
+
+    Returns:
+        bool: True if `contacts` is a partitioned table.
+    """
+    return (
+        connection.execute(
+            text("SELECT relkind FROM pg_class WHERE oid = 'contacts'::regclass")
+        ).scalar()
+        == "p"
+    )
+
+
+def _definitions(connection: Connection) -> tuple[list[tuple[str, str]], list[str]]:
+    """
+    Reads the constraints and the indexes of the contacts table from the catalog.
+
+    Args:
+        connection (Connection): A connection to the PostgreSQL database.
+
+    Returns:
+        tuple[list[tuple[str, str]], list[str]]: The names and definitions of the unique, foreign key and check constraints, and the statements creating the indexes that back no constraint.
+    """
+    constraints = connection.execute(
+        text(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = 'contacts'::regclass AND contype IN ('u', 'f', 'c') "
+            "ORDER BY conname"
+        )
+    ).all()
+    indexes = connection.execute(
+        text(
+            "SELECT pg_get_indexdef(indexrelid) FROM pg_index "
+            "WHERE indrelid = 'contacts'::regclass AND NOT EXISTS "
+            "(SELECT 1 FROM pg_constraint WHERE conindid = indexrelid) "
+            "ORDER BY indexrelid"
+        )
+    ).scalars()
+    return [tuple(constraint) for constraint in constraints], list(indexes)
+
+
+def _swap_tables(connection: Connection, new_table: str, primary_key: str) -> None:
+    """
+    Copies all contacts into `new_table`, replaces the `contacts` table with it and recreates the constraints and indexes, keeping the id sequence.
+    """
+    referencing = connection.execute(
+        text(
+            "SELECT count(*) FROM pg_constraint "
+            "WHERE confrelid = 'contacts'::regclass AND conrelid <> 'contacts'::regclass"
+        )
+    ).scalar()
+    if referencing:
+        raise RuntimeError(
+            f"Cannot convert contacts: {referencing} foreign keys of other tables reference it"
+        )
+    constraints, indexes = _definitions(connection)
+    sequence = connection.execute(
+        text("SELECT pg_get_serial_sequence('contacts', 'id')")
+    ).scalar()
+    connection.execute(text("LOCK TABLE contacts IN EXCLUSIVE MODE"))
+    connection.execute(text(f"INSERT INTO {new_table} SELECT * FROM contacts"))
+    connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+    connection.execute(text("DROP TABLE contacts"))
+    connection.execute(text(f"ALTER TABLE {new_table} RENAME TO contacts"))
+    connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY contacts.id"))
+    connection.execute(
+        text(f"ALTER TABLE contacts ADD CONSTRAINT contacts_pkey {primary_key}")
+    )
+    for name, definition in constraints:
+        connection.execute(
+            text(f'ALTER TABLE contacts ADD CONSTRAINT "{name}" {definition}')
+        )
+    for index in indexes:
+        connection.execute(text(index))
+    connection.execute(text("ANALYZE contacts"))
+
+
+def partition_contacts(connection: Connection, partitions: int) -> bool:
+    """
+    Converts the contacts table into a table hash-partitioned on `user_id`, in the transaction of the connection.
+
+    Args:
+        connection (Connection): A connection to the PostgreSQL database.
+        partitions (int): The number of partitions.
+
+    Returns:
+        bool: True if the table was converted, False if it already was partitioned.
+
+    Raises:
+        ValueError: If the number of partitions is not positive.
+        RuntimeError: If a contact has no user.
+    """
+    if partitions < 1:
+        raise ValueError("The number of partitions must be a positive number")
+    if is_partitioned(connection):
+        return False
+    orphans = connection.execute(
+        text("SELECT count(*) FROM contacts WHERE user_id IS NULL")
+    ).scalar()
+    if orphans:
+        raise RuntimeError(
+            f"Cannot partition contacts: {orphans} contacts have no user_id"
+        )
+    connection.execute(
+        text(
+            "CREATE TABLE contacts_partitioned (LIKE contacts INCLUDING DEFAULTS) "
+            "PARTITION BY HASH (user_id)"
+        )
+    )
+    connection.execute(
+        text("ALTER TABLE contacts_partitioned ALTER COLUMN user_id SET NOT NULL")
+    )
+    for remainder in range(partitions):
+        connection.execute(
+            text(
+                f"CREATE TABLE contacts_p{remainder:03d} PARTITION OF contacts_partitioned "
+                f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+            )
+        )
+    _swap_tables(connection, "contacts_partitioned", PARTITIONED_PRIMARY_KEY)
+    return True
+
+
+def unpartition_contacts(connection: Connection) -> bool:
+    """
+    Converts a partitioned contacts table back into a plain table, in the transaction of the connection.
+
+    Args:
+        connection (Connection): A connection to the PostgreSQL database.
+
+    Returns:
+        bool: True if the table was converted, False if it was not partitioned.
+    """
+    if not is_partitioned(connection):
+        return False
+    connection.execute(
+        text("CREATE TABLE contacts_unpartitioned (LIKE contacts INCLUDING DEFAULTS)")
+    )
+    connection.execute(
+        text("ALTER TABLE contacts_unpartitioned ALTER COLUMN user_id DROP NOT NULL")
+    )
+    _swap_tables(connection, "contacts_unpartitioned", PRIMARY_KEY)
+    return True
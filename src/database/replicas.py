@@ -0,0 +1,83 @@
+"""
+Read-your-writes support for routing reads to a read-only replica.
+
+Replicas lag behind the primary, so a user who has just created or changed something could read stale data from a replica. Every write marks the user in Redis for `read_your_writes_seconds`; while the marker exists, the user's reads are routed to the primary. While Redis is unavailable all reads go to the primary.
+"""
+
+import logging
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+
+class RecentWrites:
+    """
+    Short-lived per-user "recent write" markers kept in Redis.
+    """
+
+    KEY_PREFIX = "recent_write"
+
+    def __init__(self, redis: Redis, ttl: int, breaker=None) -> None:
+        """
+        Initializes the markers store.
+
+        Args:
+            redis (Redis): The Redis client used to store the markers.
+            ttl (int): How long (in seconds) a marker lives.
+            breaker (CircuitBreaker, optional): The circuit breaker of the Redis server, Redis is not called while it is open (default is None).
+        """
+        self._redis = redis
+        self._ttl = ttl
+        self._breaker = breaker
+
+    def _allow(self) -> bool:
+        return self._breaker is None or self._breaker.allow()
+
+    def _record_success(self) -> None:
+        if self._breaker is not None:
+            self._breaker.record_success()
+
+    def _record_failure(self) -> None:
+        if self._breaker is not None:
+            self._breaker.record_failure()
+
+    def mark(self, user_key: str) -> None:
+        """
+        Marks a user as having written recently.
+
+        Args:
+            user_key (str): The key identifying the user (the user's email).
+        """
+        if not self._allow():
+            return
+        try:
+            self._redis.set(f"{self.KEY_PREFIX}:{user_key}", 1, ex=self._ttl)
+        except RedisError:
+            logger.warning("Cannot mark the recent write", exc_info=True)
+            self._record_failure()
+        else:
+            self._record_success()
+
+    def is_recent(self, user_key: str) -> bool:
+        """
+        Checks whether a user has written recently.
+
+        Args:
+            user_key (str): The key identifying the user (the user's email).
+
+        Returns:
+            bool: True if the user has written recently or Redis cannot be asked, False otherwise.
+        """
+        if not self._allow():
+            return True
+        try:
+            recent = bool(self._redis.exists(f"{self.KEY_PREFIX}:{user_key}"))
+        except RedisError:
+            # without the marker we cannot prove the replica is fresh enough, so use the primary
+            logger.warning("Cannot read the recent write marker", exc_info=True)
+            self._record_failure()
+            return True
+        self._record_success()
+        return recent
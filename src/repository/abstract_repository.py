@@ -1,6 +1,6 @@
 import abc
 
-from src.schemas import ContactIn, ContactOut, UserIn, UserOut
+from src.schemas import ContactIn, ContactOut, UserIn, UserOut, OutboxEmail
 
 
 class AbstractContactsRepository(abc.ABC):
@@ -17,6 +17,8 @@ class AbstractContactsRepository(abc.ABC):
         search_email: str,
         upcoming_birthdays: bool,
         user: UserOut,
+        search_phone: str | None = None,
+        info_filters: dict[str, str] | None = None,
     ) -> list[ContactOut]:
         """
         Get a list of contacts that match the given search criteria and belong to the specified user.
@@ -26,6 +28,8 @@ class AbstractContactsRepository(abc.ABC):
             search_email (str): The email to search for in the contacts.
             upcoming_birthdays (bool): If True, only return contacts with upcoming birthdays.
             user (UserOut): The user whose contacts should be returned.
+            search_phone (str, optional): The phone number to search for in the contacts.
+            info_filters (dict[str, str], optional): Key/value pairs the contact's additional info must contain.
 
         Returns:
             list[ContactOut]: A list of contacts matching the search criteria and belonging to the specified user.
@@ -117,13 +121,16 @@ class AbstractUsersRepository(abc.ABC):
         pass
 
     @abc.abstractmethod
-    async def create_user(self, user: UserIn, salt: str) -> UserOut:
+    async def create_user(
+        self, user: UserIn, salt: str, outbox_email: OutboxEmail | None = None
+    ) -> UserOut:
         """
         Creates a new user with the provided user data and salt.
 
         Args:
             user (UserIn): The user data to create the new user with.
             salt (str): The salt to use when hashing the user's password.
+            outbox_email (OutboxEmail, optional): An email to queue in the outbox in the same transaction as the new user.
 
         Returns:
             UserOut: The newly created user.
@@ -185,3 +192,101 @@ class AbstractUsersRepository(abc.ABC):
             UserOut: The updated user object with the new password.
         """
         pass
+
+    @abc.abstractmethod
+    async def enqueue_email(self, outbox_email: OutboxEmail) -> None:
+        """
+        Queues an email in the outbox to be sent by the email worker.
+
+        Args:
+            outbox_email (OutboxEmail): The email to queue.
+
+        Returns:
+            None
+        """
+        pass
+
+
+class AbstractOutboxRepository(abc.ABC):
+    """
+    Defines an abstract base class for the email outbox repository used by the email worker. This class provides the interface for claiming a batch of due emails and recording the result of their delivery.
+    """
+
+    @abc.abstractmethod
+    async def claim_batch(self, limit: int, lease_seconds: int) -> list:
+        """
+        Claims up to `limit` pending emails that are due, so no other worker picks them up for `lease_seconds`.
+
+        Args:
+            limit (int): The maximum number of emails to claim.
+            lease_seconds (int): How long the claimed emails are hidden from other workers.
+
+        Returns:
+            list[EmailOutbox]: The claimed emails.
+        """
+        pass
+
+    @abc.abstractmethod
+    async def mark_sent(self, message) -> None:
+        """
+        Records a successful delivery.
+
+        Args:
+            message (EmailOutbox): The delivered email.
+
+        Returns:
+            None
+        """
+        pass
+
+    @abc.abstractmethod
+    async def mark_failed(
+        self, message, error: str, max_attempts: int, retry_in_seconds: float
+    ) -> None:
+        """
+        Records a failed delivery, scheduling a retry or dead-lettering the email.
+
+        Args:
+            message (EmailOutbox): The email that could not be delivered.
+            error (str): The delivery error.
+            max_attempts (int): The number of attempts after which the email is dead-lettered.
+            retry_in_seconds (float): The delay before the next attempt.
+
+        Returns:
+            None
+        """
+        pass
+
+    @abc.abstractmethod
+    async def delete_sent(self, before, limit: int) -> int:
+        """
+        Deletes up to `limit` emails delivered before the given time.
+
+        Args:
+            before (datetime): The delivery time before which the sent emails are deleted.
+            limit (int): The maximum number of emails to delete.
+
+        Returns:
+            int: The number of deleted emails.
+        """
+        pass
+
+    @abc.abstractmethod
+    async def commit(self) -> None:
+        """
+        Commits the delivery results recorded for the batch, or the deleted emails.
+
+        Returns:
+            None
+        """
+        pass
+
+    @abc.abstractmethod
+    async def close(self) -> None:
+        """
+        Releases the resources (e.g. the database session) held by the repository.
+
+        Returns:
+            None
+        """
+        pass
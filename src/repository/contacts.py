@@ -1,13 +1,44 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 
 from fastapi import HTTPException, status
-from sqlalchemy import and_
+from sqlalchemy import and_, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import IntegrityError
+
+from pydantic_core import PydanticCustomError
 
 from src.repository.abstract_repository import AbstractContactsRepository
 from src.database.models import Contact
 from src.schemas import ContactOut, ContactIn, UserOut, UserIn
+from src.services.birthdays import upcoming_birthdays_condition
+from src.services.normalization import normalize_phone
+from src.services.tracing import trace_methods, tracer
+
 
+def _conflict(error: IntegrityError) -> HTTPException:
+    """
+    Turns the violation of a unique constraint of the contacts into a 409 response.
+
+    Args:
+        error (IntegrityError): The error raised when the changes were flushed.
 
+    Returns:
+        HTTPException: The 409 exception naming the conflicting field.
+    """
+    message = str(error.orig)
+    # PostgreSQL names the constraint, SQLite the columns
+    field = (
+        "phone"
+        if "unique_phone_user" in message or "contacts.phone" in message
+        else "email"
+    )
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Contact with this {field} already exists",
+    )
+
+
+@trace_methods
 class PostgresContactRepository(AbstractContactsRepository):
     """
     Concrete implementation of the Contacts repository.
@@ -16,15 +47,46 @@ class PostgresContactRepository(AbstractContactsRepository):
         AbstractContactsRepository (AbstractContactsRepository): Abstract base class for the Contacts repository.
     """
 
-    def __init__(self, session):
+    def __init__(self, session, read_session=None, recent_writes=None):
         """
         Initializes the PostgresContactRepository with the provided database session.
 
         Args:
             session (sqlalchemy.orm.Session): The database session to use for database operations.
+            read_session (sqlalchemy.orm.Session, optional): The read-only replica session used for reads (default is None, reads use `session`).
+            recent_writes (RecentWrites, optional): The per-user "recent write" markers; reads of a user who has just written go to `session`.
         """
 
         self._session = session
+        self._read_session = read_session
+        self._recent_writes = recent_writes
+
+    def _reader(self, user: UserOut):
+        """
+        Returns the session that should serve a read for the given user.
+
+        Args:
+            user (UserOut): The user whose contacts are read.
+
+        Returns:
+            sqlalchemy.orm.Session: The replica session, or the primary session if there is no replica or the user has written recently.
+        """
+        if self._read_session is None or (
+            self._recent_writes is not None
+            and self._recent_writes.is_recent(user.email)
+        ):
+            return self._session
+        return self._read_session
+
+    def _mark_write(self, user: UserOut) -> None:
+        """
+        Marks the user as having written recently, so their next reads see their own writes.
+
+        Args:
+            user (UserOut): The user who has written.
+        """
+        if self._recent_writes is not None:
+            self._recent_writes.mark(user.email)
 
     async def get_contacts(
         self,
@@ -32,6 +94,8 @@ class PostgresContactRepository(AbstractContactsRepository):
         search_email: str,
         upcoming_birthdays: bool,
         user: UserOut,
+        search_phone: str | None = None,
+        info_filters: dict[str, str] | None = None,
     ) -> list[ContactOut]:
         """
         Retrieves a list of contacts based on the provided search parameters.
@@ -41,17 +105,24 @@ class PostgresContactRepository(AbstractContactsRepository):
             search_email (str): The email to search for in the contacts.
             upcoming_birthdays (bool): Whether to retrieve contacts with upcoming birthdays.
             user (UserOut): The user whose contacts to retrieve.
+            search_phone (str, optional): The phone number to search for, normalized the same way as stored phone numbers.
+            info_filters (dict[str, str], optional): Key/value pairs the contact's additional info must contain, combined with any other search parameter.
 
         Returns:
-            list[ContactOut]: A list of contacts matching the search parameters.
+            list[ContactOut]: A list of contacts matching the search parameters, sorted by last and first name.
 
         Raises:
-            HTTPException: If more than one search parameter is provided.
+            HTTPException: If more than one search parameter is provided or the phone number is not valid.
         """
         if (
             sum(
                 param is not None
-                for param in [search_name, search_email, upcoming_birthdays]
+                for param in [
+                    search_name,
+                    search_email,
+                    upcoming_birthdays,
+                    search_phone,
+                ]
             )
             > 1
         ):
@@ -59,59 +130,51 @@ class PostgresContactRepository(AbstractContactsRepository):
                 status_code=400,
                 detail="You can only search by one parameter at a time.",
             )
+        conditions = [Contact.user_id == user.id]
+        if info_filters:
+            # a single `@>` containment check is answered by the jsonb_path_ops GIN index
+            conditions.append(
+                type_coerce(Contact.additional_info, JSONB).contains(info_filters)
+            )
         if search_name:
-            contacts = (
-                self._session.query(Contact)
-                .filter(
-                    and_(
-                        Contact.user_id == user.id,
-                        Contact.first_name.ilike(f"%{search_name}%")
-                        | Contact.last_name.ilike(f"%{search_name}%"),
-                    )
-                )
-                .all()
+            conditions.append(
+                Contact.first_name.ilike(f"%{search_name}%")
+                | Contact.last_name.ilike(f"%{search_name}%")
             )
         elif search_email:
-            contacts = (
-                self._session.query(Contact)
-                .filter(
-                    and_(
-                        Contact.email.ilike(f"%{search_email}%"),
-                        Contact.user_id == user.id,
-                    )
+            conditions.append(Contact.email.ilike(f"%{search_email}%"))
+        elif search_phone:
+            try:
+                phone = normalize_phone(search_phone)
+            except PydanticCustomError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid phone number",
                 )
-                .all()
-            )
+            conditions.append(Contact.phone == phone)
         elif upcoming_birthdays:
-            today = datetime.now().date()
-            next_week = today + timedelta(days=7)
-            contacts_to_check = (
-                self._session.query(Contact).filter(Contact.user_id == user.id).all()
-            )
-            contacts = []
-            for contact in contacts_to_check:
-                if (
-                    today
-                    <= contact.birth_date.replace(year=today.year).date()
-                    <= next_week
-                ):
-                    contacts.append(contact)
-        else:
-            contacts = (
-                self._session.query(Contact).filter(Contact.user_id == user.id).all()
-            )
-        return [
-            ContactOut(
-                id=contact.id,
-                first_name=contact.first_name,
-                last_name=contact.last_name,
-                email=contact.email,
-                phone=contact.phone,
-                birth_date=contact.birth_date,
-                additional_info=contact.additional_info,
-            )
-            for contact in contacts
-        ]
+            conditions.append(upcoming_birthdays_condition(datetime.now().date()))
+        contacts = (
+            self._reader(user)
+            .query(Contact)
+            .filter(and_(*conditions))
+            .order_by(Contact.last_name, Contact.first_name, Contact.id)
+            .all()
+        )
+        with tracer.start_as_current_span("build ContactOut") as span:
+            span.set_attribute("contacts.count", len(contacts))
+            return [
+                ContactOut(
+                    id=contact.id,
+                    first_name=contact.first_name,
+                    last_name=contact.last_name,
+                    email=contact.email,
+                    phone=contact.phone,
+                    birth_date=contact.birth_date,
+                    additional_info=contact.additional_info,
+                )
+                for contact in contacts
+            ]
 
     async def get_contact(self, contact_id: int, user: UserOut) -> ContactOut:
         """
@@ -128,7 +191,8 @@ class PostgresContactRepository(AbstractContactsRepository):
             HTTPException: If the contact is not found.
         """
         contact = (
-            self._session.query(Contact)
+            self._reader(user)
+            .query(Contact)
             .filter(and_(Contact.id == contact_id, Contact.user_id == user.id))
             .first()
         )
@@ -157,6 +221,9 @@ class PostgresContactRepository(AbstractContactsRepository):
 
         Returns:
             ContactOut: The created contact.
+
+        Raises:
+            HTTPException: 409 if the user already has a contact with the same email or phone.
         """
         contact = Contact(
             first_name=contact.first_name,
@@ -167,8 +234,14 @@ class PostgresContactRepository(AbstractContactsRepository):
             additional_info=contact.additional_info,
             user_id=user.id,
         )
-        self._session.add(contact)
+        # a violated constraint only rolls back to the savepoint
+        try:
+            with self._session.begin_nested():
+                self._session.add(contact)
+        except IntegrityError as e:
+            raise _conflict(e)
         self._session.commit()
+        self._mark_write(user)
         self._session.refresh(contact)
         return ContactOut(
             id=contact.id,
@@ -196,7 +269,7 @@ class PostgresContactRepository(AbstractContactsRepository):
             ContactOut: The updated contact.
 
         Raises:
-            HTTPException: If the contact is not found.
+            HTTPException: 404 if the contact is not found, 409 if the user already has another contact with the same email or phone.
         """
         changed_contact = (
             self._session.query(Contact)
@@ -207,13 +280,18 @@ class PostgresContactRepository(AbstractContactsRepository):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found"
             )
-        changed_contact.first_name = contact.first_name
-        changed_contact.last_name = contact.last_name
-        changed_contact.email = contact.email
-        changed_contact.phone = contact.phone
-        changed_contact.birth_date = contact.birth_date
-        changed_contact.additional_info = contact.additional_info
+        try:
+            with self._session.begin_nested():
+                changed_contact.first_name = contact.first_name
+                changed_contact.last_name = contact.last_name
+                changed_contact.email = contact.email
+                changed_contact.phone = contact.phone
+                changed_contact.birth_date = contact.birth_date
+                changed_contact.additional_info = contact.additional_info
+        except IntegrityError as e:
+            raise _conflict(e)
         self._session.commit()
+        self._mark_write(user)
         self._session.refresh(changed_contact)
         return ContactOut(
             id=changed_contact.id,
@@ -251,6 +329,7 @@ class PostgresContactRepository(AbstractContactsRepository):
             )
         self._session.delete(contact)
         self._session.commit()
+        self._mark_write(user)
         return ContactOut(
             id=contact.id,
             first_name=contact.first_name,
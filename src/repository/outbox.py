@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from src.repository.abstract_repository import AbstractOutboxRepository
+from src.database.models import EmailOutbox, OUTBOX_PENDING, OUTBOX_SENT, OUTBOX_DEAD
+
+
+class PostgresOutboxRepository(AbstractOutboxRepository):
+    """
+    Concrete implementation of the email outbox repository.
+
+    Args:
+        AbstractOutboxRepository (AbstractOutboxRepository): Abstract base class for the email outbox repository.
+    """
+
+    def __init__(self, session):
+        """
+        Initializes the PostgresOutboxRepository with the provided database session.
+
+        Args:
+            session (sqlalchemy.orm.Session): The database session to use for database operations.
+        """
+        self._session = session
+
+    async def claim_batch(self, limit: int, lease_seconds: int) -> list[EmailOutbox]:
+        """
+        Claims up to `limit` pending emails that are due.
+
+        The rows are locked with `FOR UPDATE SKIP LOCKED`, so concurrent workers never claim the same email, and their `next_attempt_at` is moved `lease_seconds` into the future before the lock is released. If the worker dies while sending, the emails become due again when the lease expires. The commit does not expire the claimed emails: they belong to this worker until the lease expires, and reloading them would cost a SELECT per email.
+
+        Args:
+            limit (int): The maximum number of emails to claim.
+            lease_seconds (int): How long the claimed emails are hidden from other workers.
+
+        Returns:
+            list[EmailOutbox]: The claimed emails, oldest first.
+        """
+        now = datetime.utcnow()
+        messages = (
+            self._session.query(EmailOutbox)
+            .filter(
+                EmailOutbox.status == OUTBOX_PENDING,
+                EmailOutbox.next_attempt_at <= now,
+            )
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        for message in messages:
+            message.next_attempt_at = now + timedelta(seconds=lease_seconds)
+        expire_on_commit = self._session.expire_on_commit
+        self._session.expire_on_commit = False
+        try:
+            self._session.commit()
+        finally:
+            self._session.expire_on_commit = expire_on_commit
+        return messages
+
+    async def mark_sent(self, message: EmailOutbox) -> None:
+        """
+        Records a successful delivery.
+
+        Args:
+            message (EmailOutbox): The delivered email.
+
+        Returns:
+            None
+        """
+        message.status = OUTBOX_SENT
+        message.sent_at = datetime.utcnow()
+        message.last_error = None
+
+    async def mark_failed(
+        self,
+        message: EmailOutbox,
+        error: str,
+        max_attempts: int,
+        retry_in_seconds: float,
+    ) -> None:
+        """
+        Records a failed delivery, scheduling a retry or dead-lettering the email after `max_attempts` attempts.
+
+        Args:
+            message (EmailOutbox): The email that could not be delivered.
+            error (str): The delivery error.
+            max_attempts (int): The number of attempts after which the email is dead-lettered.
+            retry_in_seconds (float): The delay before the next attempt.
+
+        Returns:
+            None
+        """
+        message.attempts += 1
+        message.last_error = error[:500]
+        if message.attempts >= max_attempts:
+            message.status = OUTBOX_DEAD
+        else:
+            message.next_attempt_at = datetime.utcnow() + timedelta(
+                seconds=retry_in_seconds
+            )
+
+    async def delete_sent(self, before: datetime, limit: int) -> int:
+        """
+        Deletes up to `limit` emails delivered before the given time, oldest first. Pending and dead emails are kept.
+
+        Args:
+            before (datetime): The delivery time before which the sent emails are deleted.
+            limit (int): The maximum number of emails to delete.
+
+        Returns:
+            int: The number of deleted emails.
+        """
+        expired = (
+            select(EmailOutbox.id)
+            .where(EmailOutbox.status == OUTBOX_SENT, EmailOutbox.sent_at < before)
+            .order_by(EmailOutbox.id)
+            .limit(limit)
+        )
+        return (
+            self._session.query(EmailOutbox)
+            .filter(EmailOutbox.id.in_(expired))
+            .delete(synchronize_session=False)
+        )
+
+    async def commit(self) -> None:
+        """
+        Commits the delivery results recorded for the batch, or the deleted emails.
+
+        Returns:
+            None
+        """
+        self._session.commit()
+
+    async def close(self) -> None:
+        """
+        Closes the database session.
+
+        Returns:
+            None
+        """
+        self._session.close()
@@ -1,11 +1,12 @@
 from fastapi import HTTPException, status
-from libgravatar import Gravatar
 
 from src.repository.abstract_repository import AbstractUsersRepository
-from src.schemas import UserOut, UserIn
-from src.database.models import User
+from src.schemas import UserOut, UserIn, OutboxEmail
+from src.database.models import User, EmailOutbox
+from src.services.tracing import trace_methods
 
 
+@trace_methods
 class PostgresUserRepository(AbstractUsersRepository):
     """
     Concrete implementation of the Users repository.
@@ -14,39 +15,85 @@ class PostgresUserRepository(AbstractUsersRepository):
         AbstractUsersRepository (AbstractUsersRepository): Abstract base class for the Users repository.
     """
 
-    def __init__(self, session):
+    def __init__(self, session, read_session=None, recent_writes=None):
         """
         Initialize the PostgresUserRepository with an active database session.
 
         Args:
             session (SessionLocal): session object for the database.
+            read_session (ReplicaSessionLocal, optional): read-only replica session used for reads (default is None, reads use `session`).
+            recent_writes (RecentWrites, optional): per-user "recent write" markers; reads of a user who has just written go to `session`.
         """
         self._session = session
+        self._read_session = read_session
+        self._recent_writes = recent_writes
+
+    def _get_user(self, email: str, session=None) -> User | None:
+        """
+        Loads a user by email, from the primary session unless another session is given.
+
+        Args:
+            email (str): The email address of the user to load.
+            session (Session, optional): The session to query (default is the primary session).
+
+        Returns:
+            User | None: The user object if found, otherwise `None`.
+        """
+        session = session if session is not None else self._session
+        return session.query(User).filter(User.email == email).first()
+
+    def _mark_write(self, email: str) -> None:
+        """
+        Marks the user as having written recently, so their next reads see their own writes.
+
+        Args:
+            email (str): The email address of the user who has written.
+        """
+        if self._recent_writes is not None:
+            self._recent_writes.mark(email)
+
+    @staticmethod
+    def _outbox_message(outbox_email: OutboxEmail) -> EmailOutbox:
+        return EmailOutbox(
+            recipient=outbox_email.recipient,
+            request_type=outbox_email.request_type,
+            template_body=outbox_email.template_body,
+        )
 
     async def get_user_by_email(self, email: str) -> UserOut | None:
         """
         Retrieves a user by their email address.
 
+        The user is read from the replica, if one is configured and the user has not written recently.
+
         Args:
             email (str): The email address of the user to retrieve.
 
         Returns:
             UserOut | None: The user object if found, otherwise `None`.
         """
-        user = self._session.query(User).filter(User.email == email).first()
-        return user
-
-    async def create_user(self, user: UserIn, salt: str) -> UserOut:
+        if self._read_session is None or (
+            self._recent_writes is not None and self._recent_writes.is_recent(email)
+        ):
+            return self._get_user(email)
+        return self._get_user(email, self._read_session)
+
+    async def create_user(
+        self, user: UserIn, salt: str, outbox_email: OutboxEmail | None = None
+    ) -> UserOut:
         """
         Creates a new user in the database.
 
         Args:
             user (UserIn): The user data to create the new user.
             salt (str): The salt to be used for hashing the user's password.
+            outbox_email (OutboxEmail, optional): An email queued in the outbox in the same transaction as the new user.
 
         Returns:
             UserOut: The created user object.
         """
+        from libgravatar import Gravatar
+
         avatar = None
         try:
             gravatar = Gravatar(user.email)
@@ -61,7 +108,10 @@ class PostgresUserRepository(AbstractUsersRepository):
             avatar=avatar,
         )
         self._session.add(new_user)
+        if outbox_email is not None:
+            self._session.add(self._outbox_message(outbox_email))
         self._session.commit()
+        self._mark_write(new_user.email)
         self._session.refresh(new_user)
         return UserOut(
             id=new_user.id,
@@ -84,8 +134,12 @@ class PostgresUserRepository(AbstractUsersRepository):
         Returns:
             None
         """
+        if self._read_session is not None:
+            # the user may have been read from the replica, change the primary's copy
+            user = self._get_user(user.email)
         user.refresh_token = token
         self._session.commit()
+        self._mark_write(user.email)
 
     async def confirm_email(self, email: str) -> None:
         """
@@ -100,7 +154,7 @@ class PostgresUserRepository(AbstractUsersRepository):
         Returns:
             None
         """
-        user = await self.get_user_by_email(email)
+        user = self._get_user(email)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -108,6 +162,7 @@ class PostgresUserRepository(AbstractUsersRepository):
             )
         user.confirmed = True
         self._session.commit()
+        self._mark_write(email)
 
     async def update_avatar(self, email: str, avatar_url: str) -> UserOut:
         """
@@ -123,7 +178,7 @@ class PostgresUserRepository(AbstractUsersRepository):
         Returns:
             UserOut: The updated user object with the new avatar.
         """
-        user = await self.get_user_by_email(email)
+        user = self._get_user(email)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -131,6 +186,7 @@ class PostgresUserRepository(AbstractUsersRepository):
             )
         user.avatar = avatar_url
         self._session.commit()
+        self._mark_write(email)
         return UserOut(
             id=user.id,
             username=user.username,
@@ -156,7 +212,21 @@ class PostgresUserRepository(AbstractUsersRepository):
         Returns:
             None
         """
-        user = await self.get_user_by_email(email)
+        user = self._get_user(email)
         user.password = password
         user.salt = salt
         self._session.commit()
+        self._mark_write(email)
+
+    async def enqueue_email(self, outbox_email: OutboxEmail) -> None:
+        """
+        Queues an email in the outbox, it is sent later by the email worker.
+
+        Args:
+            outbox_email (OutboxEmail): The email to queue.
+
+        Returns:
+            None
+        """
+        self._session.add(self._outbox_message(outbox_email))
+        self._session.commit()
@@ -4,7 +4,6 @@ from fastapi import (
     Security,
     Depends,
     status,
-    BackgroundTasks,
     Request,
 )
 from fastapi.security import (
@@ -14,11 +13,11 @@ from fastapi.security import (
 )
 from fastapi_limiter.depends import RateLimiter
 
-from src.schemas import UserIn, UserCreated, TokenModel, RequestEmail
+from src.schemas import UserIn, UserCreated, TokenModel, RequestEmail, OutboxEmail
 from src.repository.abstract_repository import AbstractUsersRepository
 from src.database.dependencies import get_user_repository
 from src.services.auth import auth_service
-from src.services.email import send_email
+from src.services.email import CONFIRMATION_EMAIL, RESET_PASSWORD
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 security = HTTPBearer()
@@ -33,7 +32,6 @@ security = HTTPBearer()
 )
 async def signup(
     body: UserIn,
-    background_tasks: BackgroundTasks,
     request: Request,
     user_repo: AbstractUsersRepository = Depends(get_user_repository),
 ):
@@ -42,7 +40,6 @@ async def signup(
 
     Args:
         body (UserIn): The user data to create a new user.
-        background_tasks (BackgroundTasks): Used to send the confirmation email in the background.
         request (Request): The current HTTP request.
         user_repo (AbstractUsersRepository): The repository to interact with the user data.
 
@@ -58,11 +55,12 @@ async def signup(
             detail=f"User with email: {body.email} already exists",
         )
     body.password, salt = auth_service.get_password_hash(body.password)
-    user = await user_repo.create_user(body, salt)
-    request_type = "Confirmation email"
-    background_tasks.add_task(
-        send_email, user.email, user.username, request_type, request.base_url
+    confirmation_email = OutboxEmail(
+        recipient=body.email,
+        request_type=CONFIRMATION_EMAIL,
+        template_body={"username": body.username, "host": str(request.base_url)},
     )
+    user = await user_repo.create_user(body, salt, confirmation_email)
     return {"user": user, "detail": "User successfully created"}
 
 
@@ -200,7 +198,6 @@ async def confirm_email(
 )
 async def request_email(
     body: RequestEmail,
-    background_tasks: BackgroundTasks,
     request: Request,
     user_repo: AbstractUsersRepository = Depends(get_user_repository),
 ) -> dict:
@@ -209,7 +206,6 @@ async def request_email(
 
     Args:
         body (RequestEmail): The request body containing the user's email.
-        background_tasks (BackgroundTasks): The background task scheduler to send the email.
         request (Request): The current HTTP request.
         user_repo (AbstractUsersRepository): The repository to interact with the user data.
 
@@ -225,9 +221,15 @@ async def request_email(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Email already confirmed"
         )
     if user:
-        request_type = "Confirmation email"
-        background_tasks.add_task(
-            send_email, user.email, user.username, request_type, request.base_url
+        await user_repo.enqueue_email(
+            OutboxEmail(
+                recipient=user.email,
+                request_type=CONFIRMATION_EMAIL,
+                template_body={
+                    "username": user.username,
+                    "host": str(request.base_url),
+                },
+            )
         )
     return {
         "message": "If the email address was in our database, we sent an email with a confirmation link."
@@ -241,7 +243,6 @@ async def request_email(
 )
 async def request_password_reset(
     body: RequestEmail,
-    background_tasks: BackgroundTasks,
     request: Request,
     user_repo: AbstractUsersRepository = Depends(get_user_repository),
 ) -> dict:
@@ -250,7 +251,6 @@ async def request_password_reset(
 
     Args:
         body (RequestEmail): The request body containing the user's email.
-        background_tasks (BackgroundTasks): The background task scheduler to send the email.
         request (Request): The current HTTP request.
         user_repo (AbstractUsersRepository): The repository to interact with the user data.
 
@@ -270,9 +270,15 @@ async def request_password_reset(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Email not confirmed"
         )
     if user:
-        request_type = "Reset password"
-        background_tasks.add_task(
-            send_email, user.email, user.username, request_type, request.base_url
+        await user_repo.enqueue_email(
+            OutboxEmail(
+                recipient=user.email,
+                request_type=RESET_PASSWORD,
+                template_body={
+                    "username": user.username,
+                    "host": str(request.base_url),
+                },
+            )
         )
     return {
         "message": "If the email address was in our database, we sent an email with link to reset password"
@@ -1,8 +1,8 @@
 from typing import List
-from fastapi import APIRouter, Depends, status, Query, Path
-from fastapi_limiter.depends import RateLimiter
+from fastapi import APIRouter, Depends, status, Query, Path, Request
 
 from src.services.auth import auth_service
+from src.services.rate_limit import FallbackRateLimiter
 from src.schemas import ContactIn, ContactOut, UserOut
 from src.repository.abstract_repository import (
     AbstractContactsRepository,
@@ -11,20 +11,41 @@ from src.database.dependencies import get_contact_repository
 
 router = APIRouter(prefix="/contacts", tags=["contacts"])
 
+INFO_FILTER_PREFIX = "info."
+
+
+def get_info_filters(request: Request) -> dict[str, str]:
+    """
+    Collects the `info.<key>=<value>` query parameters used to filter contacts by their additional info.
+
+    Args:
+        request (Request): The current HTTP request.
+
+    Returns:
+        dict[str, str]: The additional info key/value pairs the contacts must contain.
+    """
+    return {
+        name[len(INFO_FILTER_PREFIX) :]: value
+        for name, value in request.query_params.items()
+        if name.startswith(INFO_FILTER_PREFIX) and len(name) > len(INFO_FILTER_PREFIX)
+    }
+
 
 @router.get(
     "/",
-    description="No more than 10 requests per minute",
-    dependencies=[Depends(RateLimiter(times=10, seconds=60))],
+    description="No more than 10 requests per minute. Contacts can be filtered by additional info with `info.<key>=<value>` query parameters.",
+    dependencies=[Depends(FallbackRateLimiter(times=10, seconds=60))],
 )
 async def read_contacts(
     search_name: None | str = Query(
         None, description="Search contacts by first or last name"
     ),
     search_email: None | str = Query(None, description="Search contacts by email"),
+    search_phone: None | str = Query(None, description="Search contacts by phone"),
     upcoming_birthdays: None | bool = Query(
         None, description="Get contacts with birthdays in the next 7 days"
     ),
+    info_filters: dict[str, str] = Depends(get_info_filters),
     current_user: UserOut = Depends(auth_service.get_current_user),
     contact_repo: AbstractContactsRepository = Depends(get_contact_repository),
 ) -> List[ContactOut]:
@@ -34,7 +55,9 @@ async def read_contacts(
     Args:
         search_name (str, optional): Search contacts by first or last name.
         search_email (str, optional): Search contacts by email.
+        search_phone (str, optional): Search contacts by phone number.
         upcoming_birthdays (bool, optional): Get contacts with birthdays in the next 7 days.
+        info_filters (dict[str, str]): Additional info key/value pairs collected from `info.<key>` query parameters.
         current_user (UserOut): The current authenticated user.
         contact_repo (AbstractContactsRepository): The contacts repository.
 
@@ -42,7 +65,12 @@ async def read_contacts(
         List[ContactOut]: A list of contacts matching the search criteria.
     """
     contacts = await contact_repo.get_contacts(
-        search_name, search_email, upcoming_birthdays, current_user
+        search_name,
+        search_email,
+        upcoming_birthdays,
+        current_user,
+        search_phone=search_phone,
+        info_filters=info_filters,
     )
     return contacts
 
@@ -50,7 +78,7 @@ async def read_contacts(
 @router.get(
     "/{contact_id}",
     description="No more than 10 requests per minute",
-    dependencies=[Depends(RateLimiter(times=10, seconds=60))],
+    dependencies=[Depends(FallbackRateLimiter(times=10, seconds=60))],
 )
 async def read_contact(
     contact_id: int = Path(description="The ID of the contact to get", gt=0),
@@ -75,8 +103,8 @@ async def read_contact(
 @router.post(
     "/",
     status_code=status.HTTP_201_CREATED,
-    description="No more than 10 requests per minute",
-    dependencies=[Depends(RateLimiter(times=10, seconds=60))],
+    description="No more than 10 requests per minute. Retries sending the same `Idempotency-Key` header get the response of the first attempt.",
+    dependencies=[Depends(FallbackRateLimiter(times=10, seconds=60))],
 )
 async def create_contact(
     contact: ContactIn,
@@ -93,6 +121,9 @@ async def create_contact(
 
     Returns:
         ContactOut: The newly created contact.
+
+    Raises:
+        HTTPException: 409 if the user already has a contact with the same email or phone.
     """
     return await contact_repo.create_contact(contact, current_user)
 
@@ -100,7 +131,7 @@ async def create_contact(
 @router.put(
     "/{contact_id}",
     description="No more than 10 requests per minute",
-    dependencies=[Depends(RateLimiter(times=10, seconds=60))],
+    dependencies=[Depends(FallbackRateLimiter(times=10, seconds=60))],
 )
 async def update_contact(
     contact_id: int,
@@ -126,7 +157,7 @@ async def update_contact(
 @router.delete(
     "/{contact_id}",
     description="No more than 10 requests per minute",
-    dependencies=[Depends(RateLimiter(times=10, seconds=60))],
+    dependencies=[Depends(FallbackRateLimiter(times=10, seconds=60))],
 )
 async def delete_contact(
     contact_id: int,
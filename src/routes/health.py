@@ -0,0 +1,59 @@
+from dataclasses import asdict
+
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import JSONResponse
+
+from src.services.health import ReadinessChecks, readiness_checks
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+def get_readiness_checks() -> ReadinessChecks:
+    """
+    Returns the readiness checks of the process, their results are cached between probes.
+
+    Returns:
+        ReadinessChecks: The readiness checks.
+    """
+    return readiness_checks
+
+
+@router.get("/live", include_in_schema=False)
+async def live():
+    """
+    Liveness probe: answers as long as the event loop of the worker runs, without touching any dependency.
+
+    Returns:
+        dict: The status "alive".
+    """
+    return {"status": "alive"}
+
+
+@router.get("/ready", include_in_schema=False)
+async def ready(checks: ReadinessChecks = Depends(get_readiness_checks)):
+    """
+    Readiness probe: checks the database pool and reports Redis and the email outbox backlog, from results cached for `health_cache_seconds`. The status is "degraded" when only a non-critical check failed.
+
+    Args:
+        checks (ReadinessChecks): The readiness checks.
+
+    Returns:
+        JSONResponse: The status and the result of every check, with status code 200 if all critical checks passed, 503 otherwise.
+    """
+    results = await checks.run()
+    healthy = all(result.healthy for result in results.values() if result.critical)
+    if not healthy:
+        state = "unavailable"
+    elif all(result.healthy for result in results.values()):
+        state = "ready"
+    else:
+        state = "degraded"
+    return JSONResponse(
+        {
+            "status": state,
+            "checks": {name: asdict(result) for name, result in results.items()},
+        },
+        status_code=(
+            status.HTTP_200_OK if healthy else status.HTTP_503_SERVICE_UNAVAILABLE
+        ),
+    )
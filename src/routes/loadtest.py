@@ -0,0 +1,58 @@
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from src.conf.config import settings
+from src.database.dependencies import get_user_repository
+from src.repository.abstract_repository import AbstractUsersRepository
+from src.schemas import RequestEmail
+
+router = APIRouter(prefix="/loadtest", tags=["loadtest"])
+
+
+def verify_loadtest_token(x_loadtest_token: str = Header("")) -> None:
+    """
+    Checks the token of the load test hook.
+
+    Args:
+        x_loadtest_token (str): The value of the `X-Loadtest-Token` header.
+
+    Raises:
+        HTTPException: 403 if the token does not match `loadtest_hook_token`.
+    """
+    if not settings.loadtest_hook_token or not hmac.compare_digest(
+        x_loadtest_token.encode(), settings.loadtest_hook_token.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid load test token"
+        )
+
+
+@router.post(
+    "/confirm",
+    include_in_schema=False,
+    dependencies=[Depends(verify_loadtest_token)],
+)
+async def confirm_user(
+    body: RequestEmail,
+    user_repo: AbstractUsersRepository = Depends(get_user_repository),
+) -> dict:
+    """
+    Confirms the email of a synthetic load test user without sending the confirmation email. The router is only included when `loadtest_hook_token` is set.
+
+    Args:
+        body (RequestEmail): The request body containing the user's email.
+        user_repo (AbstractUsersRepository): The repository to interact with the user data.
+
+    Raises:
+        HTTPException: 404 if the user does not exist.
+
+    Returns:
+        dict: A message indicating that the email has been confirmed.
+    """
+    user = await user_repo.get_user_by_email(body.email)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    if not user.confirmed:
+        await user_repo.confirm_email(body.email)
+    return {"message": "Email confirmed"}
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from src.services.metrics import metrics_registry
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Exposes the Prometheus metrics of the application, of all the worker processes when there are several.
+
+    Returns:
+        Response: The metrics in the Prometheus text format.
+    """
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,92 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+
+from src.conf.config import settings
+from src.schemas import UserOut
+from src.services.auth import auth_service
+from src.services.profiling import ProfilerBusy, cpu_profile, memory_profile
+
+router = APIRouter(prefix="/profiling", tags=["profiling"])
+
+
+async def get_profiling_admin(
+    current_user: UserOut = Depends(auth_service.get_current_user),
+) -> UserOut:
+    """
+    Retrieves the current user if they may profile the application.
+
+    Args:
+        current_user (UserOut): The current authenticated user.
+
+    Returns:
+        UserOut: The current user.
+
+    Raises:
+        HTTPException: 403 if the user is not listed in `profiling_admin_emails`.
+    """
+    if current_user.email not in settings.profiling_admin_emails:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Not a profiling admin"
+        )
+    return current_user
+
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT, detail="Another profile is running"
+    )
+
+
+@router.get("/cpu", include_in_schema=False)
+async def profile_cpu(
+    seconds: float = Query(10, gt=0, le=settings.profiling_max_seconds),
+    interval: float = Query(0.005, ge=0.001, le=1),
+    admin: UserOut = Depends(get_profiling_admin),
+):
+    """
+    Samples the stacks of every thread of the process for `seconds`, while the application keeps serving requests.
+
+    Args:
+        seconds (float): The length of the profile.
+        interval (float): The time between two samples.
+        admin (UserOut): The current profiling admin.
+
+    Returns:
+        Response: The collapsed stacks weighted by the number of samples, ready for flamegraph.pl or speedscope.
+
+    Raises:
+        HTTPException: 409 if another profile is running.
+    """
+    try:
+        collapsed = await cpu_profile(seconds, interval)
+    except ProfilerBusy:
+        raise _busy()
+    return Response(collapsed, media_type="text/plain")
+
+
+@router.get("/memory", include_in_schema=False)
+async def profile_memory(
+    seconds: float = Query(10, gt=0, le=settings.profiling_max_seconds),
+    frames: int = Query(25, ge=1, le=100),
+    limit: int = Query(100, ge=1, le=1000),
+    admin: UserOut = Depends(get_profiling_admin),
+):
+    """
+    Records with tracemalloc the allocations made during `seconds` that are still alive at the end.
+
+    Args:
+        seconds (float): The length of the profile.
+        frames (int): The number of frames stored per allocation.
+        limit (int): The number of largest allocation stacks returned.
+        admin (UserOut): The current profiling admin.
+
+    Returns:
+        Response: The collapsed allocation stacks weighted by their size in bytes.
+
+    Raises:
+        HTTPException: 409 if another profile is running.
+    """
+    try:
+        collapsed = await memory_profile(seconds, frames, limit)
+    except ProfilerBusy:
+        raise _busy()
+    return Response(collapsed, media_type="text/plain")
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, UploadFile, File
-import cloudinary
-import cloudinary.uploader
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
 
 from src.database.dependencies import get_user_repository
 from src.database.models import User
 from src.repository.abstract_repository import AbstractUsersRepository
 from src.schemas import UserOut
 from src.services.auth import auth_service
+from src.services.images import AvatarPipeline, get_avatar_pipeline
+from src.services.storage import AbstractStorage, get_storage
+from src.services.uploads import read_upload
 from src.conf.config import settings
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -30,31 +31,39 @@ async def update_user_avatar(
     file: UploadFile = File(),
     current_user: User = Depends(auth_service.get_current_user),
     user_repo: AbstractUsersRepository = Depends(get_user_repository),
+    storage: AbstractStorage = Depends(get_storage),
+    avatar_pipeline: AvatarPipeline | None = Depends(get_avatar_pipeline),
 ):
     """
     Updates the avatar of the current authenticated user.
 
+    The image is checked while it is read (at most `avatar_max_bytes`, JPEG, PNG, GIF or WebP) and uploaded to the storage in a worker thread, off the event loop. With the avatar pipeline enabled, the image is resized locally and the largest size becomes the avatar.
+
     Args:
         file (UploadFile): The file containing the new avatar image.
         current_user (User): The current authenticated user.
         user_repo (AbstractUsersRepository): The repository for managing user data.
+        storage (AbstractStorage): The storage the avatar is uploaded to.
+        avatar_pipeline (AvatarPipeline, optional): The local resizing pipeline, None if disabled.
 
     Returns:
         UserOut: The updated user with the new avatar.
+
+    Raises:
+        HTTPException: 413 if the image is too large, 415 if it is not a supported or valid image.
     """
-    cloudinary.config(
-        cloud_name=settings.cloudinary_name,
-        api_key=settings.cloudinary_api_key,
-        api_secret=settings.cloudinary_api_secret,
-        secure=True,
-    )
-    r = cloudinary.uploader.upload(
-        file.file,
-        public_id=f"Fastapi_Contact_App/{current_user.username}",
-        overwrite=True,
-    )
-    src_url = cloudinary.CloudinaryImage(
-        f"Fastapi_Contact_App/{current_user.username}"
-    ).build_url(width=250, height=250, crop="fill", version=r.get("version"))
+    data, content_type = await read_upload(file, settings.avatar_max_bytes)
+    if avatar_pipeline is not None:
+        try:
+            urls = await avatar_pipeline.process(data)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e)
+            )
+        src_url = urls[max(urls)]
+    else:
+        src_url = await storage.upload(
+            f"Fastapi_Contact_App/{current_user.username}", data, content_type
+        )
     user = await user_repo.update_avatar(current_user.email, src_url)
     return user
@@ -1,9 +1,28 @@
 import re
-from typing import Dict
+from typing import Annotated, Any, Dict
 from datetime import date, datetime
 
-from pydantic import BaseModel, Field, EmailStr, field_validator
-from pydantic_extra_types.phone_numbers import PhoneNumber
+from pydantic import (
+    AfterValidator,
+    BaseModel,
+    EmailStr,
+    Field,
+    WithJsonSchema,
+    field_validator,
+)
+
+from src.services.normalization import normalize_email, normalize_phone
+
+ContactEmail = Annotated[
+    str,
+    AfterValidator(normalize_email),
+    WithJsonSchema({"type": "string", "format": "email"}),
+]
+ContactPhone = Annotated[
+    str,
+    AfterValidator(normalize_phone),
+    WithJsonSchema({"type": "string", "format": "phone"}),
+]
 
 
 class ContactIn(BaseModel):
@@ -12,19 +31,16 @@ class ContactIn(BaseModel):
 
     The `ContactIn` model represents the input data for creating a new contact. It includes fields for the contact's first name, last name, email, phone number, birth date, and optional additional information.
 
-    The `PhoneNumber` field is configured to use the "PL" (Poland) region code and the "E164" phone number format.
+    The `phone` field is normalized to the "E164" format using the "PL" (Poland) region code for numbers without an international prefix. Phone numbers and emails are validated by the cached normalizers from `src.services.normalization`.
     """
 
     first_name: str = Field(max_length=150)
     last_name: str = Field(max_length=150)
-    email: EmailStr = Field(max_length=150, unique=True)
-    phone: PhoneNumber = Field(max_length=50, unique=True)
+    email: ContactEmail = Field(max_length=150, unique=True)
+    phone: ContactPhone = Field(max_length=50, unique=True)
     birth_date: date
     additional_info: Dict[str, str] | None = None
 
-    PhoneNumber.default_region_code = "PL"
-    PhoneNumber.phone_format = "E164"
-
 
 class ContactOut(ContactIn):
     """
@@ -129,3 +145,18 @@ class RequestEmail(BaseModel):
     """
 
     email: EmailStr
+
+
+class OutboxEmail(BaseModel):
+    """
+    Defines an email to be queued in the outbox.
+
+    The `OutboxEmail` model contains the following fields:
+    - `recipient`: The email address of the recipient.
+    - `request_type`: The type of the email, e.g. "Confirmation email" or "Reset password".
+    - `template_body`: The data used to render the email template, e.g. the username and the host URL.
+    """
+
+    recipient: EmailStr
+    request_type: str = Field(max_length=50)
+    template_body: Dict[str, Any]
@@ -1,17 +1,25 @@
+import logging
 import secrets
 import pickle
 from datetime import datetime, timedelta
+from functools import cached_property
 
 from redis import Redis
+from redis.exceptions import RedisError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 
 from src.database.dependencies import get_user_repository
 from src.repository.abstract_repository import AbstractUsersRepository
 from src.schemas import UserOut
 from src.conf.config import settings
+from src.services.circuit_breaker import redis_breaker
+from src.services.metrics import CACHE_REQUESTS, PASSWORD_HASH_DURATION
+from src.services.resources import resources
+from src.services.tracing import redis_span, tracer
+
+logger = logging.getLogger(__name__)
 
 
 class Auth:
@@ -26,33 +34,40 @@ class Auth:
     - `create_access_token`: Creates an access token with a 15-minute expiration.
     - `create_refresh_token`: Creates a refresh token with a 7-day expiration.
     - `decode_refresh_token`: Decodes a refresh token and returns the associated email.
+    - `decode_access_token`: Decodes an access token and returns the associated email, None if it is not valid.
     - `get_current_user`: Retrieves the current user from the request token, caching the user in Redis if necessary.
     - `create_email_token`: Creates a token for email verification with a 1-day expiration.
     - `get_email_from_token`: Decodes an email verification token and returns the associated email.
     """
 
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
     SECRET_KEY = settings.secret_key
     ALGORITHM = settings.algorithm
     SALT_LENGTH = settings.salt_length
-    redis_base = Redis(
-        host=settings.redis_host,
-        port=settings.redis_port,
-        password=settings.redis_password,
-        db=0,
-    )
-    redis_base.set("bool", int(bool))
 
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-    def __init__(self, user_repository: AbstractUsersRepository) -> None:
+    def __init__(self, redis: Redis | None = None) -> None:
         """
-        Initializes the `Auth` class with the provided `user_repository` instance.
+        Initializes the `Auth` class with the Redis client caching the users.
 
         Args:
-            user_repository (AbstractUsersRepository): The repository for managing user-related operations.
+            redis (Redis, optional): The Redis client (default is None, the shared client of `resources`, created on first use).
+        """
+        if redis is not None:
+            self.redis_base = redis
+
+    @cached_property
+    def redis_base(self) -> Redis:
+        return resources.redis
+
+    @cached_property
+    def pwd_context(self):
+        """
+        The bcrypt password context, passlib is imported by the first password hashed or verified.
         """
-        self._user_repository = user_repository
+        from passlib.context import CryptContext
+
+        return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
     def verify_password(
         self, plain_password: str, hashed_password: str, salt: str
@@ -68,7 +83,8 @@ class Auth:
         Returns:
             bool: True if the plain-text password matches the hashed password, False otherwise.
         """
-        return self.pwd_context.verify(plain_password + salt, hashed_password)
+        with PASSWORD_HASH_DURATION.labels("verify").time():
+            return self.pwd_context.verify(plain_password + salt, hashed_password)
 
     def get_password_hash(self, password: str) -> (str, str):
         """
@@ -81,7 +97,8 @@ class Auth:
             Tuple[str, str]: A tuple containing the hashed password and the generated salt.
         """
         salt = secrets.token_hex(self.SALT_LENGTH)
-        password = self.pwd_context.hash(password + salt)
+        with PASSWORD_HASH_DURATION.labels("hash").time():
+            password = self.pwd_context.hash(password + salt)
         return password, salt
 
     # generic function to generate a token
@@ -157,12 +174,35 @@ class Auth:
                 detail="Could not validate credentials",
             )
 
-    async def get_current_user(self, token: str = Depends(oauth2_scheme)) -> UserOut:
+    def decode_access_token(self, token: str) -> str | None:
         """
-        Retrieves the current user based on the provided access token.
+        Returns the subject of a valid access token, without reading the user.
+
+        Args:
+            token (str): The access token.
+
+        Returns:
+            str | None: The email of the user, or None if the token is invalid, expired or not an access token.
+        """
+        try:
+            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+        except JWTError:
+            return None
+        if payload.get("scope") != "access_token":
+            return None
+        return payload.get("sub")
+
+    async def get_current_user(
+        self,
+        token: str = Depends(oauth2_scheme),
+        user_repository: AbstractUsersRepository = Depends(get_user_repository),
+    ) -> UserOut:
+        """
+        Retrieves the current user based on the provided access token, from the Redis cache or, on a cache miss or while Redis is unavailable, from the database.
 
         Args:
             token (str): The access token to be used for authentication.
+            user_repository (AbstractUsersRepository): The repository the user is read from when it is not cached, the one of the request.
 
         Returns:
             UserOut: The authenticated user.
@@ -175,27 +215,65 @@ class Auth:
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-        try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            if payload["scope"] == "access_token":
-                email: str = payload["sub"]
-                if email is None:
-                    raise credentials_exception
-            else:
-                raise credentials_exception
-        except JWTError as e:
+        with tracer.start_as_current_span("jwt.decode"):
+            email = self.decode_access_token(token)
+        if email is None:
             raise credentials_exception
-        user = self.redis_base.get(f"user:{email}")
+        cached = self._get_cached_user(email)
+        if cached is not None:
+            CACHE_REQUESTS.labels("user", "hit").inc()
+            return pickle.loads(cached)
+        user = await user_repository.get_user_by_email(email)
         if user is None:
-            user = await self._user_repository.get_user_by_email(email)
-            if user is None:
-                raise credentials_exception
-            await self.redis_base.set(f"user:{email}", pickle.dumps(user))
-            self.redis_base.expire(f"user:{email}", 900)
-        else:
-            user = pickle.loads(user)
+            raise credentials_exception
+        self._cache_user(email, user)
         return user
 
+    def _get_cached_user(self, email: str) -> bytes | None:
+        """
+        Reads a user from the Redis cache, unless the Redis circuit breaker is open.
+
+        Args:
+            email (str): The email of the user.
+
+        Returns:
+            bytes | None: The pickled user, None if it is not cached or Redis is unavailable.
+        """
+        if not redis_breaker.allow():
+            CACHE_REQUESTS.labels("user", "unavailable").inc()
+            return None
+        try:
+            with redis_span("GET"):
+                cached = self.redis_base.get(f"user:{email}")
+        except RedisError:
+            logger.warning("Cannot read the user cache", exc_info=True)
+            redis_breaker.record_failure()
+            CACHE_REQUESTS.labels("user", "unavailable").inc()
+            return None
+        redis_breaker.record_success()
+        if cached is None:
+            CACHE_REQUESTS.labels("user", "miss").inc()
+        return cached
+
+    def _cache_user(self, email: str, user: UserOut) -> None:
+        """
+        Stores a user in the Redis cache for 15 minutes, unless the Redis circuit breaker is open.
+
+        Args:
+            email (str): The email of the user.
+            user (UserOut): The user read from the database.
+        """
+        if not redis_breaker.allow():
+            return
+        try:
+            with redis_span("SET"):
+                self.redis_base.set(f"user:{email}", pickle.dumps(user), ex=900)
+        except RedisError:
+            logger.warning("Cannot write the user cache", exc_info=True)
+            redis_breaker.record_failure()
+        else:
+            redis_breaker.record_success()
+
     def create_email_token(self, data: dict) -> (str, str):
         """
         Creates an email token with an expiration date.
@@ -237,4 +315,4 @@ class Auth:
             )
 
 
-auth_service = Auth(get_user_repository())
+auth_service = Auth()
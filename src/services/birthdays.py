@@ -0,0 +1,181 @@
+"""
+Upcoming birthdays and the birthday reminder digest.
+
+Birthdays are matched in SQL by their birthday key (month * 100 + day, see `src.database.models.birthday_key`) against the keys of the days in the reminder window, so both the per-user search and the digest for all users are a single indexed query instead of a scan in Python. Contacts born on February 29 are reminded on February 28 in non-leap years.
+"""
+
+import calendar
+from datetime import date, timedelta
+from typing import Iterator
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from src.database.models import Contact, EmailOutbox, User, birthday_key
+
+BIRTHDAY_DIGEST = "Birthday reminder"
+UPCOMING_BIRTHDAYS_DAYS = 7
+
+
+def birthday_dates(today: date, days: int = UPCOMING_BIRTHDAYS_DAYS) -> dict[int, date]:
+    """
+    Maps the birthday keys of the window from `today` to `today + days` (both included) to the date the birthday falls on.
+
+    Args:
+        today (date): The first day of the window.
+        days (int): The length of the window in days.
+
+    Returns:
+        dict[int, date]: The date of every birthday key in the window; in non-leap years the key of February 29 maps to February 28.
+    """
+    dates = {}
+    for offset in range(days + 1):
+        day = today + timedelta(days=offset)
+        dates[day.month * 100 + day.day] = day
+        if (day.month, day.day) == (2, 28) and not calendar.isleap(day.year):
+            dates[229] = day
+    return dates
+
+
+def upcoming_birthdays_condition(today: date, days: int = UPCOMING_BIRTHDAYS_DAYS):
+    """
+    Builds the SQL condition matching contacts whose birthday falls in the window from `today` to `today + days`.
+
+    Args:
+        today (date): The first day of the window.
+        days (int): The length of the window in days.
+
+    Returns:
+        ColumnElement: The condition on `Contact.birth_date`.
+    """
+    return birthday_key(Contact.birth_date).in_(sorted(birthday_dates(today, days)))
+
+
+class BirthdayDigest:
+    """
+    Enqueues one birthday reminder email per user listing the birthdays of their contacts in the coming days.
+
+    The contacts are read in keyset chunks ordered by (user_id, id), so memory stays bounded by the chunk size however many contacts there are. Only users with a confirmed email get a digest.
+
+    Args:
+        read_session (Session): The session the contacts are read with, e.g. a read replica.
+        write_session (Session): The session the outbox emails are written with.
+        chunk_size (int): The number of contacts read per query.
+    """
+
+    def __init__(
+        self, read_session: Session, write_session: Session, chunk_size: int = 1000
+    ) -> None:
+        self._read_session = read_session
+        self._write_session = write_session
+        self.chunk_size = chunk_size
+
+    def _chunks(self, today: date, days: int) -> Iterator[list]:
+        """
+        Reads the contacts with upcoming birthdays of all confirmed users in chunks.
+
+        Args:
+            today (date): The first day of the window.
+            days (int): The length of the window in days.
+
+        Yields:
+            list: Rows of (user_id, email, username, first_name, last_name, birth_date, id), ordered by user_id and contact id.
+        """
+        query = (
+            select(
+                Contact.user_id,
+                User.email,
+                User.username,
+                Contact.first_name,
+                Contact.last_name,
+                Contact.birth_date,
+                Contact.id,
+            )
+            .join(User, User.id == Contact.user_id)
+            .where(upcoming_birthdays_condition(today, days), User.confirmed.is_(True))
+            .order_by(Contact.user_id, Contact.id)
+            .limit(self.chunk_size)
+        )
+        last = None
+        while True:
+            chunk_query = query
+            if last is not None:
+                chunk_query = query.where(
+                    tuple_(Contact.user_id, Contact.id) > tuple_(*last)
+                )
+            rows = self._read_session.execute(chunk_query).all()
+            if not rows:
+                return
+            yield rows
+            last = (rows[-1].user_id, rows[-1].id)
+            if len(rows) < self.chunk_size:
+                return
+
+    def users_birthdays(
+        self, today: date, days: int
+    ) -> Iterator[tuple[str, str, list]]:
+        """
+        Groups the upcoming birthdays per user. The contacts of one user may span several chunks.
+
+        Args:
+            today (date): The first day of the window.
+            days (int): The length of the window in days.
+
+        Yields:
+            tuple[str, str, list]: The email and username of a user and the rows of their contacts.
+        """
+        user_rows = []
+        for rows in self._chunks(today, days):
+            for row in rows:
+                if user_rows and user_rows[0].user_id != row.user_id:
+                    yield user_rows[0].email, user_rows[0].username, user_rows
+                    user_rows = []
+                user_rows.append(row)
+        if user_rows:
+            yield user_rows[0].email, user_rows[0].username, user_rows
+
+    def run(self, today: date, days: int = UPCOMING_BIRTHDAYS_DAYS) -> int:
+        """
+        Enqueues the birthday digests, committing the outbox emails every `chunk_size` digests.
+
+        Args:
+            today (date): The first day of the window.
+            days (int): The length of the window in days.
+
+        Returns:
+            int: The number of digests enqueued.
+        """
+        dates = birthday_dates(today, days)
+        enqueued = 0
+        for email, username, rows in self.users_birthdays(today, days):
+            birthdays = []
+            for row in rows:
+                day = dates[row.birth_date.month * 100 + row.birth_date.day]
+                birthdays.append(
+                    {
+                        "first_name": row.first_name,
+                        "last_name": row.last_name,
+                        "date": day.isoformat(),
+                        "age": day.year - row.birth_date.year,
+                    }
+                )
+            # ISO dates sort chronologically
+            birthdays.sort(
+                key=lambda birthday: (birthday["date"], birthday["last_name"])
+            )
+            self._write_session.add(
+                EmailOutbox(
+                    recipient=email,
+                    request_type=BIRTHDAY_DIGEST,
+                    template_body={
+                        "username": username,
+                        "days": days,
+                        "birthdays": birthdays,
+                    },
+                )
+            )
+            enqueued += 1
+            if enqueued % self.chunk_size == 0:
+                self._write_session.commit()
+        self._write_session.commit()
+        return enqueued
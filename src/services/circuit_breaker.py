@@ -0,0 +1,91 @@
+"""
+Circuit breaker of the Redis server.
+
+Redis only backs optimizations and soft limits: the user cache, the read-your-writes markers and the rate limiter. When it is unreachable every call waits for the socket timeout (`redis_timeout_seconds`) and fails, so after `redis_breaker_failures` consecutive failures the breaker opens and the callers skip Redis and use their fallback right away: the user is read from the database, reads go to the primary, requests are rate limited per process. After `redis_breaker_reset_seconds` one call is let through as a probe; its success closes the breaker, its failure opens it again, and a probe that never reports (e.g. cancelled by the request deadline) is replaced by a new one after another `redis_breaker_reset_seconds`.
+"""
+
+import threading
+import time
+
+from src.conf.config import settings
+from src.services.metrics import CIRCUIT_BREAKER_TRANSITIONS
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Counts the consecutive failures of a dependency and stops calling it while it is failing.
+
+    Callers ask `allow` before every call and report its outcome with `record_success` or `record_failure`.
+
+    Args:
+        name (str): The name of the dependency, used in the metrics.
+        failure_threshold (int): Consecutive failures after which the breaker opens.
+        reset_seconds (float): How long the breaker stays open before a probe call is let through.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        # synchronous routes and dependencies call Redis from the threadpool
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """
+        The state of the breaker: "closed", "open" or "half_open" while a probe call is running.
+        """
+        return self._state
+
+    def _transition(self, state: str) -> None:
+        self._state = state
+        CIRCUIT_BREAKER_TRANSITIONS.labels(self.name, state).inc()
+
+    def allow(self) -> bool:
+        """
+        Checks whether the dependency may be called.
+
+        Returns:
+            bool: True if the breaker is closed, or if it has been open for `reset_seconds` and this call is the probe. A probe that has not reported its outcome within `reset_seconds` (cancelled, or failed with an unexpected error) is replaced by a new one.
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._opened_at = time.monotonic()
+                self._transition(HALF_OPEN)
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """
+        Records a successful call, closing the breaker.
+        """
+        with self._lock:
+            self._failures = 0
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        """
+        Records a failed call, opening the breaker after `failure_threshold` consecutive failures or a failed probe.
+        """
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self._transition(OPEN)
+
+
+redis_breaker = CircuitBreaker(
+    "redis", settings.redis_breaker_failures, settings.redis_breaker_reset_seconds
+)
@@ -0,0 +1,337 @@
+"""
+Time budgets of the HTTP requests.
+
+`DeadlineMiddleware` gives every request a deadline, `request_timeout_seconds` after it arrived or the budget of its route in `route_timeouts` (keyed by method and route template, e.g. "GET /api/contacts/"). The deadline lives in a context variable, so it follows the request into the threads of the synchronous dependencies, and `enforce_deadlines` applies it to every statement of the database engines:
+
+- a statement is not started once the deadline has passed or the client has disconnected;
+- on PostgreSQL the first statement of every transaction sets `SET LOCAL statement_timeout` to the remaining budget, so the server cancels a statement running past the deadline;
+- on SQLite a progress handler interrupts a statement running past the deadline.
+
+A disconnect does not cancel a running statement. The routes run their queries synchronously on the event loop, so the middleware cannot notice the disconnect, let alone cancel the statement (`pg_cancel_backend`, `connection.cancel()`), before the statement returned; a running statement is only bounded by the deadline, which the database enforces. After a disconnect the next statement of the request is not started and the middleware stops the request at the next point it yields to the event loop. A request out of time before its response started gets a 504, one that cannot get a database connection (`pool_timeout`) a 503; the requests stopped by their deadline or by a disconnect are counted in `http_request_timeouts_total`. Once the response has started the deadline no longer applies, so background tasks run to completion. Redis and SMTP calls have their own socket timeouts (`redis_timeout_seconds`, `mail_timeout_seconds`).
+"""
+
+import asyncio
+import math
+import time
+from contextvars import ContextVar
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from starlette.routing import Match
+
+from src.conf.config import Settings
+from src.services.metrics import REQUEST_TIMEOUTS, UNMATCHED_ROUTE
+
+# PostgreSQL error code of a statement cancelled by `statement_timeout`
+QUERY_CANCELED = "57014"
+# the progress handler of SQLite is called every that many virtual machine instructions
+SQLITE_PROGRESS_STEPS = 1000
+# the profiling routes record for up to `profiling_max_seconds`, plus the time to build the report
+PROFILING_ROUTES = ("GET /api/profiling/cpu", "GET /api/profiling/memory")
+PROFILING_MARGIN_SECONDS = 10
+
+
+def route_budgets(settings: Settings) -> dict[str, float]:
+    """
+    Returns the budgets of single routes: `route_timeouts`, and the profiling routes when profiling is enabled.
+
+    Args:
+        settings (Settings): The application settings.
+
+    Returns:
+        dict[str, float]: The budgets in seconds by method and route template.
+    """
+    budgets = dict(settings.route_timeouts)
+    if settings.profiling_enabled:
+        for route in PROFILING_ROUTES:
+            budgets.setdefault(
+                route, settings.profiling_max_seconds + PROFILING_MARGIN_SECONDS
+            )
+    return budgets
+
+
+def longest_budget(settings: Settings) -> float:
+    """
+    Returns the longest time a request may run before its deadline stops it.
+
+    Args:
+        settings (Settings): The application settings.
+
+    Returns:
+        float: The longest budget in seconds, of any route.
+    """
+    return max([settings.request_timeout_seconds, *route_budgets(settings).values()])
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when a statement would start after the deadline of the request.
+    """
+
+
+class ClientDisconnected(Exception):
+    """
+    Raised when a statement would start after the client of the request disconnected.
+    """
+
+
+class RequestDeadline:
+    """
+    The deadline of one request.
+
+    Args:
+        expires_at (float): The `time.monotonic()` time the budget runs out at.
+    """
+
+    def __init__(self, expires_at: float) -> None:
+        self.expires_at = expires_at
+        self.disconnected = False
+
+    def remaining(self) -> float:
+        """
+        Returns the seconds left, negative once the deadline has passed.
+        """
+        return self.expires_at - time.monotonic()
+
+    def stopped(self) -> bool:
+        """
+        Checks whether the request should stop working.
+
+        Returns:
+            bool: True if the deadline has passed or the client disconnected. A disconnect is only noticed while the event loop runs, so not while a route runs a statement on it.
+        """
+        return self.disconnected or self.remaining() <= 0
+
+    def check(self) -> None:
+        """
+        Raises if the request should stop working.
+
+        Raises:
+            ClientDisconnected: If the client disconnected.
+            DeadlineExceeded: If the deadline has passed.
+        """
+        if self.disconnected:
+            raise ClientDisconnected("The client disconnected")
+        if self.remaining() <= 0:
+            raise DeadlineExceeded("The deadline of the request has passed")
+
+    def finish(self) -> None:
+        """
+        Lifts the deadline, the response has started and the rest of the request must run to completion.
+        """
+        self.expires_at = math.inf
+        self.disconnected = False
+
+
+current_deadline: ContextVar[RequestDeadline | None] = ContextVar(
+    "current_deadline", default=None
+)
+
+
+def is_statement_timeout(error: Exception) -> bool:
+    """
+    Checks whether the database stopped a statement because of the deadline.
+
+    Args:
+        error (Exception): An error raised while executing a statement.
+
+    Returns:
+        bool: True for a PostgreSQL statement timeout or an interrupted SQLite statement.
+    """
+    if not isinstance(error, DBAPIError):
+        return False
+    orig = error.orig
+    return getattr(orig, "pgcode", None) == QUERY_CANCELED or str(orig) == "interrupted"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    deadline = current_deadline.get()
+    if deadline is None:
+        return
+    deadline.check()
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        transaction = conn.get_transaction()
+        if conn.info.get("statement_timeout_set") is not transaction:
+            milliseconds = max(1, int(deadline.remaining() * 1000))
+            cursor.execute(f"SET LOCAL statement_timeout = {milliseconds}")
+            conn.info["statement_timeout_set"] = transaction
+    elif dialect == "sqlite":
+        conn.connection.dbapi_connection.set_progress_handler(
+            deadline.stopped, SQLITE_PROGRESS_STEPS
+        )
+
+
+def _clear_progress_handler(conn) -> None:
+    if conn.dialect.name == "sqlite" and current_deadline.get() is not None:
+        conn.connection.dbapi_connection.set_progress_handler(None, 0)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    _clear_progress_handler(conn)
+
+
+def _handle_error(context) -> None:
+    if context.connection is not None and not context.connection.invalidated:
+        _clear_progress_handler(context.connection)
+
+
+def enforce_deadlines(engine: Engine) -> Engine:
+    """
+    Applies the deadline of the current request to every statement executed by the engine.
+
+    Args:
+        engine (Engine): The engine.
+
+    Returns:
+        Engine: The same engine.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    return engine
+
+
+class DeadlineMiddleware:
+    """
+    Runs every HTTP request under a deadline and stops it when the deadline passes or the client disconnects before the response started.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+        timeout (float): The budget of a request in seconds.
+        route_timeouts (dict[str, float]): Budgets of single routes, by method and route template (e.g. "GET /api/contacts/").
+    """
+
+    def __init__(self, app, timeout: float, route_timeouts: dict[str, float]) -> None:
+        self.app = app
+        self.timeout = timeout
+        self.route_timeouts = route_timeouts
+
+    def budget(self, scope) -> float:
+        """
+        Returns the budget of a request, the one of its route if configured.
+
+        Args:
+            scope (Scope): The ASGI scope of the request.
+
+        Returns:
+            float: The budget in seconds.
+        """
+        if not self.route_timeouts:
+            return self.timeout
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return self.route_timeouts.get(
+                    f"{scope['method']} {route.path}", self.timeout
+                )
+        return self.timeout
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        deadline = RequestDeadline(time.monotonic() + self.budget(scope))
+        token = current_deadline.set(deadline)
+        started = False
+        # the watcher reads the request and hands it over, so it sees a disconnect even while the application is not reading;
+        # the queue keeps the backpressure of the body, the disconnect is signalled beside it, a route that never reads its body must not block it
+        messages = asyncio.Queue(maxsize=1)
+        disconnected = asyncio.Event()
+
+        async def watch_disconnect() -> None:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    # servers report a disconnect once the response is complete, the background tasks still run
+                    if not started:
+                        deadline.disconnected = True
+                    disconnected.set()
+                    return
+                await messages.put(message)
+
+        async def receive_request():
+            if not messages.empty():
+                return messages.get_nowait()
+            if disconnected.is_set():
+                return {"type": "http.disconnect"}
+            message = asyncio.ensure_future(messages.get())
+            disconnect = asyncio.ensure_future(disconnected.wait())
+            done, pending = await asyncio.wait(
+                {message, disconnect}, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in pending:
+                task.cancel()
+            if message in done:
+                return message.result()
+            return {"type": "http.disconnect"}
+
+        async def send_started(message) -> None:
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+                deadline.finish()
+            await send(message)
+
+        handler = asyncio.create_task(self.app(scope, receive_request, send_started))
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            done, _ = await asyncio.wait(
+                {handler, watcher},
+                timeout=max(deadline.remaining(), 0),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if handler not in done and not started:
+                handler.cancel()
+                await asyncio.gather(handler, return_exceptions=True)
+                if deadline.disconnected:
+                    self.count(scope, "disconnect")
+                    return
+                self.count(scope, "deadline")
+                await self.respond(scope, send, status.HTTP_504_GATEWAY_TIMEOUT)
+                return
+            try:
+                await handler
+            except Exception as error:
+                if started:
+                    raise
+                if isinstance(error, ClientDisconnected) or deadline.disconnected:
+                    self.count(scope, "disconnect")
+                    return
+                if (
+                    isinstance(error, DeadlineExceeded)
+                    or is_statement_timeout(error)
+                    or deadline.remaining() <= 0
+                ):
+                    self.count(scope, "deadline")
+                    await self.respond(scope, send, status.HTTP_504_GATEWAY_TIMEOUT)
+                    return
+                if isinstance(error, PoolTimeoutError):
+                    await self.respond(scope, send, status.HTTP_503_SERVICE_UNAVAILABLE)
+                    return
+                raise
+        finally:
+            watcher.cancel()
+            current_deadline.reset(token)
+
+    @staticmethod
+    def count(scope, reason: str) -> None:
+        route = scope.get("route")
+        route = route.path if route is not None else UNMATCHED_ROUTE
+        REQUEST_TIMEOUTS.labels(route, reason).inc()
+
+    @staticmethod
+    async def respond(scope, send, status_code: int) -> None:
+        detail = (
+            "Request timed out"
+            if status_code == status.HTTP_504_GATEWAY_TIMEOUT
+            else "Service temporarily unavailable"
+        )
+        response = JSONResponse(
+            {"detail": detail}, status_code=status_code, headers={"Retry-After": "1"}
+        )
+        await response(scope, None, send)
@@ -1,59 +1,157 @@
+"""
+Rendering and sending of the application emails.
+
+The web workers only queue emails in the outbox and never send one, so fastapi-mail and jinja2 are imported, the connection configuration (`get_config`) created and the templates compiled on first use, in the processes that actually render or send emails.
+"""
+
+from email.message import Message
+from functools import cache
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
 from pydantic import EmailStr
 
 from src.services.auth import auth_service
+from src.services.birthdays import BIRTHDAY_DIGEST
 from src.conf.config import settings
+from src.services.resources import resources
+from src.services.tracing import traced
+
+if TYPE_CHECKING:
+    from fastapi_mail import ConnectionConfig
+    from jinja2 import Template
+
+TEMPLATE_FOLDER = Path(__file__).parent / "templates"
+
+CONFIRMATION_EMAIL = "Confirmation email"
+RESET_PASSWORD = "Reset password"
+# emails carrying a verification link, the token is created when the email is sent
+TOKEN_REQUEST_TYPES = {CONFIRMATION_EMAIL, RESET_PASSWORD}
+
+DEFAULT_TEMPLATE = "email_template.html"
+# template variant of every request type, other request types get the default template
+REQUEST_TEMPLATES = {
+    CONFIRMATION_EMAIL: "confirmation_email.html",
+    RESET_PASSWORD: "reset_password.html",
+    BIRTHDAY_DIGEST: "birthday_digest.html",
+}
+
+
+@cache
+def get_config() -> "ConnectionConfig":
+    """
+    Returns the connection configuration of the mail server, created from the settings on first use.
+
+    Returns:
+        ConnectionConfig: The connection configuration.
+    """
+    from fastapi_mail import ConnectionConfig
+
+    return ConnectionConfig(
+        MAIL_USERNAME=settings.mail_username,
+        MAIL_PASSWORD=settings.mail_password,
+        MAIL_FROM=settings.mail_from,
+        MAIL_PORT=settings.mail_port,
+        MAIL_SERVER=settings.mail_server,
+        MAIL_FROM_NAME=settings.mail_from_name,
+        MAIL_STARTTLS=settings.mail_starttls,
+        MAIL_SSL_TLS=settings.mail_ssl_tls,
+        USE_CREDENTIALS=settings.use_credentials,
+        VALIDATE_CERTS=settings.validate_certs,
+        TEMPLATE_FOLDER=TEMPLATE_FOLDER,
+        TIMEOUT=settings.mail_timeout_seconds,
+    )
+
+
+@cache
+def load_templates(folder: Path) -> dict[str, "Template"]:
+    """
+    Compiles all email templates of the folder on first use. The templates are never reloaded from disk, a changed template needs a restart.
+
+    Args:
+        folder (Path): The folder containing the templates.
+
+    Returns:
+        dict[str, Template]: The compiled templates by file name.
+    """
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+    environment = Environment(
+        loader=FileSystemLoader(folder),
+        autoescape=select_autoescape(["html"]),
+        auto_reload=False,
+    )
+    return {
+        name: environment.get_template(name)
+        for name in {DEFAULT_TEMPLATE, *REQUEST_TEMPLATES.values()}
+    }
+
+
+def get_template(request_type: str) -> "Template":
+    """
+    Returns the compiled template of the given request type.
+
+    Args:
+        request_type (str): The type of request being made ("Confirmation email", "Reset password" or "Birthday reminder").
+
+    Returns:
+        Template: The template variant of the request type, or the default template.
+    """
+    templates = load_templates(TEMPLATE_FOLDER)
+    return templates[REQUEST_TEMPLATES.get(request_type, DEFAULT_TEMPLATE)]
 
-CONF = ConnectionConfig(
-    MAIL_USERNAME=settings.mail_username,
-    MAIL_PASSWORD=settings.mail_password,
-    MAIL_FROM=settings.mail_from,
-    MAIL_PORT=settings.mail_port,
-    MAIL_SERVER=settings.mail_server,
-    MAIL_FROM_NAME=settings.mail_from_name,
-    MAIL_STARTTLS=settings.mail_starttls,
-    MAIL_SSL_TLS=settings.mail_ssl_tls,
-    USE_CREDENTIALS=settings.use_credentials,
-    VALIDATE_CERTS=settings.validate_certs,
-    TEMPLATE_FOLDER=Path(__file__).parent / "templates",
-)
 
+async def build_message(
+    email: EmailStr, request_type: str, template_body: dict
+) -> Message:
+    """
+    Renders the template of the request type and builds the MIME message.
 
-async def send_email(
-    email: EmailStr, username: str, request_type: str, host: str
-) -> None:
+    Args:
+        email (EmailStr): The email address to send the email to.
+        request_type (str): The type of request being made ("Confirmation email", "Reset password" or "Birthday reminder").
+        template_body (dict): The data used to render the template, including the request type.
+
+    Returns:
+        Message: The message ready to be sent.
     """
-    Sends an email with a token and expiration date for a given email address and request type.
+    from fastapi_mail import MessageSchema, MessageType
+    from fastapi_mail.msg import MailMsg
+
+    config = get_config()
+    template = get_template(request_type)
+    message = MessageSchema(
+        subject=f"FastAPI Contacts App - {request_type}",
+        recipients=[email],
+        template_body=template.render(**template_body),
+        subtype=MessageType.html,
+    )
+    return await MailMsg(message)._message(
+        f"{config.MAIL_FROM_NAME} <{config.MAIL_FROM}>"
+    )
+
+
+@traced("send_email")
+async def send_email(email: EmailStr, request_type: str, template_body: dict) -> None:
+    """
+    Sends an email of the given request type over the pooled SMTP connections. Emails with a verification link get a token and its expiration date.
 
     Args:
         email (EmailStr): The email address to send the email to.
-        username (str): The username associated with the email address.
-        request_type (str): The type of request being made ("registration" or "password reset").
-        host (str): The host URL for the application.
+        request_type (str): The type of request being made ("Confirmation email", "Reset password" or "Birthday reminder").
+        template_body (dict): The data used to render the template, e.g. the username and the host URL of the application.
 
     Raises:
         ConnectionErrors: If there is an error connecting to the email server.
+        aiosmtplib.SMTPException: If the email server rejects the email.
     """
-    try:
+    template_body = {**template_body, "request_type": request_type}
+    if request_type in TOKEN_REQUEST_TYPES:
         token_verification, expiration_date = auth_service.create_email_token(
             {"sub": email}
         )
-        message = MessageSchema(
-            subject=f"FastAPI Contacts App - {request_type}",
-            recipients=[email],
-            template_body={
-                "host": host,
-                "username": username,
-                "token": token_verification,
-                "expiration": expiration_date,
-                "request_type": request_type,
-            },
-            subtype=MessageType.html,
-        )
-        fast_mail = FastMail(CONF)
-        await fast_mail.send_message(message, template_name="email_template.html")
-    except ConnectionErrors as e:
-        print(e)
+        template_body["token"] = token_verification
+        template_body["expiration"] = expiration_date
+    message = await build_message(email, request_type, template_body)
+    # one pool per process, the connections are reused by every email the process sends
+    await resources.mail_transport.send(message)
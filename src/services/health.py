@@ -0,0 +1,192 @@
+"""
+Liveness and readiness checks of the load balancer.
+
+`/health/live` only answers from the event loop of the worker: it fails when the worker hangs, and the worker is restarted. `/health/ready` checks what a request needs, a connection of the database pool: it fails when the database is unreachable or the pool is exhausted, and the worker is drained until it recovers. It also reports a Redis PING, which does not fail it: the workers fall back to the database and to local rate limits while Redis is down (`src.services.circuit_breaker`), and draining them all would turn the degradation into an outage. The email outbox backlog is reported too, see `outbox_check`.
+
+Every check runs with a timeout (`health_check_timeout_seconds`) and its result is cached for `health_cache_seconds`. Concurrent probes wait for the check that is already running instead of starting another, so the probes of any number of load balancers cost one database query and one PING per worker and interval.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from sqlalchemy import text
+
+from src.conf.config import Settings, settings
+from src.services.metrics import count_pending_outbox
+from src.services.resources import resources
+
+logger = logging.getLogger(__name__)
+
+
+class UnhealthyError(Exception):
+    """
+    Raised by a check whose dependency responds but is not fit to serve requests.
+    """
+
+
+@dataclass
+class CheckResult:
+    """
+    The result of one health check.
+
+    Attributes:
+        healthy (bool): Whether the dependency is usable.
+        detail (str): What the check found, or why it failed.
+        duration_ms (float): How long the check took.
+        critical (bool): Whether a failure of the check makes the worker unavailable.
+    """
+
+    healthy: bool
+    detail: str
+    duration_ms: float
+    critical: bool = True
+
+
+class HealthCheck:
+    """
+    A dependency check with a timeout and a cached result.
+
+    Args:
+        name (str): The name the result is reported under.
+        check (Callable[[], Awaitable[str]]): Checks the dependency and returns a detail, raises if it is unhealthy.
+        timeout (float): Seconds after which the check fails.
+        ttl (float): Seconds the result is reused.
+        critical (bool, optional): Whether a failure makes the worker unavailable (default is True).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        check: Callable[[], Awaitable[str]],
+        timeout: float,
+        ttl: float,
+        critical: bool = True,
+    ) -> None:
+        self.name = name
+        self._check = check
+        self.timeout = timeout
+        self.ttl = ttl
+        self.critical = critical
+        self._result: CheckResult | None = None
+        self._expires = 0.0
+        self._lock = asyncio.Lock()
+
+    async def run(self) -> CheckResult:
+        """
+        Returns the cached result, or runs the check if it expired.
+
+        Returns:
+            CheckResult: The result of the check.
+        """
+        async with self._lock:
+            if self._result is None or time.monotonic() >= self._expires:
+                self._result = await self._run()
+                self._expires = time.monotonic() + self.ttl
+            return self._result
+
+    async def _run(self) -> CheckResult:
+        start = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(self._check(), self.timeout)
+            healthy = True
+        except asyncio.TimeoutError:
+            detail = f"timed out after {self.timeout} s"
+            healthy = False
+        except Exception as e:
+            logger.warning("Health check %s failed", self.name, exc_info=True)
+            detail = str(e) or type(e).__name__
+            healthy = False
+        return CheckResult(
+            healthy, detail, (time.perf_counter() - start) * 1000, self.critical
+        )
+
+
+def _query_database() -> str:
+    with resources.engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    return resources.engine.pool.status()
+
+
+async def check_database() -> str:
+    """
+    Checks out a connection of the pool and runs `SELECT 1`, in a thread, so an exhausted pool times out instead of blocking the event loop.
+
+    Returns:
+        str: The status of the connection pool.
+    """
+    return await asyncio.to_thread(_query_database)
+
+
+async def check_redis() -> str:
+    """
+    Sends a PING over the asyncio Redis client shared with the rate limiter.
+
+    Returns:
+        str: "PONG".
+    """
+    await resources.async_redis.ping()
+    return "PONG"
+
+
+def outbox_check(max_pending: int | None) -> Callable[[], Awaitable[str]]:
+    """
+    Creates the check of the email outbox backlog.
+
+    Args:
+        max_pending (int | None): Pending emails above which the check fails, None to only report the backlog. Draining the web workers does not send the emails, so the backlog fails readiness only when configured. Without a limit the check is not critical either, so a slow count cannot drain the workers.
+
+    Returns:
+        Callable[[], Awaitable[str]]: The check.
+    """
+
+    def count() -> int:
+        with resources.session() as session:
+            return count_pending_outbox(session)
+
+    async def check_outbox() -> str:
+        pending = await asyncio.to_thread(count)
+        if max_pending is not None and pending > max_pending:
+            raise UnhealthyError(f"{pending} pending emails, more than {max_pending}")
+        return f"{pending} pending emails"
+
+    return check_outbox
+
+
+class ReadinessChecks:
+    """
+    The checks of the readiness endpoint, run concurrently.
+
+    Args:
+        settings (Settings): The application settings the timeouts and the cache duration are read from.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        timeout = settings.health_check_timeout_seconds
+        ttl = settings.health_cache_seconds
+        self.checks = [
+            HealthCheck("database", check_database, timeout, ttl),
+            HealthCheck("redis", check_redis, timeout, ttl, critical=False),
+            HealthCheck(
+                "outbox",
+                outbox_check(settings.health_outbox_max_pending),
+                timeout,
+                ttl,
+                critical=settings.health_outbox_max_pending is not None,
+            ),
+        ]
+
+    async def run(self) -> dict[str, CheckResult]:
+        """
+        Runs all checks.
+
+        Returns:
+            dict[str, CheckResult]: The results by check name.
+        """
+        results = await asyncio.gather(*(check.run() for check in self.checks))
+        return {check.name: result for check, result in zip(self.checks, results)}
+
+
+readiness_checks = ReadinessChecks(settings)
@@ -0,0 +1,298 @@
+"""
+Idempotency keys of the unsafe requests.
+
+A client that retries a POST after a network failure cannot know whether the first attempt was processed. It sends the same `Idempotency-Key` header with every attempt, and `IdempotencyMiddleware` processes the request once: the first attempt claims the key in Redis, its response is stored for `idempotency_ttl_seconds` and the retries get the stored response, with an `Idempotent-Replayed` header, without running the application, so without touching the database. Keys are scoped by the user the access token was issued to, so a key of one user never replays the response of another one, and a retry sent after the client refreshed its token still gets the stored response; a request without a valid token is scoped by its raw Authorization header.
+
+- A retry while the first attempt is still running gets a 409, the claim expires after `lock_seconds` if the worker dies.
+- A key reused with a different body gets a 422.
+- Server errors (5xx) and 429 responses are not stored, the key is released so the request can be retried.
+
+Requests without the header are processed as before. While Redis is unavailable (`src.services.circuit_breaker`) the requests are processed without the guarantee; the unique constraints of the contacts still turn a duplicate into a 409.
+"""
+
+import hashlib
+import json
+import logging
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from redis.exceptions import RedisError
+
+from src.services.auth import auth_service
+from src.services.circuit_breaker import redis_breaker
+from src.services.metrics import IDEMPOTENCY_REQUESTS
+from src.services.resources import resources
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+KEY_PREFIX = "idempotency:"
+
+
+def client_scope(authorization: bytes) -> bytes:
+    """
+    Returns who the idempotency keys of a request belong to.
+
+    Args:
+        authorization (bytes): The Authorization header of the request.
+
+    Returns:
+        bytes: The subject of a valid bearer access token, otherwise the raw header.
+    """
+    scheme, _, token = authorization.decode("latin-1").partition(" ")
+    if scheme.lower() == "bearer":
+        subject = auth_service.decode_access_token(token.strip())
+        if subject is not None:
+            return b"sub:" + subject.encode()
+    return b"authorization:" + authorization
+
+
+def redis_key(client: bytes, path: str, idempotency_key: bytes) -> str:
+    """
+    Returns the Redis key of an idempotency key, scoped by the client and the path of the request.
+
+    Args:
+        client (bytes): Who the key belongs to, see `client_scope`.
+        path (str): The path of the request.
+        idempotency_key (bytes): The Idempotency-Key header of the request.
+
+    Returns:
+        str: The Redis key.
+    """
+    digest = hashlib.sha256(b"\n".join([client, path.encode(), idempotency_key]))
+    return KEY_PREFIX + digest.hexdigest()
+
+
+def _stored(status_code: int) -> bool:
+    return status_code < 500 and status_code != status.HTTP_429_TOO_MANY_REQUESTS
+
+
+class IdempotencyMiddleware:
+    """
+    Processes the POST requests carrying an `Idempotency-Key` header on the given paths once, and replays their response to the retries.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+        paths (list[str]): The paths the keys apply to.
+        ttl_seconds (int): How long a response is replayed.
+        lock_seconds (int): How long a key stays claimed by an attempt that has not finished.
+    """
+
+    def __init__(
+        self, app, paths: list[str], ttl_seconds: int, lock_seconds: int
+    ) -> None:
+        self.app = app
+        self.paths = set(paths)
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds
+
+    async def __call__(self, scope, receive, send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(IDEMPOTENCY_HEADER)
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+            await self.respond(
+                scope,
+                send,
+                status.HTTP_400_BAD_REQUEST,
+                f"Idempotency-Key must have 1 to {MAX_KEY_LENGTH} characters",
+            )
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+        fingerprint = hashlib.sha256(body).hexdigest()
+        key = redis_key(
+            client_scope(headers.get(b"authorization", b"")),
+            scope["path"],
+            idempotency_key,
+        )
+
+        claimed, record = await self.claim(key, fingerprint)
+        if record is not None:
+            await self.answer(scope, send, record, fingerprint)
+            return
+
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        response = {"status": 500, "headers": [], "body": b""}
+
+        async def send_recorded(message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                response["body"] += message.get("body", b"")
+            await send(message)
+
+        if not claimed:
+            await self.app(scope, replay_receive, send_recorded)
+            return
+        try:
+            await self.app(scope, replay_receive, send_recorded)
+        except BaseException:
+            await self.release(key)
+            raise
+        if _stored(response["status"]):
+            await self.store(key, fingerprint, response)
+        else:
+            await self.release(key)
+
+    async def claim(self, key: str, fingerprint: str) -> tuple[bool, dict | None]:
+        """
+        Claims the key for the current attempt, unless an earlier attempt did.
+
+        Args:
+            key (str): The Redis key of the idempotency key.
+            fingerprint (str): The hash of the request body.
+
+        Returns:
+            tuple[bool, dict | None]: Whether the key was claimed, and the record of the earlier attempt if there is one. Neither while Redis is unavailable.
+        """
+        if not redis_breaker.allow():
+            IDEMPOTENCY_REQUESTS.labels("unavailable").inc()
+            return False, None
+        redis = resources.async_redis
+        try:
+            if await redis.set(
+                key,
+                json.dumps({"fingerprint": fingerprint}),
+                nx=True,
+                ex=self.lock_seconds,
+            ):
+                redis_breaker.record_success()
+                return True, None
+            value = await redis.get(key)
+        except RedisError:
+            logger.warning("Cannot claim the idempotency key", exc_info=True)
+            redis_breaker.record_failure()
+            IDEMPOTENCY_REQUESTS.labels("unavailable").inc()
+            return False, None
+        redis_breaker.record_success()
+        if value is None:
+            # the earlier attempt was released or expired in between, it is retried
+            return await self.claim(key, fingerprint)
+        return False, json.loads(value)
+
+    async def store(self, key: str, fingerprint: str, response: dict) -> None:
+        """
+        Stores the response of the attempt that claimed the key.
+
+        Args:
+            key (str): The Redis key of the idempotency key.
+            fingerprint (str): The hash of the request body.
+            response (dict): The status code, headers and body of the response.
+        """
+        record = {
+            "fingerprint": fingerprint,
+            "status": response["status"],
+            "headers": [
+                [name.decode("latin-1"), value.decode("latin-1")]
+                for name, value in response["headers"]
+            ],
+            "body": response["body"].decode("latin-1"),
+        }
+        try:
+            await resources.async_redis.set(
+                key, json.dumps(record), ex=self.ttl_seconds
+            )
+        except RedisError:
+            # the claim expires after `lock_seconds`
+            logger.warning("Cannot store the idempotent response", exc_info=True)
+            redis_breaker.record_failure()
+            return
+        redis_breaker.record_success()
+        IDEMPOTENCY_REQUESTS.labels("stored").inc()
+
+    async def release(self, key: str) -> None:
+        """
+        Releases the key after a failed attempt, so the request can be retried.
+
+        Args:
+            key (str): The Redis key of the idempotency key.
+        """
+        try:
+            await resources.async_redis.delete(key)
+        except RedisError:
+            logger.warning("Cannot release the idempotency key", exc_info=True)
+            redis_breaker.record_failure()
+            return
+        redis_breaker.record_success()
+
+    async def answer(self, scope, send, record: dict, fingerprint: str) -> None:
+        """
+        Answers a retry from the record of the earlier attempt.
+
+        Args:
+            scope (Scope): The ASGI scope of the retry.
+            send (Send): The ASGI send callable.
+            record (dict): The record of the earlier attempt.
+            fingerprint (str): The hash of the body of the retry.
+        """
+        if record["fingerprint"] != fingerprint:
+            IDEMPOTENCY_REQUESTS.labels("mismatch").inc()
+            await self.respond(
+                scope,
+                send,
+                status.HTTP_422_UNPROCESSABLE_ENTITY,
+                "Idempotency-Key was already used with a different request body",
+            )
+            return
+        if "status" not in record:
+            IDEMPOTENCY_REQUESTS.labels("in_progress").inc()
+            await self.respond(
+                scope,
+                send,
+                status.HTTP_409_CONFLICT,
+                "A request with this Idempotency-Key is in progress",
+            )
+            return
+        IDEMPOTENCY_REQUESTS.labels("replayed").inc()
+        headers = [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in record["headers"]
+        ]
+        await send(
+            {
+                "type": "http.response.start",
+                "status": record["status"],
+                "headers": headers + [(REPLAYED_HEADER, b"true")],
+            }
+        )
+        await send(
+            {"type": "http.response.body", "body": record["body"].encode("latin-1")}
+        )
+
+    @staticmethod
+    async def respond(scope, send, status_code: int, detail: str) -> None:
+        headers = (
+            {"Retry-After": "1"} if status_code == status.HTTP_409_CONFLICT else None
+        )
+        response = JSONResponse(
+            {"detail": detail}, status_code=status_code, headers=headers
+        )
+        await response(scope, None, send)
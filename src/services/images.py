@@ -0,0 +1,179 @@
+"""
+The optional local avatar pipeline.
+
+When `avatar_pipeline` is enabled (it requires the "local" avatar storage), avatars are resized locally to every size in `avatar_sizes` instead of by a Cloudinary URL transformation. Resizing runs in a process pool, so the CPU-bound work neither blocks the event loop nor competes for the GIL. The resized images are stored content-addressed under the SHA-256 of the uploaded file: uploading an identical file again reuses the stored images, and since the content behind a URL never changes it can be cached forever.
+
+Pillow is only needed when the pipeline is enabled (`poetry install -E images`).
+"""
+
+import asyncio
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from fastapi import Request
+from fastapi.staticfiles import StaticFiles
+
+from src.conf.config import Settings
+from src.services.storage import AbstractStorage, LocalStorage
+
+AVATAR_FORMAT = "webp"
+AVATAR_CONTENT_TYPE = "image/webp"
+# content-addressed files never change, clients and proxies may cache them for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def resize_image(data: bytes, sizes: list[int]) -> dict[int, bytes]:
+    """
+    Crops the image to a square and resizes it to every size. Runs in a worker process.
+
+    Args:
+        data (bytes): The uploaded image.
+        sizes (list[int]): The edge lengths of the resized images in pixels.
+
+    Returns:
+        dict[int, bytes]: The WebP encoded image of every size.
+
+    Raises:
+        ValueError: If the image cannot be decoded or is a decompression bomb.
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(BytesIO(data)) as image:
+            image = ImageOps.exif_transpose(image)
+            image = image.convert(
+                "RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB"
+            )
+            resized = {}
+            for size in sizes:
+                output = BytesIO()
+                ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS).save(
+                    output, AVATAR_FORMAT, quality=85, method=4
+                )
+                resized[size] = output.getvalue()
+    except (OSError, Image.DecompressionBombError) as e:
+        # PIL exceptions are re-raised in the API process, keep them simple to pickle
+        raise ValueError(f"Invalid image: {e}")
+    return resized
+
+
+class AvatarPipeline:
+    """
+    Resizes avatars in a process pool and stores them content-addressed.
+
+    Args:
+        storage (LocalStorage): The storage the resized avatars are uploaded to.
+        sizes (list[int]): The edge lengths of the resized avatars in pixels; the largest one is the avatar URL of the user.
+        process_workers (int): The number of worker processes.
+        prefix (str): The key prefix of the stored avatars.
+    """
+
+    def __init__(
+        self,
+        storage: LocalStorage,
+        sizes: list[int],
+        process_workers: int = 2,
+        prefix: str = "avatars",
+    ) -> None:
+        self.storage = storage
+        self.sizes = sorted(sizes)
+        self.prefix = prefix
+        self._executor = ProcessPoolExecutor(max_workers=process_workers)
+
+    def key(self, digest: str, size: int) -> str:
+        """
+        Returns the storage key of one size of an avatar.
+
+        Args:
+            digest (str): The SHA-256 of the uploaded file.
+            size (int): The edge length in pixels.
+
+        Returns:
+            str: The storage key, e.g. "avatars/ab/ab12.../250.webp".
+        """
+        return f"{self.prefix}/{digest[:2]}/{digest}/{size}.{AVATAR_FORMAT}"
+
+    async def process(self, data: bytes) -> dict[int, str]:
+        """
+        Resizes and stores an avatar, unless an identical file has been processed before.
+
+        Args:
+            data (bytes): The uploaded image.
+
+        Returns:
+            dict[int, str]: The URL of every size.
+
+        Raises:
+            ValueError: If the image cannot be decoded.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        keys = {size: self.key(digest, size) for size in self.sizes}
+        # the largest size is stored last, if it exists all sizes do
+        if self.storage.exists(keys[self.sizes[-1]]):
+            return {size: self.storage.url(key) for size, key in keys.items()}
+        loop = asyncio.get_running_loop()
+        resized = await loop.run_in_executor(
+            self._executor, resize_image, data, self.sizes
+        )
+        urls = {}
+        for size in self.sizes:
+            urls[size] = await self.storage.upload(
+                keys[size], resized[size], AVATAR_CONTENT_TYPE
+            )
+        return urls
+
+    def close(self) -> None:
+        """
+        Waits for running resizes and stops the worker processes.
+        """
+        self._executor.shutdown(wait=True)
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    Serves the content-addressed avatars of the pipeline with a long-lived Cache-Control header.
+    """
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+def create_avatar_pipeline(
+    settings: Settings, storage: AbstractStorage
+) -> AvatarPipeline | None:
+    """
+    Creates the avatar pipeline if `settings.avatar_pipeline` is enabled.
+
+    Args:
+        settings (Settings): The application settings.
+        storage (AbstractStorage): The avatar storage.
+
+    Returns:
+        AvatarPipeline | None: The pipeline, or None if it is disabled.
+
+    Raises:
+        ValueError: If the pipeline is enabled without the "local" avatar storage.
+    """
+    if not settings.avatar_pipeline:
+        return None
+    if not isinstance(storage, LocalStorage):
+        raise ValueError('The avatar pipeline requires AVATAR_STORAGE="local"')
+    return AvatarPipeline(
+        storage, settings.avatar_sizes, settings.avatar_process_workers
+    )
+
+
+def get_avatar_pipeline(request: Request) -> AvatarPipeline | None:
+    """
+    Returns the avatar pipeline created at application startup.
+
+    Args:
+        request (Request): The current request.
+
+    Returns:
+        AvatarPipeline | None: The pipeline, or None if `avatar_pipeline` is disabled.
+    """
+    return request.app.state.avatar_pipeline
@@ -0,0 +1,177 @@
+"""
+A pooled SMTP transport.
+
+Opening an SMTP session costs a TCP connect, a STARTTLS handshake and an AUTH round trip, which dominates the time of sending a single email. `SMTPConnectionPool` keeps a few authenticated sessions open and sends every message over an idle one, so a burst of emails pays the handshake once per connection instead of once per email.
+"""
+
+import asyncio
+import time
+from email.message import Message
+
+import aiosmtplib
+from fastapi_mail import ConnectionConfig
+from fastapi_mail.errors import ConnectionErrors
+
+from src.services.tracing import traced
+
+
+class PooledConnection:
+    """
+    An open SMTP session with its usage statistics.
+
+    Args:
+        smtp (aiosmtplib.SMTP): The connected and authenticated SMTP client.
+    """
+
+    def __init__(self, smtp: aiosmtplib.SMTP) -> None:
+        self.smtp = smtp
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """
+    Reuses authenticated SMTP connections across messages.
+
+    At most `size` connections are open at the same time, senders beyond that wait for a free connection. A connection is closed after `max_messages_per_connection` messages (many providers limit the messages per session) and when it has been idle for `max_idle_seconds` (servers drop idle sessions).
+
+    Args:
+        config (ConnectionConfig): The SMTP server configuration.
+        size (int): The maximum number of open connections.
+        max_messages_per_connection (int): The number of messages after which a connection is replaced.
+        max_idle_seconds (float): How long an unused connection is kept open.
+    """
+
+    def __init__(
+        self,
+        config: ConnectionConfig,
+        size: int = 4,
+        max_messages_per_connection: int = 100,
+        max_idle_seconds: float = 30,
+    ) -> None:
+        self.config = config
+        self.size = size
+        self.max_messages_per_connection = max_messages_per_connection
+        self.max_idle_seconds = max_idle_seconds
+        self._idle: list[PooledConnection] = []
+        self._semaphore = asyncio.Semaphore(size)
+        self.connections_opened = 0
+
+    @traced("smtp connect")
+    async def _connect(self) -> PooledConnection:
+        """
+        Opens and authenticates a new SMTP connection.
+
+        Returns:
+            PooledConnection: The new connection.
+
+        Raises:
+            ConnectionErrors: If the connection or the login fails.
+        """
+        smtp = aiosmtplib.SMTP(
+            hostname=self.config.MAIL_SERVER,
+            port=self.config.MAIL_PORT,
+            timeout=self.config.TIMEOUT,
+            use_tls=self.config.MAIL_SSL_TLS,
+            start_tls=self.config.MAIL_STARTTLS,
+            validate_certs=self.config.VALIDATE_CERTS,
+        )
+        try:
+            await smtp.connect()
+            if self.config.USE_CREDENTIALS:
+                await smtp.login(
+                    self.config.MAIL_USERNAME,
+                    self.config.MAIL_PASSWORD,
+                )
+        except Exception as error:
+            smtp.close()
+            raise ConnectionErrors(
+                f"Exception raised {error}, check your credentials or email service configuration"
+            )
+        self.connections_opened += 1
+        return PooledConnection(smtp)
+
+    @staticmethod
+    async def _disconnect(connection: PooledConnection) -> None:
+        """
+        Closes a connection, ignoring errors of connections the server has already dropped.
+
+        Args:
+            connection (PooledConnection): The connection to close.
+        """
+        try:
+            await connection.smtp.quit()
+        except aiosmtplib.SMTPException:
+            connection.smtp.close()
+
+    async def _acquire(self) -> PooledConnection:
+        """
+        Returns an idle connection that is still usable, or opens a new one.
+
+        Returns:
+            PooledConnection: The connection to send with.
+        """
+        now = time.monotonic()
+        while self._idle:
+            connection = self._idle.pop()
+            if (
+                connection.smtp.is_connected
+                and now - connection.last_used < self.max_idle_seconds
+            ):
+                return connection
+            await self._disconnect(connection)
+        return await self._connect()
+
+    async def _release(self, connection: PooledConnection) -> None:
+        """
+        Returns a connection to the pool, or closes it once it has reached its message limit.
+
+        Args:
+            connection (PooledConnection): The connection to release.
+        """
+        connection.last_used = time.monotonic()
+        if connection.messages_sent >= self.max_messages_per_connection:
+            await self._disconnect(connection)
+        else:
+            self._idle.append(connection)
+
+    @traced("smtp send")
+    async def send(self, message: Message) -> None:
+        """
+        Sends a message over a pooled connection.
+
+        A reused connection may have been closed by the server in the meantime, in that case the message is sent once more over a new connection.
+
+        Args:
+            message (Message): The message to send.
+
+        Raises:
+            ConnectionErrors: If no connection to the SMTP server can be opened.
+            aiosmtplib.SMTPException: If the server rejects the message.
+        """
+        if self.config.SUPPRESS_SEND:
+            return
+        async with self._semaphore:
+            connection = await self._acquire()
+            try:
+                try:
+                    await connection.smtp.send_message(message)
+                except aiosmtplib.SMTPServerDisconnected:
+                    connection.smtp.close()
+                    if connection.messages_sent == 0:
+                        raise
+                    connection = await self._connect()
+                    await connection.smtp.send_message(message)
+            except BaseException:
+                # the state of the session is unknown, never reuse it
+                connection.smtp.close()
+                raise
+            connection.messages_sent += 1
+            await self._release(connection)
+
+    async def close(self) -> None:
+        """
+        Closes all idle connections.
+        """
+        while self._idle:
+            await self._disconnect(self._idle.pop())
@@ -0,0 +1,207 @@
+"""
+Prometheus metrics of the application, exposed on `/metrics`.
+
+- `http_request_duration_seconds`: request latency per method, route template and status code.
+- `http_request_timeouts_total`: requests stopped by their deadline or by the client disconnecting, per route (see `src.services.deadlines`).
+- `db_queries_per_request` / `db_time_per_request_seconds`: number and total time of the database statements of a request, per route.
+- `db_query_duration_seconds` / `db_pool_checkout_seconds`: see `src.database.instrumentation`.
+- `cache_requests_total`: hits and misses of the Redis user cache, "unavailable" when Redis could not be asked.
+- `idempotency_requests_total`: requests with an `Idempotency-Key` by outcome (see `src.services.idempotency`).
+- `circuit_breaker_transitions_total`: state changes of the circuit breakers (`src.services.circuit_breaker`).
+- `password_hash_duration_seconds`: time spent in bcrypt.
+- `email_outbox_messages`: pending and dead emails in the outbox, queried at most every `ttl` seconds.
+
+When several worker processes serve the application (`gunicorn.conf.py`), `PROMETHEUS_MULTIPROC_DIR` is set and every process writes its metrics to files in that directory; `metrics_registry` merges them, so every worker returns the metrics of all the workers.
+"""
+
+import logging
+import os
+import time
+from functools import cache
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram
+from prometheus_client.multiprocess import MultiProcessCollector
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy import func, select
+
+from src.database.instrumentation import request_query_stats
+from src.database.models import EmailOutbox, OUTBOX_PENDING, OUTBOX_DEAD
+
+logger = logging.getLogger(__name__)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency.",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_TIMEOUTS = Counter(
+    "http_request_timeouts_total",
+    "Requests stopped by their deadline or by the client disconnecting.",
+    ["route", "reason"],
+)
+REQUEST_QUERIES = Histogram(
+    "db_queries_per_request",
+    "Number of database statements executed by a request.",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+REQUEST_DB_TIME = Histogram(
+    "db_time_per_request_seconds",
+    "Total execution time of the database statements of a request.",
+    ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Lookups in the Redis caches.",
+    ["cache", "result"],
+)
+IDEMPOTENCY_REQUESTS = Counter(
+    "idempotency_requests_total",
+    "Requests with an Idempotency-Key by outcome.",
+    ["outcome"],
+)
+CIRCUIT_BREAKER_TRANSITIONS = Counter(
+    "circuit_breaker_transitions_total",
+    "State changes of the circuit breakers.",
+    ["name", "state"],
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent hashing or verifying a password with bcrypt.",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1, 2),
+)
+
+
+@cache
+def metrics_registry() -> CollectorRegistry:
+    """
+    Returns the registry exposed on `/metrics`, created once per process.
+
+    Returns:
+        CollectorRegistry: A registry merging the metric files of every worker process if `PROMETHEUS_MULTIPROC_DIR` is set, otherwise the default registry.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    return registry
+
+
+# requests matching no route share one label, unknown paths must not create new series
+UNMATCHED_ROUTE = "unmatched"
+
+
+class PrometheusMiddleware:
+    """
+    Records the latency and the database statistics of every HTTP request, labelled with the route template (e.g. "/api/contacts/{contact_id}").
+
+    Args:
+        app (ASGIApp): The wrapped application.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = request_query_stats(scope)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            route = route.path if route is not None else UNMATCHED_ROUTE
+            REQUEST_LATENCY.labels(scope["method"], route, status_code).observe(
+                time.perf_counter() - start
+            )
+            REQUEST_QUERIES.labels(route).observe(stats.count)
+            REQUEST_DB_TIME.labels(route).observe(stats.duration)
+
+
+def count_outbox(session) -> dict[str, int]:
+    """
+    Counts the pending and dead emails in the outbox.
+
+    Args:
+        session (Session): The database session.
+
+    Returns:
+        dict[str, int]: The number of emails by status.
+    """
+    rows = session.execute(
+        select(EmailOutbox.status, func.count())
+        .where(EmailOutbox.status.in_([OUTBOX_PENDING, OUTBOX_DEAD]))
+        .group_by(EmailOutbox.status)
+    ).all()
+    return {OUTBOX_PENDING: 0, OUTBOX_DEAD: 0, **dict(rows)}
+
+
+def count_pending_outbox(session) -> int:
+    """
+    Counts the pending emails in the outbox, with a query the partial index `ix_email_outbox_pending` serves, so the cost follows the backlog rather than the size of the table.
+
+    Args:
+        session (Session): The database session.
+
+    Returns:
+        int: The number of pending emails.
+    """
+    return session.execute(
+        select(func.count())
+        .select_from(EmailOutbox)
+        .where(EmailOutbox.status == OUTBOX_PENDING)
+    ).scalar_one()
+
+
+class OutboxDepthCollector(Collector):
+    """
+    Reports the number of pending and dead emails in the outbox. The counts are cached for `ttl` seconds, so frequent scrapes do not load the database.
+
+    Args:
+        session_factory (Callable[[], Session]): Creates the session the outbox is counted with.
+        ttl (float): How long the counts are reused.
+    """
+
+    def __init__(self, session_factory, ttl: float = 15) -> None:
+        self._session_factory = session_factory
+        self.ttl = ttl
+        self._counts: dict[str, int] | None = None
+        self._expires = 0.0
+
+    def _count(self) -> dict[str, int]:
+        with self._session_factory() as session:
+            return count_outbox(session)
+
+    def collect(self):
+        now = time.monotonic()
+        if self._counts is None or now >= self._expires:
+            try:
+                self._counts = self._count()
+            except Exception:
+                # keep the last counts, a scrape must not fail because of the database
+                logger.warning("Cannot count the outbox emails", exc_info=True)
+            self._expires = now + self.ttl
+        if self._counts is None:
+            return
+        gauge = GaugeMetricFamily(
+            "email_outbox_messages",
+            "Emails in the outbox by status.",
+            labels=["status"],
+        )
+        for status, count in self._counts.items():
+            gauge.add_metric([status], count)
+        yield gauge
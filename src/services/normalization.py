@@ -0,0 +1,91 @@
+"""
+Cached normalization of contact phone numbers and email addresses.
+
+Parsing a phone number with `phonenumbers` and validating an email address with `email-validator` are by far the most expensive parts of building a `ContactIn` or `ContactOut` model. The same values are validated over and over again (on input, on every output model built from the database, in searches), so both normalizers are memoized with a bounded LRU cache.
+
+The normalizers are shared by the schemas and the contacts repository, so a search term is always normalized exactly the same way as the value that was stored. `phonenumbers` is imported by the first phone number parsed, not when the schemas are imported.
+"""
+
+import re
+from functools import lru_cache
+
+from pydantic.networks import validate_email
+from pydantic_core import PydanticCustomError
+
+PHONE_REGION_CODE = "PL"
+NORMALIZER_CACHE_SIZE = 65536
+
+# separators are removed before the cache lookup, so "+48 654-789-654" and "+48654789654" share one entry
+_PHONE_SEPARATORS = re.compile(r"[\s().\-/]+")
+
+
+@lru_cache(maxsize=NORMALIZER_CACHE_SIZE)
+def _parse_phone(phone: str, region_code: str) -> str:
+    """
+    Parses and formats a phone number, the result is memoized.
+
+    Args:
+        phone (str): The phone number without separators.
+        region_code (str): The region code used for numbers without an international prefix.
+
+    Returns:
+        str: The phone number in E164 format.
+
+    Raises:
+        PydanticCustomError: If the value is not a valid phone number.
+    """
+    import phonenumbers
+
+    try:
+        parsed_number = phonenumbers.parse(phone, region_code)
+    except phonenumbers.NumberParseException as exc:
+        raise PydanticCustomError(
+            "value_error", "value is not a valid phone number"
+        ) from exc
+    if not phonenumbers.is_valid_number(parsed_number):
+        raise PydanticCustomError("value_error", "value is not a valid phone number")
+    return phonenumbers.format_number(
+        parsed_number, phonenumbers.PhoneNumberFormat.E164
+    )
+
+
+def normalize_phone(phone: str, region_code: str = PHONE_REGION_CODE) -> str:
+    """
+    Normalizes a phone number to the E164 format.
+
+    Args:
+        phone (str): The phone number to normalize.
+        region_code (str, optional): The region code used for numbers without an international prefix (default is "PL").
+
+    Returns:
+        str: The phone number in E164 format, e.g. "+48654789654".
+
+    Raises:
+        PydanticCustomError: If the value is not a valid phone number.
+    """
+    return _parse_phone(_PHONE_SEPARATORS.sub("", phone), region_code)
+
+
+@lru_cache(maxsize=NORMALIZER_CACHE_SIZE)
+def normalize_email(email: str) -> str:
+    """
+    Validates and normalizes an email address, the result is memoized.
+
+    Args:
+        email (str): The email address to normalize.
+
+    Returns:
+        str: The normalized email address (the same value pydantic's `EmailStr` produces).
+
+    Raises:
+        PydanticCustomError: If the value is not a valid email address.
+    """
+    return validate_email(email)[1]
+
+
+def clear_normalizer_caches() -> None:
+    """
+    Clears the phone number and email caches.
+    """
+    _parse_phone.cache_clear()
+    normalize_email.cache_clear()
@@ -0,0 +1,161 @@
+"""
+The email outbox worker.
+
+The API only writes emails to the `email_outbox` table, in the same transaction as the user change that triggers them. The worker runs as a separate process (`python email_worker.py`), claims due emails in batches, sends them and records the result: failed emails are retried with exponential backoff and dead-lettered after `outbox_max_attempts` attempts. Sent emails are deleted after `outbox_retention_days`, so the table only grows with the backlog; dead-lettered emails are kept for inspection.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+from src.repository.abstract_repository import AbstractOutboxRepository
+
+logger = logging.getLogger(__name__)
+
+# sent emails deleted per transaction, so the retention never holds long locks
+DELETE_CHUNK_SIZE = 1000
+
+
+class OutboxWorker:
+    """
+    Drains the email outbox in batches.
+
+    Args:
+        repository_factory (Callable[[], AbstractOutboxRepository]): Creates an outbox repository with a fresh session for every batch.
+        sender (Callable[[str, str, dict], Awaitable[None]]): Sends a single email, raises on failure (e.g. `src.services.email.send_email`).
+        batch_size (int): The maximum number of emails claimed at once.
+        max_attempts (int): The number of failed attempts after which an email is dead-lettered.
+        backoff_seconds (float): The delay before the first retry, doubled with every further attempt.
+        max_backoff_seconds (float): The upper limit of the retry delay.
+        lease_seconds (int): How long claimed emails are hidden from other workers.
+        poll_seconds (float): How long to wait when the outbox is empty.
+        retention_days (float | None): How long sent emails are kept, None to keep them forever.
+        cleanup_interval_seconds (float): How often the sent emails past the retention are deleted.
+    """
+
+    def __init__(
+        self,
+        repository_factory: Callable[[], AbstractOutboxRepository],
+        sender: Callable[[str, str, dict], Awaitable[None]],
+        batch_size: int = 50,
+        max_attempts: int = 8,
+        backoff_seconds: float = 30,
+        max_backoff_seconds: float = 3600,
+        lease_seconds: int = 300,
+        poll_seconds: float = 2,
+        retention_days: float | None = 30,
+        cleanup_interval_seconds: float = 3600,
+    ) -> None:
+        self._repository_factory = repository_factory
+        self._sender = sender
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.retention_days = retention_days
+        self.cleanup_interval_seconds = cleanup_interval_seconds
+
+    def retry_delay(self, attempts: int) -> float:
+        """
+        Returns the delay before the next attempt of an email that has already failed `attempts` times.
+
+        Args:
+            attempts (int): The number of failed attempts so far.
+
+        Returns:
+            float: The delay in seconds.
+        """
+        return min(self.backoff_seconds * 2**attempts, self.max_backoff_seconds)
+
+    async def _deliver(self, repository: AbstractOutboxRepository, message) -> None:
+        """
+        Sends a single claimed email and records the result.
+
+        Args:
+            repository (AbstractOutboxRepository): The repository of the current batch.
+            message (EmailOutbox): The claimed email.
+        """
+        try:
+            await self._sender(
+                message.recipient, message.request_type, message.template_body
+            )
+        except Exception as e:
+            await repository.mark_failed(
+                message,
+                f"{type(e).__name__}: {e}",
+                self.max_attempts,
+                self.retry_delay(message.attempts),
+            )
+        else:
+            await repository.mark_sent(message)
+
+    async def run_once(self) -> int:
+        """
+        Claims and sends one batch of due emails. The emails of a batch are sent concurrently, the sender limits how many are in flight (e.g. by the size of its SMTP connection pool).
+
+        Returns:
+            int: The number of emails processed (sent or failed).
+        """
+        repository = self._repository_factory()
+        try:
+            messages = await repository.claim_batch(self.batch_size, self.lease_seconds)
+            await asyncio.gather(
+                *(self._deliver(repository, message) for message in messages)
+            )
+            await repository.commit()
+        finally:
+            await repository.close()
+        return len(messages)
+
+    async def delete_sent(self) -> int:
+        """
+        Deletes the emails sent more than `retention_days` ago, in chunks of `DELETE_CHUNK_SIZE` emails.
+
+        Returns:
+            int: The number of deleted emails.
+        """
+        if self.retention_days is None:
+            return 0
+        before = datetime.utcnow() - timedelta(days=self.retention_days)
+        deleted = 0
+        while True:
+            repository = self._repository_factory()
+            try:
+                chunk = await repository.delete_sent(before, DELETE_CHUNK_SIZE)
+                await repository.commit()
+            finally:
+                await repository.close()
+            deleted += chunk
+            if chunk < DELETE_CHUNK_SIZE:
+                return deleted
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """
+        Drains the outbox until `stop` is set, deleting the sent emails past the retention every `cleanup_interval_seconds`. The current batch is always finished before returning.
+
+        Args:
+            stop (asyncio.Event): Set to stop the worker gracefully.
+        """
+        next_cleanup = time.monotonic()
+        while not stop.is_set():
+            if time.monotonic() >= next_cleanup:
+                next_cleanup = time.monotonic() + self.cleanup_interval_seconds
+                try:
+                    await self.delete_sent()
+                except Exception:
+                    logger.warning("Cannot delete the sent emails", exc_info=True)
+            try:
+                processed = await self.run_once()
+            except Exception:
+                # e.g. the database is unreachable, try again after a pause
+                logger.warning("Cannot process the outbox", exc_info=True)
+                processed = 0
+            if processed < self.batch_size:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
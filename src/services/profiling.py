@@ -0,0 +1,263 @@
+"""
+On-demand profiling of the running application.
+
+`SamplingProfiler` samples the Python stacks of the process from a background thread at a fixed interval, so the profiled code runs unmodified and the overhead is bounded by the sampling rate. `memory_profile` records the allocations made during a time window with `tracemalloc`. Both return stacks in the collapsed format ("root;caller;callee count" per line), which flamegraph.pl and speedscope render as a flame graph.
+
+Only one profile runs at a time in a process, a second one fails with `ProfilerBusy`. Profiling is opt-in (`PROFILING_ENABLED`) and restricted to the users listed in `PROFILING_ADMIN_EMAILS`, see `src.routes.profiling` and `ProfileRequestMiddleware`.
+"""
+
+import asyncio
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+
+from jose import JWTError, jwt
+
+from src.conf.config import settings
+
+_profiling = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """
+    Raised when a profile is started while another one is running.
+    """
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+def collapse(stacks: Counter) -> str:
+    """
+    Formats stacks in the collapsed format.
+
+    Args:
+        stacks (Counter): The weight (samples or bytes) of every stack, a stack being a tuple of frame labels from the root to the leaf.
+
+    Returns:
+        str: One "root;...;leaf weight" line per stack, the heaviest first.
+    """
+    return "".join(
+        f"{';'.join(stack)} {weight}\n" for stack, weight in stacks.most_common()
+    )
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of the threads of the process while it is running. Use it as a context manager.
+
+    Args:
+        interval (float): The time between two samples in seconds.
+        thread_ids (list[int], optional): The threads to sample (default is None, every thread except the sampler itself).
+    """
+
+    def __init__(self, interval: float = 0.005, thread_ids: list[int] | None = None):
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids is not None else None
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _sample(self) -> None:
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or (
+                self.thread_ids is not None and thread_id not in self.thread_ids
+            ):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)))
+            self.stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        """
+        Starts sampling in a background thread.
+
+        Raises:
+            ProfilerBusy: If another profile is running.
+        """
+        if not _profiling.acquire(blocking=False):
+            raise ProfilerBusy("Another profile is running")
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops sampling and waits for the sampling thread.
+        """
+        self._stop.set()
+        self._thread.join()
+        _profiling.release()
+
+    def __enter__(self) -> "SamplingProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def collapsed(self) -> str:
+        """
+        Returns the sampled stacks in the collapsed format, weighted by the number of samples.
+
+        Returns:
+            str: The collapsed stacks.
+        """
+        return collapse(self.stacks)
+
+
+async def cpu_profile(seconds: float, interval: float) -> str:
+    """
+    Samples every thread of the process for a time window, while the event loop keeps serving requests.
+
+    Args:
+        seconds (float): The length of the window.
+        interval (float): The time between two samples.
+
+    Returns:
+        str: The collapsed stacks, weighted by the number of samples.
+
+    Raises:
+        ProfilerBusy: If another profile is running.
+    """
+    with SamplingProfiler(interval) as profiler:
+        await asyncio.sleep(seconds)
+    return profiler.collapsed()
+
+
+async def memory_profile(seconds: float, frames: int = 25, limit: int = 100) -> str:
+    """
+    Records the allocations made during a time window that are still alive at its end.
+
+    Args:
+        seconds (float): The length of the window.
+        frames (int): The number of frames stored per allocation.
+        limit (int): The number of largest allocation stacks returned.
+
+    Returns:
+        str: The collapsed allocation stacks, weighted by their size in bytes.
+
+    Raises:
+        ProfilerBusy: If another profile is running.
+    """
+    if not _profiling.acquire(blocking=False):
+        raise ProfilerBusy("Another profile is running")
+    # tracing may have been started with PYTHONTRACEMALLOC, leave it running then
+    started = not tracemalloc.is_tracing()
+    try:
+        if started:
+            tracemalloc.start(frames)
+        await asyncio.sleep(seconds)
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        if started:
+            tracemalloc.stop()
+        _profiling.release()
+    snapshot = snapshot.filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ]
+    )
+    stacks = Counter()
+    for statistic in snapshot.statistics("traceback")[:limit]:
+        stack = tuple(
+            f"{frame.filename}:{frame.lineno}" for frame in statistic.traceback
+        )
+        stacks[stack] += statistic.size
+    return collapse(stacks)
+
+
+def is_profiling_admin(authorization: str | None) -> bool:
+    """
+    Checks whether an Authorization header carries a valid access token of a profiling admin.
+
+    Args:
+        authorization (str | None): The value of the Authorization header.
+
+    Returns:
+        bool: True if the token is valid and its user is listed in `profiling_admin_emails`.
+    """
+    if not authorization or not authorization.startswith("Bearer "):
+        return False
+    try:
+        payload = jwt.decode(
+            authorization.removeprefix("Bearer "),
+            settings.secret_key,
+            algorithms=[settings.algorithm],
+        )
+    except JWTError:
+        return False
+    return (
+        payload.get("scope") == "access_token"
+        and payload.get("sub") in settings.profiling_admin_emails
+    )
+
+
+class ProfileRequestMiddleware:
+    """
+    Profiles single requests of profiling admins carrying an `X-Profile` header. The response is replaced by the collapsed stacks of the event loop thread sampled while the request was handled; the original status code is returned in the `X-Profile-Status` header.
+
+    Other requests handled concurrently on the event loop show up in the profile too, and code running in worker threads (synchronous dependencies) does not. If another profile is running, the request is handled without profiling.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+        interval (float): The time between two samples in seconds.
+    """
+
+    def __init__(self, app, interval: float = 0.001) -> None:
+        self.app = app
+        self.interval = interval
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        if b"x-profile" not in headers or not is_profiling_admin(
+            headers.get(b"authorization", b"").decode("latin-1")
+        ):
+            await self.app(scope, receive, send)
+            return
+        profiler = SamplingProfiler(self.interval, [threading.get_ident()])
+        try:
+            profiler.start()
+        except ProfilerBusy:
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def discard(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"x-profile-status", str(status_code).encode()),
+                ],
+            }
+        )
+        await send(
+            {"type": "http.response.body", "body": profiler.collapsed().encode()}
+        )
@@ -0,0 +1,102 @@
+"""
+Rate limiting that survives a Redis outage.
+
+`FallbackRateLimiter` counts the requests in Redis like `fastapi_limiter.depends.RateLimiter`, shared by all workers. While the Redis circuit breaker is open (`src.services.circuit_breaker`) it counts them in the memory of the worker instead, with the same fixed windows; the limit then applies per worker process, so a client can make up to `times` requests per window to every worker.
+"""
+
+import logging
+import time
+
+from fastapi_limiter import FastAPILimiter
+from fastapi_limiter.depends import RateLimiter
+from redis.exceptions import NoScriptError, RedisError
+
+from src.services.circuit_breaker import redis_breaker
+
+logger = logging.getLogger(__name__)
+
+
+class LocalRateLimits:
+    """
+    Fixed-window request counters kept in the memory of the process.
+
+    Args:
+        max_keys (int): Number of counters above which the expired ones are dropped.
+    """
+
+    def __init__(self, max_keys: int = 10000) -> None:
+        self.max_keys = max_keys
+        self._windows: dict[str, tuple[int, float]] = {}
+
+    def check(self, key: str, times: int, milliseconds: int) -> int:
+        """
+        Counts a request, with the semantics of the Lua script of `FastAPILimiter`.
+
+        Args:
+            key (str): The rate limit key of the client and the route.
+            times (int): The number of requests allowed per window.
+            milliseconds (int): The length of the window.
+
+        Returns:
+            int: 0 if the request is allowed, otherwise the milliseconds until the window ends.
+        """
+        now = time.monotonic()
+        count, expires = self._windows.get(key, (0, 0.0))
+        if expires <= now:
+            if len(self._windows) >= self.max_keys:
+                self._windows = {
+                    k: window for k, window in self._windows.items() if window[1] > now
+                }
+            self._windows[key] = (1, now + milliseconds / 1000)
+            return 0
+        if count + 1 > times:
+            return max(1, int((expires - now) * 1000))
+        self._windows[key] = (count + 1, expires)
+        return 0
+
+
+local_rate_limits = LocalRateLimits()
+
+
+class FallbackRateLimiter(RateLimiter):
+    """
+    Rate limiter counting the requests in Redis, or in the process while Redis is unavailable. Takes the arguments of `RateLimiter`.
+    """
+
+    async def _check(self, key: str) -> int:
+        if redis_breaker.allow():
+            try:
+                if FastAPILimiter.lua_sha is None:
+                    # Redis was down at startup
+                    FastAPILimiter.lua_sha = await FastAPILimiter.redis.script_load(
+                        FastAPILimiter.lua_script
+                    )
+                pexpire = await super()._check(key)
+            except NoScriptError:
+                # Redis answered, the caller loads the script again
+                redis_breaker.record_success()
+                raise
+            except RedisError:
+                logger.warning(
+                    "Cannot check the rate limit in Redis, counting in the process",
+                    exc_info=True,
+                )
+                redis_breaker.record_failure()
+            else:
+                redis_breaker.record_success()
+                return pexpire
+        return local_rate_limits.check(key, self.times, self.milliseconds)
+
+
+async def init_rate_limiter(redis) -> None:
+    """
+    Initializes `FastAPILimiter` with the Redis client. The application starts even if Redis is unavailable; the script of the limiter is loaded on first use then.
+
+    Args:
+        redis (Redis): The asyncio Redis client of the limiter.
+    """
+    try:
+        await FastAPILimiter.init(redis)
+    except RedisError:
+        logger.warning("Cannot initialize the rate limiter", exc_info=True)
+        redis_breaker.record_failure()
@@ -0,0 +1,198 @@
+"""
+The clients the application shares between requests and jobs.
+
+`Resources` creates every client on first use, so importing the application performs no I/O and opens no connection, and a process only creates what it uses: the email worker never creates the Redis clients, a web worker never creates the SMTP pool. The application lifespan (`main.lifespan`) closes them at shutdown, the scripts with `close`. Tests replace a client by assigning the attribute, e.g. `resources.redis = fake_redis`.
+"""
+
+from functools import cached_property
+
+from redis import Redis
+from redis import asyncio as aioredis
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.conf.config import Settings, settings
+from src.database.db import create_database_engine
+from src.database.replicas import RecentWrites
+from src.services.circuit_breaker import redis_breaker
+
+
+class Resources:
+    """
+    Lazily created shared clients: the database engines, the Redis clients, the SMTP connection pool and the avatar storage.
+
+    Args:
+        settings (Settings): The application settings the clients are configured from.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self._settings = settings
+
+    @cached_property
+    def engine(self) -> Engine:
+        """
+        The engine of the primary database.
+        """
+        return create_database_engine(self._settings.sqlalchemy_database_url)
+
+    @cached_property
+    def session_factory(self) -> sessionmaker:
+        """
+        Creates sessions of the primary database.
+        """
+        return sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+    @cached_property
+    def replica_engine(self) -> Engine | None:
+        """
+        The engine of the read-only replica, None if `sqlalchemy_replica_url` is not configured.
+        """
+        if not self._settings.sqlalchemy_replica_url:
+            return None
+        return create_database_engine(self._settings.sqlalchemy_replica_url)
+
+    @cached_property
+    def replica_session_factory(self) -> sessionmaker | None:
+        """
+        Creates sessions of the read-only replica, None without a replica.
+        """
+        if self.replica_engine is None:
+            return None
+        return sessionmaker(autocommit=False, autoflush=False, bind=self.replica_engine)
+
+    def session(self) -> Session:
+        """
+        Opens a session of the primary database.
+
+        Returns:
+            Session: The new session.
+        """
+        return self.session_factory()
+
+    def replica_session(self) -> Session | None:
+        """
+        Opens a session of the read-only replica.
+
+        Returns:
+            Session | None: The new session, None without a replica.
+        """
+        if self.replica_session_factory is None:
+            return None
+        return self.replica_session_factory()
+
+    @cached_property
+    def redis(self) -> Redis:
+        """
+        The Redis client of the user cache and the read-your-writes markers.
+        """
+        return Redis(
+            host=self._settings.redis_host,
+            port=self._settings.redis_port,
+            password=self._settings.redis_password or None,
+            db=0,
+            socket_timeout=self._settings.redis_timeout_seconds,
+            socket_connect_timeout=self._settings.redis_timeout_seconds,
+        )
+
+    @cached_property
+    def async_redis(self) -> aioredis.Redis:
+        """
+        The asyncio Redis client of the rate limiter.
+        """
+        return aioredis.Redis(
+            host=self._settings.redis_host,
+            port=self._settings.redis_port,
+            password=self._settings.redis_password or None,
+            db=0,
+            socket_timeout=self._settings.redis_timeout_seconds,
+            socket_connect_timeout=self._settings.redis_timeout_seconds,
+            encoding="utf-8",
+            decode_responses=True,
+        )
+
+    @cached_property
+    def recent_writes(self) -> RecentWrites | None:
+        """
+        The read-your-writes markers, None without a replica.
+        """
+        if not self._settings.sqlalchemy_replica_url:
+            return None
+        return RecentWrites(
+            self.redis, self._settings.read_your_writes_seconds, redis_breaker
+        )
+
+    @cached_property
+    def mail_transport(self):
+        """
+        The pool of SMTP connections every email of the process is sent over.
+        """
+        # imported here, the email module needs the authentication service, which needs the resources
+        from src.services.email import get_config
+        from src.services.mail_transport import SMTPConnectionPool
+
+        return SMTPConnectionPool(
+            get_config(),
+            size=self._settings.mail_pool_size,
+            max_messages_per_connection=self._settings.mail_pool_max_messages,
+            max_idle_seconds=self._settings.mail_pool_idle_seconds,
+        )
+
+    @cached_property
+    def storage(self):
+        """
+        The avatar storage, configuring the Cloudinary client when it is used.
+        """
+        from src.services.storage import create_storage
+
+        return create_storage(self._settings)
+
+    def created(self, name: str) -> bool:
+        """
+        Checks whether a client has been created.
+
+        Args:
+            name (str): The name of the client attribute.
+
+        Returns:
+            bool: True if the client exists.
+        """
+        return name in self.__dict__
+
+    def after_fork(self) -> None:
+        """
+        Drops the database connections inherited from the parent process without closing them for the parent, so the child opens its own.
+        """
+        for name in ("engine", "replica_engine"):
+            if self.created(name) and self.__dict__[name] is not None:
+                self.__dict__[name].dispose(close=False)
+
+    async def close(self) -> None:
+        """
+        Closes the clients that have been created; they are created again if used afterwards.
+        """
+        if self.created("storage"):
+            self.storage.close()
+        if self.created("mail_transport"):
+            await self.mail_transport.close()
+        if self.created("async_redis"):
+            await self.async_redis.aclose()
+        if self.created("redis"):
+            self.redis.close()
+        for name in ("engine", "replica_engine"):
+            if self.created(name) and self.__dict__[name] is not None:
+                self.__dict__[name].dispose()
+        for name in (
+            "engine",
+            "session_factory",
+            "replica_engine",
+            "replica_session_factory",
+            "redis",
+            "async_redis",
+            "recent_writes",
+            "mail_transport",
+            "storage",
+        ):
+            self.__dict__.pop(name, None)
+
+
+resources = Resources(settings)
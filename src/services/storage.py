@@ -0,0 +1,234 @@
+"""
+Avatar storage backends.
+
+The storage is created once at startup (`create_storage`) and injected into the routes with the `get_storage` dependency. Blocking uploads run in a dedicated thread pool, so a slow upload never blocks the event loop or the threads FastAPI uses for synchronous dependencies.
+"""
+
+import abc
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from fastapi import Request
+
+from src.conf.config import Settings
+
+
+class AbstractStorage(abc.ABC):
+    """
+    Defines an abstract base class for a file storage. Concrete implementations store the file under the given key and return the public URL of the stored file.
+
+    Args:
+        upload_workers (int): The number of threads running blocking uploads.
+    """
+
+    def __init__(self, upload_workers: int = 4) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=upload_workers, thread_name_prefix="storage"
+        )
+
+    async def _run(self, function, *args, **kwargs):
+        """
+        Runs a blocking function in the upload thread pool.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, lambda: function(*args, **kwargs)
+        )
+
+    @abc.abstractmethod
+    async def upload(self, key: str, data: bytes, content_type: str) -> str:
+        """
+        Stores the file under the given key, replacing an existing file with the same key.
+
+        Args:
+            key (str): The key of the file, e.g. "Fastapi_Contact_App/username".
+            data (bytes): The file content.
+            content_type (str): The MIME type of the file.
+
+        Returns:
+            str: The public URL of the stored file.
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Waits for running uploads and stops the upload thread pool.
+        """
+        self._executor.shutdown(wait=True)
+
+
+class CloudinaryStorage(AbstractStorage):
+    """
+    Stores files in Cloudinary. The Cloudinary client is imported and configured once, when the storage is created, so processes storing avatars locally never import it.
+
+    Args:
+        cloud_name (str): Cloudinary account name.
+        api_key (str): Cloudinary API key.
+        api_secret (str): Cloudinary API secret.
+        upload_workers (int): The number of threads running blocking uploads.
+    """
+
+    def __init__(
+        self, cloud_name: str, api_key: str, api_secret: str, upload_workers: int = 4
+    ) -> None:
+        super().__init__(upload_workers)
+        import cloudinary
+
+        cloudinary.config(
+            cloud_name=cloud_name,
+            api_key=api_key,
+            api_secret=api_secret,
+            secure=True,
+        )
+
+    async def upload(self, key: str, data: bytes, content_type: str) -> str:
+        """
+        Uploads the file to Cloudinary and returns the URL of a 250x250 crop of it.
+
+        Args:
+            key (str): The public ID of the file.
+            data (bytes): The file content.
+            content_type (str): The MIME type of the file.
+
+        Returns:
+            str: The URL of the cropped image, versioned so caches pick up the new file.
+        """
+        import cloudinary.uploader
+
+        r = await self._run(
+            cloudinary.uploader.upload, data, public_id=key, overwrite=True
+        )
+        return cloudinary.CloudinaryImage(key).build_url(
+            width=250, height=250, crop="fill", version=r.get("version")
+        )
+
+
+class LocalStorage(AbstractStorage):
+    """
+    Stores files in a local directory, e.g. for development and tests. The directory is served by the application under `base_url`.
+
+    Args:
+        root (Path): The directory the files are written to.
+        base_url (str): The URL prefix the directory is served under.
+        upload_workers (int): The number of threads writing files.
+    """
+
+    def __init__(self, root: Path, base_url: str, upload_workers: int = 4) -> None:
+        super().__init__(upload_workers)
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        """
+        Resolves a key to a path inside the storage directory.
+
+        Raises:
+            ValueError: If the key points outside the storage directory.
+        """
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root.resolve()):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def _write(self, path: Path, data: bytes) -> None:
+        """
+        Writes the file atomically, readers never see a partially written file. Every write has its own temporary file, so concurrent uploads of the same key do not collide, the last one wins.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False
+        )
+        try:
+            with temporary:
+                # temporary files are private, the stored files are readable like before
+                os.fchmod(temporary.fileno(), 0o644)
+                temporary.write(data)
+            os.replace(temporary.name, path)
+        except BaseException:
+            os.unlink(temporary.name)
+            raise
+
+    async def upload(self, key: str, data: bytes, content_type: str) -> str:
+        """
+        Writes the file to the storage directory.
+
+        Args:
+            key (str): The relative path of the file.
+            data (bytes): The file content.
+            content_type (str): The MIME type of the file.
+
+        Returns:
+            str: The URL the file is served under.
+        """
+        await self._run(self._write, self._path(key), data)
+        return self.url(key)
+
+    def exists(self, key: str) -> bool:
+        """
+        Checks whether a file is stored under the given key.
+
+        Args:
+            key (str): The relative path of the file.
+
+        Returns:
+            bool: True if the file exists.
+        """
+        return self._path(key).is_file()
+
+    def url(self, key: str) -> str:
+        """
+        Returns the URL a stored file is served under.
+
+        Args:
+            key (str): The relative path of the file.
+
+        Returns:
+            str: The URL of the file.
+        """
+        return f"{self.base_url}/{key}"
+
+
+def create_storage(settings: Settings) -> AbstractStorage:
+    """
+    Creates the storage backend selected by `settings.avatar_storage`.
+
+    Args:
+        settings (Settings): The application settings.
+
+    Returns:
+        AbstractStorage: The configured storage.
+
+    Raises:
+        ValueError: If the storage backend is unknown.
+    """
+    if settings.avatar_storage == "cloudinary":
+        return CloudinaryStorage(
+            settings.cloudinary_name,
+            settings.cloudinary_api_key,
+            settings.cloudinary_api_secret,
+            settings.avatar_upload_workers,
+        )
+    if settings.avatar_storage == "local":
+        return LocalStorage(
+            Path(settings.avatar_local_dir),
+            settings.avatar_local_url,
+            settings.avatar_upload_workers,
+        )
+    raise ValueError(f"Unknown avatar storage: {settings.avatar_storage}")
+
+
+def get_storage(request: Request) -> AbstractStorage:
+    """
+    Returns the storage created at application startup.
+
+    Args:
+        request (Request): The current request.
+
+    Returns:
+        AbstractStorage: The application's storage.
+    """
+    return request.app.state.storage
@@ -0,0 +1,233 @@
+"""
+OpenTelemetry tracing of the application.
+
+The application code only uses the OpenTelemetry API: spans are created by `TracingMiddleware` for every HTTP request, by `trace_methods` for the repository methods, by `trace_engine` for every SQL statement and explicitly around the Redis calls, the JWT decoding and the email delivery. Until `configure_tracing` installs a tracer provider all spans are no-ops, so tracing costs nothing when `TRACING_EXPORTER` is not set.
+
+The spans are exported either to an OTLP/HTTP collector (`TRACING_EXPORTER=otlp`, requires `poetry install -E tracing`) or appended as JSON lines to a local file (`TRACING_EXPORTER=file`), e.g. for tests and local debugging.
+"""
+
+import functools
+import inspect
+import json
+from contextlib import contextmanager
+from pathlib import Path
+
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SimpleSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.conf.config import Settings
+
+tracer = trace.get_tracer("contacts-app")
+
+
+class FileSpanExporter(SpanExporter):
+    """
+    Appends every finished span as one JSON object per line to a file.
+
+    Args:
+        path (Path): The file the spans are appended to.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("a", encoding="utf-8")
+
+    def export(self, spans) -> SpanExportResult:
+        for span in spans:
+            self._file.write(json.dumps(json.loads(span.to_json())) + "\n")
+        self._file.flush()
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        self._file.close()
+
+
+def configure_tracing(settings: Settings) -> TracerProvider | None:
+    """
+    Installs the global tracer provider with the exporter selected by `settings.tracing_exporter`.
+
+    Args:
+        settings (Settings): The application settings.
+
+    Returns:
+        TracerProvider | None: The installed provider, which must be shut down to flush the remaining spans, or None if tracing is disabled.
+
+    Raises:
+        ValueError: If the exporter is unknown.
+    """
+    if not settings.tracing_exporter:
+        return None
+    provider = TracerProvider(
+        resource=Resource.create({SERVICE_NAME: settings.tracing_service_name})
+    )
+    if settings.tracing_exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+
+        provider.add_span_processor(
+            BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.tracing_endpoint))
+        )
+    elif settings.tracing_exporter == "file":
+        # spans are written when they end, the file is complete as soon as a request is
+        provider.add_span_processor(
+            SimpleSpanProcessor(FileSpanExporter(Path(settings.tracing_file)))
+        )
+    else:
+        raise ValueError(f"Unknown tracing exporter: {settings.tracing_exporter}")
+    trace.set_tracer_provider(provider)
+    return provider
+
+
+def traced(name: str):
+    """
+    Wraps a coroutine function in a span.
+
+    Args:
+        name (str): The name of the span.
+
+    Returns:
+        Callable: The decorator.
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(name):
+                return await function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_methods(cls):
+    """
+    Wraps every public coroutine method defined on the class in a span named "<class>.<method>".
+
+    Args:
+        cls (type): The class to instrument, e.g. a repository.
+
+    Returns:
+        type: The same class.
+    """
+    for name, member in list(vars(cls).items()):
+        if not name.startswith("_") and inspect.iscoroutinefunction(member):
+            setattr(cls, name, traced(f"{cls.__name__}.{name}")(member))
+    return cls
+
+
+@contextmanager
+def redis_span(command: str):
+    """
+    Creates a client span around one Redis command.
+
+    Args:
+        command (str): The Redis command, e.g. "GET".
+    """
+    with tracer.start_as_current_span(
+        f"redis {command}",
+        kind=SpanKind.CLIENT,
+        attributes={"db.system": "redis", "db.operation": command},
+    ) as span:
+        yield span
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    span = tracer.start_span(
+        statement.split(maxsplit=1)[0].upper() if statement else "SQL",
+        kind=SpanKind.CLIENT,
+        attributes={
+            "db.system": conn.engine.dialect.name,
+            "db.statement": statement,
+        },
+    )
+    conn.info.setdefault("query_spans", []).append(span)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    spans = conn.info.get("query_spans")
+    if spans:
+        spans.pop().end()
+
+
+def _handle_error(context):
+    connection = context.connection
+    if connection is None or connection.invalidated:
+        return
+    spans = connection.info.get("query_spans")
+    if spans:
+        span = spans.pop()
+        span.record_exception(context.original_exception)
+        span.set_status(Status(StatusCode.ERROR))
+        span.end()
+
+
+def trace_engine(engine: Engine) -> Engine:
+    """
+    Creates a span for every statement executed by the engine, a child of the span of the current request or method.
+
+    Args:
+        engine (Engine): The engine to instrument.
+
+    Returns:
+        Engine: The same engine.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    return engine
+
+
+class TracingMiddleware:
+    """
+    Creates a server span for every HTTP request, continuing the trace of the caller if the request carries a `traceparent` header. The span is named after the route template (e.g. "GET /api/contacts/{contact_id}").
+
+    Args:
+        app (ASGIApp): The wrapped application.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        carrier = {
+            name.decode("latin-1"): value.decode("latin-1")
+            for name, value in scope["headers"]
+        }
+        method = scope["method"]
+        with tracer.start_as_current_span(
+            f"{method} {scope['path']}",
+            context=propagate.extract(carrier),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        ) as span:
+
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    span.update_name(f"{method} {route.path}")
+                    span.set_attribute("http.route", route.path)
@@ -0,0 +1,134 @@
+"""
+Size and type limits of uploaded files.
+
+`UploadSizeLimitMiddleware` counts the request body while it is received and aborts oversized uploads with 413 before they are spooled to disk. `read_upload` reads an `UploadFile` in chunks with the same limit and checks that the content really is one of the allowed image types.
+"""
+
+from fastapi import HTTPException, UploadFile, status
+
+CHUNK_SIZE = 64 * 1024
+# multipart boundaries and part headers around the file
+MULTIPART_OVERHEAD = 16 * 1024
+
+# magic bytes of the accepted image types
+IMAGE_SIGNATURES = {
+    "image/jpeg": (b"\xff\xd8\xff",),
+    "image/png": (b"\x89PNG\r\n\x1a\n",),
+    "image/gif": (b"GIF87a", b"GIF89a"),
+    "image/webp": (b"RIFF",),
+}
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File is larger than {max_bytes} bytes",
+    )
+
+
+def sniff_image_type(head: bytes) -> str | None:
+    """
+    Detects the image type from the first bytes of a file.
+
+    Args:
+        head (bytes): The first bytes of the file (at least 12).
+
+    Returns:
+        str | None: The MIME type of the image, or None if it is not an accepted image type.
+    """
+    for content_type, signatures in IMAGE_SIGNATURES.items():
+        if head.startswith(signatures):
+            if content_type == "image/webp" and head[8:12] != b"WEBP":
+                continue
+            return content_type
+    return None
+
+
+async def read_upload(file: UploadFile, max_bytes: int) -> tuple[bytes, str]:
+    """
+    Reads an uploaded image in chunks, stopping as soon as it exceeds `max_bytes`.
+
+    Args:
+        file (UploadFile): The uploaded file.
+        max_bytes (int): The maximum file size.
+
+    Returns:
+        tuple[bytes, str]: The file content and its detected MIME type.
+
+    Raises:
+        HTTPException: 413 if the file is too large, 415 if it is not a JPEG, PNG, GIF or WebP image.
+    """
+    chunks = []
+    size = 0
+    while chunk := await file.read(CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_bytes:
+            raise _too_large(max_bytes)
+        chunks.append(chunk)
+    data = b"".join(chunks)
+    content_type = sniff_image_type(data[:12])
+    if content_type is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Only JPEG, PNG, GIF and WebP images are accepted",
+        )
+    return data, content_type
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects request bodies larger than `max_bytes` on the given paths while they are being received.
+
+    Requests announcing a larger Content-Length are rejected before the body is read; chunked requests are cut off as soon as the limit is crossed.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+        max_bytes (int): The maximum body size.
+        paths (list[str]): The paths the limit applies to.
+    """
+
+    def __init__(self, app, max_bytes: int, paths: list[str]) -> None:
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        for name, value in scope["headers"]:
+            if (
+                name == b"content-length"
+                and value.isdigit()
+                and int(value) > self.max_bytes
+            ):
+                await self._reject(send)
+                return
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # re-raised by FastAPI's body parsing and turned into a 413 response
+                    raise _too_large(self.max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                "headers": [(b"content-type", b"application/json")],
+            }
+        )
+        await send(
+            {
+                "type": "http.response.body",
+                "body": f'{{"detail":"Request body is larger than {self.max_bytes} bytes"}}'.encode(),
+            }
+        )
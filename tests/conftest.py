@@ -5,6 +5,7 @@ from sqlalchemy.orm import sessionmaker
 
 
 from main import app
+from src.database.instrumentation import instrument_engine
 from src.database.models import Base
 from src.database.dependencies import get_user_repository, get_contact_repository
 from src.repository.users import PostgresUserRepository
@@ -12,8 +13,9 @@ from src.repository.contacts import PostgresContactRepository
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+# instrumented, so the query budgets of the route tests see every statement
+engine = instrument_engine(
+    create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -0,0 +1,79 @@
+"""
+A pytest plugin enforcing per-route query budgets.
+
+Mark a test with the routes it calls and the number of SQL statements a single request to each of them may run::
+
+    @pytest.mark.query_budget("GET /api/contacts", 2)
+    @pytest.mark.query_budget("POST /api/contacts", 3)
+    def test_contacts(client): ...
+
+The plugin reads the per-request DEBUG records of `QueryLogMiddleware`, so the budget covers every statement of the request, including lazy loads and refreshes. A test whose requests exceed a budget fails, listing the offending requests.
+"""
+
+import logging
+
+import pytest
+
+from src.database.instrumentation import logger as query_logger
+
+
+class RequestRecorder(logging.Handler):
+    """
+    Collects the route and the statement count of every request logged by the query log middleware.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(logging.DEBUG)
+        self.requests: list[tuple[str, int]] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if hasattr(record, "queries"):
+            self.requests.append((record.route, record.queries))
+
+
+def over_budget(budgets: dict[str, int], requests: list[tuple[str, int]]) -> list[str]:
+    """
+    Checks the requests of a test against the budgets of their routes.
+
+    Args:
+        budgets (dict[str, int]): The maximum statement count per route, e.g. {"GET /api/contacts": 2}.
+        requests (list[tuple[str, int]]): The route and the statement count of every request.
+
+    Returns:
+        list[str]: A description of every request over its budget.
+    """
+    return [
+        f"{route} ran {queries} queries, the budget is {budgets[route]}"
+        for route, queries in requests
+        if route in budgets and queries > budgets[route]
+    ]
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "query_budget(route, queries): fail if a request to the route runs more SQL statements",
+    )
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    budgets = {}
+    for marker in item.iter_markers("query_budget"):
+        route, queries = marker.args
+        budgets.setdefault(route, queries)
+    if not budgets:
+        return (yield)
+    recorder = RequestRecorder()
+    level = query_logger.level
+    query_logger.addHandler(recorder)
+    query_logger.setLevel(logging.DEBUG)
+    try:
+        result = yield
+    finally:
+        query_logger.removeHandler(recorder)
+        query_logger.setLevel(level)
+    problems = over_budget(budgets, recorder.requests)
+    if problems:
+        pytest.fail("Query budget exceeded:\n" + "\n".join(problems), pytrace=False)
+    return result
@@ -0,0 +1,56 @@
+import socket
+
+from aiosmtpd.controller import Controller
+from fastapi_mail import ConnectionConfig
+
+from src.services import email
+
+
+class SinkHandler:
+    """
+    aiosmtpd handler collecting every received message.
+    """
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+class SMTPSink:
+    """
+    A local SMTP server accepting every message, with the matching mail configuration.
+    """
+
+    def __init__(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        self.handler = SinkHandler()
+        self.controller = Controller(self.handler, hostname="127.0.0.1", port=port)
+        self.config = ConnectionConfig(
+            MAIL_USERNAME="user",
+            MAIL_PASSWORD="password",
+            MAIL_FROM="noreply@example.com",
+            MAIL_PORT=port,
+            MAIL_SERVER="127.0.0.1",
+            MAIL_FROM_NAME="Contacts",
+            MAIL_STARTTLS=False,
+            MAIL_SSL_TLS=False,
+            USE_CREDENTIALS=False,
+            VALIDATE_CERTS=False,
+            TEMPLATE_FOLDER=email.TEMPLATE_FOLDER,
+        )
+
+    @property
+    def messages(self):
+        return self.handler.messages
+
+    def __enter__(self):
+        self.controller.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.controller.stop()
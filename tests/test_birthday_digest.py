@@ -0,0 +1,110 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.database.models import Base, Contact, EmailOutbox, User
+from src.services.birthdays import BIRTHDAY_DIGEST, BirthdayDigest, birthday_dates
+
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture()
+def session():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def add_user(session, name: str, birth_dates: list[date], confirmed=True) -> User:
+    user = User(
+        username=name,
+        email=f"{name}@example.com",
+        password="password",
+        salt="salt",
+        confirmed=confirmed,
+    )
+    session.add(user)
+    session.flush()
+    for i, birth_date in enumerate(birth_dates):
+        session.add(
+            Contact(
+                first_name=f"first_{i}",
+                last_name=f"{name}_last_{i}",
+                email=f"{name}_{i}@example.com",
+                phone=f"+4860000{i:04d}",
+                birth_date=birth_date,
+                user_id=user.id,
+            )
+        )
+    session.commit()
+    return user
+
+
+def test_birthday_dates_wrap_around_new_year():
+    dates = birthday_dates(date(2024, 12, 29), 7)
+    assert dates[1229] == date(2024, 12, 29)
+    assert dates[105] == date(2025, 1, 5)
+    assert 106 not in dates
+
+
+def test_birthday_dates_remind_leap_day_on_february_28():
+    assert birthday_dates(date(2025, 2, 25), 3)[229] == date(2025, 2, 28)
+    assert birthday_dates(date(2024, 2, 25), 7)[229] == date(2024, 2, 29)
+    assert 229 not in birthday_dates(date(2025, 3, 1), 7)
+
+
+def test_digest_enqueues_one_email_per_user(session):
+    add_user(
+        session,
+        "anna",
+        [
+            date(1990, 1, 3),
+            date(1985, 12, 30),
+            date(1970, 6, 1),  # outside the window
+            date(2000, 1, 1),
+        ],
+    )
+    add_user(session, "bob", [date(1999, 1, 2), date(1999, 3, 1)])
+    add_user(session, "carol", [date(1980, 5, 5)])
+    add_user(session, "dave", [date(1980, 1, 1)], confirmed=False)
+
+    # chunks of two rows split anna's birthdays across chunks
+    enqueued = BirthdayDigest(session, session, chunk_size=2).run(date(2024, 12, 29), 7)
+
+    assert enqueued == 2
+    emails = {e.recipient: e for e in session.query(EmailOutbox).all()}
+    assert set(emails) == {"anna@example.com", "bob@example.com"}
+    assert {e.request_type for e in emails.values()} == {BIRTHDAY_DIGEST}
+    anna = emails["anna@example.com"].template_body
+    assert anna["username"] == "anna"
+    assert [(b["date"], b["age"]) for b in anna["birthdays"]] == [
+        ("2024-12-30", 39),
+        ("2025-01-01", 25),
+        ("2025-01-03", 35),
+    ]
+    assert emails["bob@example.com"].template_body["birthdays"] == [
+        {
+            "first_name": "first_0",
+            "last_name": "bob_last_0",
+            "date": "2025-01-02",
+            "age": 26,
+        }
+    ]
+
+
+def test_digest_without_birthdays_enqueues_nothing(session):
+    add_user(session, "anna", [date(1970, 6, 1)])
+    assert BirthdayDigest(session, session).run(date(2024, 12, 29)) == 0
+    assert session.query(EmailOutbox).count() == 0
@@ -0,0 +1,138 @@
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from fastapi_limiter import (
+    FastAPILimiter,
+    default_identifier,
+    http_default_callback,
+)
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src.repository.abstract_repository import AbstractUsersRepository
+from src.services import auth, rate_limit
+from src.services.auth import Auth
+from src.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from src.services.rate_limit import FallbackRateLimiter, LocalRateLimits
+from tests.data_set_for_tests import user_out
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=60)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_lets_one_probe_through_after_the_reset_time():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    time.sleep(0.06)
+
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_breaker_replaces_a_probe_that_never_reports():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    # the probe is cancelled and records neither a success nor a failure
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    time.sleep(0.06)
+
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_local_rate_limits_use_fixed_windows():
+    limits = LocalRateLimits()
+
+    assert limits.check("client", times=2, milliseconds=50) == 0
+    assert limits.check("client", times=2, milliseconds=50) == 0
+    assert 0 < limits.check("client", times=2, milliseconds=50) <= 50
+    assert limits.check("other", times=2, milliseconds=50) == 0
+    time.sleep(0.06)
+    assert limits.check("client", times=2, milliseconds=50) == 0
+
+
+def test_local_rate_limits_drop_expired_windows():
+    limits = LocalRateLimits(max_keys=2)
+    limits.check("a", times=1, milliseconds=1)
+    limits.check("b", times=1, milliseconds=1)
+    time.sleep(0.01)
+
+    limits.check("c", times=1, milliseconds=60000)
+
+    assert set(limits._windows) == {"c"}
+
+
+@pytest.fixture()
+def breaker(monkeypatch):
+    breaker = CircuitBreaker("redis", failure_threshold=1, reset_seconds=60)
+    monkeypatch.setattr(rate_limit, "redis_breaker", breaker)
+    monkeypatch.setattr(auth, "redis_breaker", breaker)
+    return breaker
+
+
+def test_rate_limiter_falls_back_to_local_limits_when_redis_is_down(
+    monkeypatch, breaker
+):
+    redis = MagicMock()
+    redis.evalsha = AsyncMock(side_effect=RedisConnectionError("Connection refused"))
+    monkeypatch.setattr(FastAPILimiter, "redis", redis)
+    monkeypatch.setattr(FastAPILimiter, "lua_sha", "sha")
+    monkeypatch.setattr(FastAPILimiter, "prefix", "test")
+    monkeypatch.setattr(FastAPILimiter, "identifier", default_identifier)
+    monkeypatch.setattr(FastAPILimiter, "http_callback", http_default_callback)
+    monkeypatch.setattr(rate_limit, "local_rate_limits", LocalRateLimits())
+    app = FastAPI()
+
+    @app.get(
+        "/limited", dependencies=[Depends(FallbackRateLimiter(times=2, seconds=60))]
+    )
+    async def limited():
+        return {}
+
+    client = TestClient(app)
+    statuses = [client.get("/limited").status_code for _ in range(3)]
+
+    assert statuses == [200, 200, 429]
+    assert breaker.state == OPEN
+    redis.evalsha.assert_awaited_once()
+
+
+async def test_current_user_is_read_from_the_database_when_redis_is_down(breaker):
+    redis = MagicMock()
+    redis.get.side_effect = RedisConnectionError("Connection refused")
+    auth_service = Auth(redis)
+    user_repository = MagicMock(spec=AbstractUsersRepository)
+    user_repository.get_user_by_email = AsyncMock(return_value=user_out)
+    token = await auth_service.create_access_token({"sub": user_out.email})
+
+    first = await auth_service.get_current_user(token, user_repository)
+    second = await auth_service.get_current_user(token, user_repository)
+
+    assert first == second == user_out
+    assert breaker.state == OPEN
+    redis.get.assert_called_once()
+    redis.set.assert_not_called()
+    assert user_repository.get_user_by_email.await_count == 2
@@ -0,0 +1,286 @@
+import asyncio
+import contextvars
+import runpy
+import time
+
+import pytest
+from fastapi import BackgroundTasks, FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import StaticPool
+
+from src.conf.config import settings
+from src.database.db import create_database_engine
+from src.database.instrumentation import start_query_stats
+from src.services.deadlines import (
+    DeadlineExceeded,
+    DeadlineMiddleware,
+    RequestDeadline,
+    current_deadline,
+    enforce_deadlines,
+    longest_budget,
+    route_budgets,
+)
+
+# counts to 10^9, which takes minutes unless interrupted
+SLOW_QUERY = text(
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1000000000) "
+    "SELECT count(*) FROM c"
+)
+
+
+def timeouts(route: str, reason: str) -> float:
+    value = REGISTRY.get_sample_value(
+        "http_request_timeouts_total", {"route": route, "reason": reason}
+    )
+    return value or 0
+
+
+def create_app(timeout: float, route_timeouts: dict[str, float] | None = None):
+    engine = enforce_deadlines(
+        create_engine(
+            "sqlite://",
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
+    )
+    app = FastAPI()
+    app.add_middleware(
+        DeadlineMiddleware, timeout=timeout, route_timeouts=route_timeouts or {}
+    )
+    return app, engine
+
+
+def test_running_statement_is_interrupted_at_the_deadline():
+    app, engine = create_app(timeout=0.2)
+
+    @app.get("/slow")
+    async def slow():
+        with engine.connect() as connection:
+            return {"count": connection.execute(SLOW_QUERY).scalar()}
+
+    @app.get("/fast")
+    async def fast():
+        with engine.connect() as connection:
+            return {"one": connection.execute(text("SELECT 1")).scalar()}
+
+    before = timeouts("/slow", "deadline")
+    start = time.perf_counter()
+    response = TestClient(app).get("/slow")
+
+    assert response.status_code == 504
+    assert response.headers["Retry-After"] == "1"
+    assert time.perf_counter() - start < 5
+    assert timeouts("/slow", "deadline") == before + 1
+    # the progress handler is removed with the statement
+    assert TestClient(app).get("/fast").json() == {"one": 1}
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT 1")).scalar() == 1
+
+
+def test_statement_is_not_started_after_the_deadline():
+    app, engine = create_app(timeout=0.1)
+    executed = []
+
+    @app.get("/late")
+    def late():
+        time.sleep(0.2)
+        with engine.connect() as connection:
+            executed.append(connection.execute(text("SELECT 1")).scalar())
+        return {}
+
+    response = TestClient(app).get("/late")
+    time.sleep(0.2)
+
+    assert response.status_code == 504
+    assert executed == []
+
+
+def test_refused_statement_is_neither_timed_nor_traced():
+    engine = create_database_engine("sqlite://")
+
+    def run_late():
+        stats = start_query_stats()
+        current_deadline.set(RequestDeadline(time.monotonic() - 1))
+        with engine.connect() as connection:
+            with pytest.raises(DeadlineExceeded):
+                connection.execute(text("SELECT 1"))
+            assert not connection.info.get("query_start_time")
+            assert not connection.info.get("query_spans")
+        return stats
+
+    try:
+        assert contextvars.copy_context().run(run_late).count == 0
+    finally:
+        engine.dispose()
+
+
+def test_route_timeouts_override_the_default_budget():
+    app, _ = create_app(timeout=0.1, route_timeouts={"GET /items/{item_id}": 2})
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        await asyncio.sleep(0.3)
+        return {"id": item_id}
+
+    @app.get("/other")
+    async def other():
+        await asyncio.sleep(0.3)
+        return {}
+
+    client = TestClient(app)
+
+    assert client.get("/items/1").json() == {"id": 1}
+    assert client.get("/other").status_code == 504
+
+
+def test_pool_timeout_returns_503():
+    app, _ = create_app(timeout=5)
+
+    @app.get("/busy")
+    async def busy():
+        raise PoolTimeoutError("QueuePool limit reached")
+
+    response = TestClient(app).get("/busy")
+
+    assert response.status_code == 503
+
+
+def test_request_is_cancelled_when_the_client_disconnects():
+    app, _ = create_app(timeout=5)
+    cancelled = []
+
+    @app.get("/wait")
+    async def wait():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return {}
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/wait",
+        "raw_path": b"/wait",
+        "root_path": "",
+        "scheme": "http",
+        "query_string": b"",
+        "headers": [],
+        "server": ("test", 80),
+        "client": ("test", 1234),
+        "http_version": "1.1",
+        "app": app,
+    }
+    sent = []
+
+    async def receive():
+        await asyncio.sleep(0.1)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = DeadlineMiddleware(app.router, timeout=5, route_timeouts={})
+    before = timeouts("/wait", "disconnect")
+    start = time.perf_counter()
+    asyncio.run(middleware(scope, receive, send))
+
+    assert time.perf_counter() - start < 1
+    assert cancelled == [True]
+    assert sent == []
+    assert timeouts("/wait", "disconnect") == before + 1
+
+
+def test_get_request_is_cancelled_when_the_client_disconnects():
+    app, _ = create_app(timeout=5)
+    cancelled = []
+
+    @app.get("/wait")
+    async def wait():
+        try:
+            await asyncio.sleep(3)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return {}
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/wait",
+        "raw_path": b"/wait",
+        "root_path": "",
+        "scheme": "http",
+        "query_string": b"",
+        "headers": [],
+        "server": ("test", 80),
+        "client": ("test", 1234),
+        "http_version": "1.1",
+        "app": app,
+    }
+    # the route never reads its (empty) body, the disconnect follows it
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.sleep(0.1)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = DeadlineMiddleware(app.router, timeout=5, route_timeouts={})
+    start = time.perf_counter()
+    asyncio.run(middleware(scope, receive, send))
+
+    assert time.perf_counter() - start < 1
+    assert cancelled == [True]
+    assert sent == []
+
+
+def test_background_tasks_run_past_the_deadline():
+    app, engine = create_app(timeout=0.1)
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.3)
+        with engine.connect() as connection:
+            finished.append(connection.execute(text("SELECT 1")).scalar())
+
+    @app.get("/accepted")
+    async def accepted(background_tasks: BackgroundTasks):
+        background_tasks.add_task(work)
+        return {}
+
+    response = TestClient(app).get("/accepted")
+
+    assert response.status_code == 200
+    assert finished == [1]
+
+
+def test_worker_timeout_exceeds_every_request_budget(monkeypatch, tmp_path):
+    # the configuration sets the directory for the process otherwise
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    configured = settings.model_copy(
+        update={
+            "request_timeout_seconds": 20,
+            "route_timeouts": {"GET /api/contacts/": 45},
+            "profiling_enabled": True,
+            "profiling_max_seconds": 30,
+        }
+    )
+    monkeypatch.setattr("src.conf.config.settings", configured)
+
+    budgets = route_budgets(configured)
+    timeout = runpy.run_path("gunicorn.conf.py")["timeout"]
+
+    assert budgets["GET /api/contacts/"] == 45
+    assert budgets["GET /api/profiling/cpu"] == 40
+    assert longest_budget(configured) == 45
+    assert timeout > 45
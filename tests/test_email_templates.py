@@ -0,0 +1,52 @@
+from src.services import email
+
+
+def test_request_types_render_their_template_variant():
+    body = {"username": "testuser", "host": "http://testserver/", "token": "abc"}
+
+    confirmation = email.get_template(email.CONFIRMATION_EMAIL).render(**body)
+    reset = email.get_template(email.RESET_PASSWORD).render(**body)
+
+    assert "http://testserver/api/auth/confirmed_email/abc" in confirmation
+    assert "reset_password" not in confirmation
+    assert "http://testserver/api/auth/reset_password/abc" in reset
+    assert "Hi testuser," in confirmation and "Hi testuser," in reset
+
+
+def test_unknown_request_type_uses_default_template():
+    templates = email.load_templates(email.TEMPLATE_FOLDER)
+
+    assert email.get_template("Newsletter") is templates[email.DEFAULT_TEMPLATE]
+
+
+def test_templates_are_compiled_once():
+    assert email.get_template(email.RESET_PASSWORD) is email.get_template(
+        email.RESET_PASSWORD
+    )
+
+
+def test_template_values_are_escaped():
+    html = email.get_template(email.CONFIRMATION_EMAIL).render(
+        username="<script>alert(1)</script>"
+    )
+
+    assert "<script>" not in html
+    assert "&lt;script&gt;" in html
+
+
+def test_birthday_digest_lists_birthdays():
+    html = email.get_template(email.BIRTHDAY_DIGEST).render(
+        username="testuser",
+        days=7,
+        birthdays=[
+            {
+                "first_name": "Anna",
+                "last_name": "Nowak",
+                "date": "2025-01-02",
+                "age": 30,
+            }
+        ],
+    )
+
+    assert "2025-01-02: Anna Nowak (30)" in html
+    assert "did not sign up" not in html
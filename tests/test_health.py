@@ -0,0 +1,174 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database.models import Base, EmailOutbox
+from src.routes import health
+from src.conf.config import settings
+from src.services.health import (
+    CheckResult,
+    HealthCheck,
+    ReadinessChecks,
+    UnhealthyError,
+    outbox_check,
+)
+from src.services.resources import resources
+
+
+def counting_check(delay: float = 0):
+    calls = []
+
+    async def check():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return "ok"
+
+    return check, calls
+
+
+async def test_results_are_cached_for_the_ttl():
+    check, calls = counting_check()
+    cached = HealthCheck("cached", check, timeout=1, ttl=60)
+    expiring = HealthCheck("expiring", check, timeout=1, ttl=0)
+
+    await cached.run()
+    result = await cached.run()
+    await expiring.run()
+    await expiring.run()
+
+    assert result.healthy and result.detail == "ok"
+    assert len(calls) == 3
+
+
+async def test_concurrent_probes_share_one_check():
+    check, calls = counting_check(delay=0.05)
+    health_check = HealthCheck("shared", check, timeout=1, ttl=60)
+
+    results = await asyncio.gather(*(health_check.run() for _ in range(5)))
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+async def test_slow_and_failing_checks_are_unhealthy():
+    slow, _ = counting_check(delay=1)
+
+    async def failing():
+        raise ConnectionError("Connection refused")
+
+    timed_out = await HealthCheck("slow", slow, timeout=0.01, ttl=60).run()
+    failed = await HealthCheck("failing", failing, timeout=1, ttl=60).run()
+
+    assert not timed_out.healthy and timed_out.detail == "timed out after 0.01 s"
+    assert not failed.healthy and failed.detail == "Connection refused"
+
+
+async def test_outbox_backlog_fails_only_above_the_limit(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/health.db")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as session:
+        session.add_all(
+            EmailOutbox(
+                recipient=f"user{i}@example.com",
+                request_type="Welcome",
+                template_body={},
+            )
+            for i in range(3)
+        )
+        session.commit()
+    monkeypatch.setattr(resources, "session_factory", session_factory)
+
+    assert await outbox_check(None)() == "3 pending emails"
+    assert await outbox_check(3)() == "3 pending emails"
+    with pytest.raises(UnhealthyError, match="more than 2"):
+        await outbox_check(2)()
+    engine.dispose()
+
+
+def test_outbox_check_is_critical_only_with_a_limit():
+    def outbox_critical(max_pending):
+        checks = ReadinessChecks(
+            settings.model_copy(update={"health_outbox_max_pending": max_pending})
+        )
+        (outbox,) = [check for check in checks.checks if check.name == "outbox"]
+        return outbox.critical
+
+    assert not outbox_critical(None)
+    assert outbox_critical(100)
+
+
+class FakeChecks:
+    def __init__(self, **results: CheckResult) -> None:
+        self.results = results
+
+    async def run(self):
+        return self.results
+
+
+def health_client(checks: FakeChecks) -> TestClient:
+    app = FastAPI()
+    app.include_router(health.router)
+    app.dependency_overrides[health.get_readiness_checks] = lambda: checks
+    return TestClient(app)
+
+
+def test_live_does_not_run_the_checks():
+    client = health_client(FakeChecks())
+
+    response = client.get("/health/live")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "alive"}
+
+
+def test_ready_reports_every_check():
+    client = health_client(
+        FakeChecks(
+            database=CheckResult(True, "Pool size: 5", 1.5),
+            redis=CheckResult(True, "PONG", 0.5),
+        )
+    )
+
+    response = client.get("/health/ready")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    assert response.json()["checks"]["redis"] == {
+        "healthy": True,
+        "detail": "PONG",
+        "duration_ms": 0.5,
+        "critical": True,
+    }
+
+
+def test_ready_fails_with_an_unhealthy_dependency():
+    client = health_client(
+        FakeChecks(
+            database=CheckResult(True, "Pool size: 5", 1.5),
+            redis=CheckResult(False, "timed out after 1 s", 1000),
+        )
+    )
+
+    response = client.get("/health/ready")
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "unavailable"
+
+
+def test_ready_is_degraded_with_an_unhealthy_non_critical_dependency():
+    client = health_client(
+        FakeChecks(
+            database=CheckResult(True, "Pool size: 5", 1.5),
+            redis=CheckResult(False, "Connection refused", 0.5, critical=False),
+        )
+    )
+
+    response = client.get("/health/ready")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "degraded"
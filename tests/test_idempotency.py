@@ -0,0 +1,289 @@
+import asyncio
+import time
+from datetime import timedelta
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from main import ORIGINS, app as main_app
+from src.database.models import Base, Contact, User
+from src.repository.contacts import PostgresContactRepository
+from src.schemas import ContactIn
+from src.services import idempotency
+from src.services.auth import auth_service
+from src.services.circuit_breaker import OPEN, CircuitBreaker
+from src.services.idempotency import IdempotencyMiddleware
+from src.services.resources import resources
+from tests.data_set_for_tests import user_out
+
+
+class FakeRedis:
+    """
+    The subset of the asyncio Redis client used by the middleware, with expiring keys.
+    """
+
+    def __init__(self):
+        self.values = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        self.expire()
+        if nx and key in self.values:
+            return None
+        self.values[key] = (value, time.monotonic() + ex)
+        return True
+
+    async def get(self, key):
+        self.expire()
+        value = self.values.get(key)
+        return value[0] if value else None
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+    def expire(self):
+        now = time.monotonic()
+        self.values = {k: v for k, v in self.values.items() if v[1] > now}
+
+
+@pytest.fixture()
+def redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(resources, "async_redis", redis, raising=False)
+    monkeypatch.setattr(
+        idempotency,
+        "redis_breaker",
+        CircuitBreaker("redis", failure_threshold=1, reset_seconds=60),
+    )
+    return redis
+
+
+def create_app():
+    calls = []
+    app = FastAPI()
+    app.add_middleware(
+        IdempotencyMiddleware, paths=["/items"], ttl_seconds=60, lock_seconds=5
+    )
+
+    @app.post("/items", status_code=201)
+    async def create_item(request: Request):
+        body = await request.json()
+        calls.append(body)
+        if body.get("fail"):
+            raise HTTPException(status_code=503, detail="Try again")
+        if body.get("slow"):
+            await asyncio.sleep(0.3)
+        return {"id": len(calls), **body}
+
+    return app, calls
+
+
+def test_retry_replays_the_stored_response(redis):
+    app, calls = create_app()
+    client = TestClient(app)
+    headers = {"Idempotency-Key": "abc", "Authorization": "Bearer one"}
+
+    first = client.post("/items", json={"name": "a"}, headers=headers)
+    retry = client.post("/items", json={"name": "a"}, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert first.json() == retry.json() == {"id": 1, "name": "a"}
+    assert "idempotent-replayed" not in first.headers
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 1
+
+
+def test_keys_are_scoped_by_credentials_and_optional(redis):
+    app, calls = create_app()
+    client = TestClient(app)
+
+    client.post(
+        "/items",
+        json={},
+        headers={"Idempotency-Key": "abc", "Authorization": "Bearer one"},
+    )
+    other_user = client.post(
+        "/items",
+        json={},
+        headers={"Idempotency-Key": "abc", "Authorization": "Bearer two"},
+    )
+    client.post("/items", json={})
+    client.post("/items", json={})
+
+    assert other_user.json()["id"] == 2
+    assert len(calls) == 4
+
+
+def test_keys_follow_the_user_across_refreshed_tokens(redis):
+    app, calls = create_app()
+    client = TestClient(app)
+
+    async def tokens():
+        return [
+            await auth_service.create_access_token({"sub": email}, timedelta(minutes=m))
+            for email, m in [
+                ("a@example.com", 15),
+                ("a@example.com", 30),
+                ("b@example.com", 15),
+            ]
+        ]
+
+    first, refreshed, other_user = asyncio.run(tokens())
+
+    def post(token):
+        return client.post(
+            "/items",
+            json={},
+            headers={"Idempotency-Key": "abc", "Authorization": f"Bearer {token}"},
+        )
+
+    assert post(first).status_code == 201
+    assert post(refreshed).headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in post(other_user).headers
+    assert len(calls) == 2
+
+
+def test_key_reused_with_another_body_is_rejected(redis):
+    app, calls = create_app()
+    client = TestClient(app)
+
+    client.post("/items", json={"name": "a"}, headers={"Idempotency-Key": "abc"})
+    response = client.post(
+        "/items", json={"name": "b"}, headers={"Idempotency-Key": "abc"}
+    )
+
+    assert response.status_code == 422
+    assert len(calls) == 1
+
+
+def test_retry_while_the_first_attempt_runs_gets_409(redis):
+    app, calls = create_app()
+    statuses = []
+
+    async def post(client):
+        response = await client.post(
+            "/items", json={"slow": True}, headers={"Idempotency-Key": "abc"}
+        )
+        statuses.append(response.status_code)
+
+    async def run():
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            first = asyncio.create_task(post(client))
+            await asyncio.sleep(0.1)
+            await post(client)
+            await first
+
+    asyncio.run(run())
+
+    assert statuses == [409, 201]
+    assert len(calls) == 1
+
+
+def test_server_errors_release_the_key(redis):
+    app, calls = create_app()
+    client = TestClient(app)
+
+    failed = client.post(
+        "/items", json={"fail": True}, headers={"Idempotency-Key": "abc"}
+    )
+    retry = client.post(
+        "/items", json={"fail": True}, headers={"Idempotency-Key": "abc"}
+    )
+
+    assert failed.status_code == retry.status_code == 503
+    assert len(calls) == 2
+    assert redis.values == {}
+
+
+def test_requests_are_processed_while_redis_is_down(monkeypatch, redis):
+    async def refuse(*args, **kwargs):
+        raise RedisConnectionError("Connection refused")
+
+    monkeypatch.setattr(redis, "set", refuse)
+    app, calls = create_app()
+    client = TestClient(app)
+
+    responses = [
+        client.post("/items", json={}, headers={"Idempotency-Key": "abc"})
+        for _ in range(2)
+    ]
+
+    assert [response.status_code for response in responses] == [201, 201]
+    assert len(calls) == 2
+    assert idempotency.redis_breaker.state == OPEN
+
+
+@pytest.fixture()
+def repository():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    owner = User(
+        username=user_out.username,
+        email=user_out.email,
+        password=user_out.password,
+        salt=user_out.salt,
+    )
+    session.add(owner)
+    session.commit()
+    try:
+        yield PostgresContactRepository(session), user_out.model_copy(
+            update={"id": owner.id}
+        )
+    finally:
+        session.close()
+
+
+def contact_in(email: str, phone: str) -> ContactIn:
+    return ContactIn(
+        first_name="Ann",
+        last_name="Lee",
+        email=email,
+        phone=phone,
+        birth_date="1990-01-01",
+    )
+
+
+async def test_duplicate_contact_is_a_conflict(repository):
+    repo, user = repository
+    created = await repo.create_contact(
+        contact_in("ann@example.com", "+380501234567"), user
+    )
+
+    with pytest.raises(HTTPException) as email_conflict:
+        await repo.create_contact(contact_in("ann@example.com", "+380501234568"), user)
+    with pytest.raises(HTTPException) as phone_conflict:
+        await repo.update_contact(
+            (
+                await repo.create_contact(
+                    contact_in("bob@example.com", "+380501234569"), user
+                )
+            ).id,
+            contact_in("bob@example.com", "+380501234567"),
+            user,
+        )
+
+    assert email_conflict.value.status_code == phone_conflict.value.status_code == 409
+    assert email_conflict.value.detail == "Contact with this email already exists"
+    assert phone_conflict.value.detail == "Contact with this phone already exists"
+    # only the savepoint was rolled back, the session goes on
+    contacts = repo._session.query(Contact).order_by(Contact.id).all()
+    assert [contact.email for contact in contacts] == [created.email, "bob@example.com"]
+    assert contacts[1].phone == "+380501234569"
+
+
+def test_middleware_responses_carry_cors_headers():
+    response = TestClient(main_app).post(
+        "/api/contacts/",
+        json={},
+        headers={"Origin": ORIGINS[0], "Idempotency-Key": "k" * 300},
+    )
+
+    assert response.status_code == 400
+    assert response.headers["access-control-allow-origin"] == ORIGINS[0]
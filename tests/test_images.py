@@ -0,0 +1,83 @@
+from io import BytesIO
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.services.images import (
+    IMMUTABLE_CACHE_CONTROL,
+    AvatarPipeline,
+    ImmutableStaticFiles,
+    resize_image,
+)
+from src.services.storage import LocalStorage
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def make_png(width: int, height: int, color=(200, 30, 30)) -> bytes:
+    output = BytesIO()
+    Image.new("RGB", (width, height), color).save(output, "PNG")
+    return output.getvalue()
+
+
+@pytest.fixture()
+def pipeline(tmp_path):
+    storage = LocalStorage(tmp_path, "/static/avatars")
+    pipeline = AvatarPipeline(storage, [250, 64], process_workers=1)
+    try:
+        yield pipeline
+    finally:
+        pipeline.close()
+        storage.close()
+
+
+def test_resize_image_crops_to_squares():
+    resized = resize_image(make_png(400, 300), [64, 250])
+
+    for size in (64, 250):
+        with Image.open(BytesIO(resized[size])) as image:
+            assert image.format == "WEBP"
+            assert image.size == (size, size)
+
+
+def test_resize_image_rejects_invalid_images():
+    with pytest.raises(ValueError):
+        resize_image(b"\x89PNG\r\n\x1a\n" + b"\x00" * 100, [64])
+
+
+async def test_pipeline_stores_sizes_content_addressed(pipeline, tmp_path):
+    urls = await pipeline.process(make_png(300, 300))
+
+    assert sorted(urls) == [64, 250]
+    digest = urls[250].split("/")[-2]
+    assert urls[250] == f"/static/avatars/avatars/{digest[:2]}/{digest}/250.webp"
+    assert (tmp_path / "avatars" / digest[:2] / digest / "64.webp").is_file()
+
+
+async def test_pipeline_deduplicates_identical_uploads(pipeline, tmp_path, monkeypatch):
+    data = make_png(300, 300)
+    first = await pipeline.process(data)
+
+    def fail(*args):
+        raise AssertionError("identical upload resized again")
+
+    monkeypatch.setattr(pipeline._executor, "submit", fail)
+    assert await pipeline.process(data) == first
+    assert len(list(tmp_path.rglob("*.webp"))) == 2
+
+    monkeypatch.undo()
+    other = await pipeline.process(make_png(300, 300, color=(0, 0, 255)))
+    assert other[250] != first[250]
+
+
+def test_immutable_static_files_cache_headers(tmp_path):
+    (tmp_path / "avatar.webp").write_bytes(b"avatar")
+    app = FastAPI()
+    app.mount("/static", ImmutableStaticFiles(directory=tmp_path))
+
+    response = TestClient(app).get("/static/avatar.webp")
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert "etag" in response.headers
@@ -0,0 +1,108 @@
+import argparse
+import itertools
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from loadtest import LatencyHistogram, VirtualUser, parse_mix, run_load
+from src.conf.config import settings
+from src.database.dependencies import get_user_repository
+from src.repository.abstract_repository import AbstractUsersRepository
+from src.routes import loadtest
+
+
+def test_histogram_percentiles_are_within_the_bucket_width():
+    histogram = LatencyHistogram()
+    for ms in range(1, 1001):
+        histogram.record(ms / 1000)
+
+    for q in (50, 95, 99):
+        assert q * 10 <= histogram.percentile(q) <= q * 10 * LatencyHistogram.GROWTH
+    assert histogram.percentile(100) == 1000
+    assert sum(count for _, count in histogram.coarse()) == 1000
+
+
+def test_parse_mix():
+    assert parse_mix("list=3, create=1") == {"list": 3, "create": 1}
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_mix("drop=1")
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_mix("list=0")
+
+
+async def test_run_load_counts_errors_and_rate_limited_requests():
+    app = FastAPI()
+    ids = itertools.count(1)
+
+    @app.post("/api/contacts/", status_code=201)
+    async def create():
+        return {"id": next(ids)}
+
+    @app.get("/api/contacts/")
+    async def search(search_name: str | None = None):
+        if search_name:
+            return Response(status_code=429)
+        return []
+
+    @app.get("/api/contacts/{contact_id}")
+    async def read(contact_id: int):
+        return Response(status_code=500)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        stats = await run_load(
+            client,
+            [VirtualUser("user@example.com", "token")],
+            {"create": 1, "list": 1, "search_name": 1, "read": 1},
+            duration=0.2,
+            concurrency=2,
+            report_interval=0,
+            seed=1,
+        )
+
+    assert stats["create"].latency.count > 0 and stats["create"].errors == 0
+    assert stats["list"].statuses == {200: stats["list"].latency.count}
+    assert stats["search_name"].rate_limited == stats["search_name"].latency.count
+    assert stats["search_name"].errors == 0
+    assert stats["read"].errors == stats["read"].latency.count > 0
+
+
+@pytest.fixture()
+def hook_client(monkeypatch):
+    monkeypatch.setattr(settings, "loadtest_hook_token", "secret")
+    user_repo = MagicMock(spec=AbstractUsersRepository)
+    user_repo.get_user_by_email = AsyncMock(return_value=MagicMock(confirmed=False))
+    user_repo.confirm_email = AsyncMock()
+    app = FastAPI()
+    app.include_router(loadtest.router)
+    app.dependency_overrides[get_user_repository] = lambda: user_repo
+    return TestClient(app), user_repo
+
+
+def test_confirm_hook_requires_the_token(hook_client):
+    client, user_repo = hook_client
+
+    response = client.post(
+        "/loadtest/confirm",
+        json={"email": "user@example.com"},
+        headers={"X-Loadtest-Token": "wrong"},
+    )
+
+    assert response.status_code == 403
+    user_repo.confirm_email.assert_not_called()
+
+
+def test_confirm_hook_confirms_the_user(hook_client):
+    client, user_repo = hook_client
+
+    response = client.post(
+        "/loadtest/confirm",
+        json={"email": "user@example.com"},
+        headers={"X-Loadtest-Token": "secret"},
+    )
+
+    assert response.status_code == 200
+    user_repo.confirm_email.assert_awaited_once_with("user@example.com")
@@ -0,0 +1,67 @@
+import asyncio
+from email.mime.text import MIMEText
+
+import pytest
+
+from src.services.mail_transport import SMTPConnectionPool
+from tests.smtp_sink import SMTPSink
+
+
+@pytest.fixture()
+def smtp_sink():
+    with SMTPSink() as sink:
+        yield sink
+
+
+def make_message(recipient: str) -> MIMEText:
+    message = MIMEText("<p>Hello</p>", "html")
+    message["From"] = "Contacts <noreply@example.com>"
+    message["To"] = recipient
+    message["Subject"] = "Test"
+    return message
+
+
+async def test_pool_reuses_connections(smtp_sink):
+    pool = SMTPConnectionPool(smtp_sink.config, size=2)
+    await asyncio.gather(
+        *(pool.send(make_message(f"user{i}@example.com")) for i in range(20))
+    )
+    await pool.close()
+
+    assert len(smtp_sink.messages) == 20
+    assert pool.connections_opened <= 2
+
+
+async def test_pool_replaces_connection_after_message_limit(smtp_sink):
+    pool = SMTPConnectionPool(smtp_sink.config, size=1, max_messages_per_connection=3)
+    for i in range(7):
+        await pool.send(make_message(f"user{i}@example.com"))
+    await pool.close()
+
+    assert len(smtp_sink.messages) == 7
+    assert pool.connections_opened == 3
+
+
+async def test_pool_replaces_idle_connections(smtp_sink):
+    pool = SMTPConnectionPool(smtp_sink.config, max_idle_seconds=0)
+    await pool.send(make_message("first@example.com"))
+    await pool.send(make_message("second@example.com"))
+    await pool.close()
+
+    assert len(smtp_sink.messages) == 2
+    assert pool.connections_opened == 2
+
+
+async def test_pool_reconnects_when_server_dropped_connection(smtp_sink):
+    pool = SMTPConnectionPool(smtp_sink.config, size=1)
+    await pool.send(make_message("first@example.com"))
+    # the server closes the session, the client does not notice until it sends
+    pool._idle[0].smtp.transport.close()
+    await pool.send(make_message("second@example.com"))
+    await pool.close()
+
+    assert [m.rcpt_tos[0] for m in smtp_sink.messages] == [
+        "first@example.com",
+        "second@example.com",
+    ]
+    assert pool.connections_opened == 2
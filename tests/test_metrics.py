@@ -0,0 +1,143 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY, CollectorRegistry
+from prometheus_client.values import MultiProcessValue
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from src.database.instrumentation import TimedQueuePool, instrument_engine
+from src.database.models import Base, EmailOutbox
+from src.routes import metrics
+from src.services.metrics import (
+    UNMATCHED_ROUTE,
+    OutboxDepthCollector,
+    PrometheusMiddleware,
+    metrics_registry,
+)
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    engine = instrument_engine(
+        create_engine(f"sqlite:///{tmp_path}/metrics.db", poolclass=TimedQueuePool)
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def client(engine):
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        with engine.connect() as connection:
+            for _ in range(3):
+                connection.execute(text("SELECT 1"))
+        return {"id": item_id}
+
+    app.include_router(metrics.router)
+    app.add_middleware(PrometheusMiddleware)
+    return TestClient(app)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_request_latency_and_queries_per_route(client):
+    route = "/items/{item_id}"
+    requests_before = sample(
+        "http_request_duration_seconds_count", method="GET", route=route, status="200"
+    )
+    queries_before = sample("db_queries_per_request_sum", route=route)
+    checkouts_before = sample("db_pool_checkout_seconds_count")
+
+    for item_id in (1, 2):
+        assert client.get(f"/items/{item_id}").status_code == 200
+
+    assert (
+        sample(
+            "http_request_duration_seconds_count",
+            method="GET",
+            route=route,
+            status="200",
+        )
+        == requests_before + 2
+    )
+    assert sample("db_queries_per_request_sum", route=route) == queries_before + 6
+    assert sample("db_pool_checkout_seconds_count") >= checkouts_before + 2
+
+
+def test_unknown_paths_share_one_label(client):
+    before = sample(
+        "http_request_duration_seconds_count",
+        method="GET",
+        route=UNMATCHED_ROUTE,
+        status="404",
+    )
+    client.get("/does-not-exist/1")
+    client.get("/does-not-exist/2")
+    assert (
+        sample(
+            "http_request_duration_seconds_count",
+            method="GET",
+            route=UNMATCHED_ROUTE,
+            status="404",
+        )
+        == before + 2
+    )
+
+
+def test_metrics_endpoint(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "http_request_duration_seconds_bucket" in response.text
+
+
+def test_outbox_depth_collector_caches_counts(engine):
+    SessionLocal = sessionmaker(bind=engine)
+    with SessionLocal() as session:
+        for status in ("pending", "pending", "dead", "sent"):
+            session.add(
+                EmailOutbox(
+                    recipient="user@example.com",
+                    request_type="Confirmation email",
+                    template_body={},
+                    status=status,
+                )
+            )
+        session.commit()
+    registry = CollectorRegistry()
+    registry.register(OutboxDepthCollector(SessionLocal, ttl=60))
+
+    assert (
+        registry.get_sample_value("email_outbox_messages", {"status": "pending"}) == 2
+    )
+    assert registry.get_sample_value("email_outbox_messages", {"status": "dead"}) == 1
+
+    with SessionLocal() as session:
+        session.query(EmailOutbox).delete()
+        session.commit()
+    # still cached
+    assert (
+        registry.get_sample_value("email_outbox_messages", {"status": "pending"}) == 2
+    )
+
+
+def test_metrics_registry_merges_the_metrics_of_the_worker_processes(
+    tmp_path, monkeypatch
+):
+    assert metrics_registry.__wrapped__() is REGISTRY
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    for pid, value in ((101, 2), (102, 3)):
+        counter = MultiProcessValue(lambda: pid)(
+            "counter", "jobs_total", "jobs_total", (), (), "Jobs."
+        )
+        counter.inc(value)
+
+    registry = metrics_registry.__wrapped__()
+
+    assert registry.get_sample_value("jobs_total") == 5
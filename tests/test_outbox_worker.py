@@ -0,0 +1,193 @@
+import asyncio
+from datetime import datetime, timedelta
+from email import message_from_bytes
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.database.models import Base, EmailOutbox
+from src.repository.outbox import PostgresOutboxRepository
+from src.services import email
+from src.services.mail_transport import SMTPConnectionPool
+from src.services.resources import resources
+from src.services.outbox import OutboxWorker
+from tests.smtp_sink import SMTPSink
+
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture()
+def smtp_sink(monkeypatch):
+    with SMTPSink() as sink:
+        monkeypatch.setattr(email, "get_config", lambda: sink.config)
+        monkeypatch.setattr(
+            resources, "mail_transport", SMTPConnectionPool(sink.config)
+        )
+        yield sink
+
+
+@pytest.fixture()
+def session():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def html_body(envelope) -> str:
+    message = message_from_bytes(envelope.content)
+    for part in message.walk():
+        if part.get_content_type() == "text/html":
+            return part.get_payload(decode=True).decode()
+
+
+def enqueue(session, recipient: str, request_type: str = "Confirmation email"):
+    message = EmailOutbox(
+        recipient=recipient,
+        request_type=request_type,
+        template_body={"username": "testuser", "host": "http://testserver/"},
+    )
+    session.add(message)
+    session.commit()
+    return message.id
+
+
+def make_worker(sender, **kwargs) -> OutboxWorker:
+    return OutboxWorker(
+        lambda: PostgresOutboxRepository(TestingSessionLocal()), sender, **kwargs
+    )
+
+
+async def test_worker_sends_pending_emails(session, smtp_sink):
+    enqueue(session, "first@example.com")
+    enqueue(session, "second@example.com", "Reset password")
+    worker = make_worker(email.send_email)
+
+    assert await worker.run_once() == 2
+
+    assert sorted(m.rcpt_tos[0] for m in smtp_sink.messages) == [
+        "first@example.com",
+        "second@example.com",
+    ]
+    bodies = "".join(html_body(m) for m in smtp_sink.messages)
+    assert "http://testserver/api/auth/confirmed_email/" in bodies
+    assert "http://testserver/api/auth/reset_password/" in bodies
+    session.expire_all()
+    assert {m.status for m in session.query(EmailOutbox).all()} == {"sent"}
+    assert await worker.run_once() == 0
+
+
+async def test_worker_retries_with_backoff(session):
+    message_id = enqueue(session, "retry@example.com")
+
+    async def failing_sender(recipient, request_type, template_body):
+        raise ConnectionError("SMTP server unavailable")
+
+    worker = make_worker(failing_sender, backoff_seconds=60, max_attempts=3)
+    assert await worker.run_once() == 1
+
+    session.expire_all()
+    message = session.get(EmailOutbox, message_id)
+    assert message.status == "pending"
+    assert message.attempts == 1
+    assert "SMTP server unavailable" in message.last_error
+    assert message.next_attempt_at > datetime.utcnow() + timedelta(seconds=50)
+    # not due yet
+    assert await worker.run_once() == 0
+
+
+async def test_worker_dead_letters_after_max_attempts(session):
+    message_id = enqueue(session, "dead@example.com")
+
+    async def failing_sender(recipient, request_type, template_body):
+        raise ConnectionError("mailbox unavailable")
+
+    worker = make_worker(failing_sender, backoff_seconds=0, max_attempts=2)
+    assert await worker.run_once() == 1
+    assert await worker.run_once() == 1
+    assert await worker.run_once() == 0
+
+    session.expire_all()
+    message = session.get(EmailOutbox, message_id)
+    assert message.status == "dead"
+    assert message.attempts == 2
+
+
+async def test_claimed_emails_are_not_reloaded(session):
+    for i in range(3):
+        enqueue(session, f"user{i}@example.com")
+    selects = []
+
+    def count_selects(conn, cursor, statement, parameters, context, many):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    async def sender(recipient, request_type, template_body):
+        pass
+
+    event.listen(engine, "before_cursor_execute", count_selects)
+    try:
+        assert await make_worker(sender).run_once() == 3
+    finally:
+        event.remove(engine, "before_cursor_execute", count_selects)
+    assert len(selects) == 1
+
+
+async def test_sent_emails_are_deleted_after_the_retention(session):
+    old_sent, recent_sent, old_dead, pending = (
+        enqueue(session, f"{name}@example.com")
+        for name in ("old", "recent", "dead", "pending")
+    )
+    long_ago = datetime.utcnow() - timedelta(days=40)
+    for message_id, status, sent_at in (
+        (old_sent, "sent", long_ago),
+        (recent_sent, "sent", datetime.utcnow()),
+        (old_dead, "dead", None),
+    ):
+        message = session.get(EmailOutbox, message_id)
+        message.status, message.sent_at, message.created_at = status, sent_at, long_ago
+    session.commit()
+
+    assert await make_worker(None, retention_days=30).delete_sent() == 1
+    assert await make_worker(None, retention_days=None).delete_sent() == 0
+
+    session.expire_all()
+    assert {m.id for m in session.query(EmailOutbox).all()} == {
+        recent_sent,
+        old_dead,
+        pending,
+    }
+
+
+async def test_worker_deletes_sent_emails_while_running(session):
+    message_id = enqueue(session, "old@example.com")
+    message = session.get(EmailOutbox, message_id)
+    message.status, message.sent_at = "sent", datetime.utcnow() - timedelta(days=2)
+    session.commit()
+    stop = asyncio.Event()
+    worker = make_worker(None, retention_days=1, poll_seconds=0.01)
+
+    task = asyncio.create_task(worker.run(stop))
+    await asyncio.sleep(0.1)
+    stop.set()
+    await task
+
+    session.expire_all()
+    assert session.query(EmailOutbox).count() == 0
+
+
+def test_retry_delay_is_capped():
+    worker = make_worker(None, backoff_seconds=30, max_backoff_seconds=100)
+    assert worker.retry_delay(0) == 30
+    assert worker.retry_delay(1) == 60
+    assert worker.retry_delay(5) == 100
@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from src.conf.config import settings
+from src.routes import profiling
+from src.schemas import UserOut
+from src.services.auth import auth_service
+from src.services.profiling import (
+    ProfileRequestMiddleware,
+    ProfilerBusy,
+    SamplingProfiler,
+    memory_profile,
+)
+
+ADMIN = "admin@example.com"
+
+
+def busy_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def allocate_buffers() -> list[bytearray]:
+    return [bytearray(64 * 1024) for _ in range(16)]
+
+
+def access_token(email: str) -> str:
+    return jwt.encode(
+        {
+            "sub": email,
+            "scope": "access_token",
+            "exp": datetime.utcnow() + timedelta(minutes=5),
+        },
+        settings.secret_key,
+        algorithm=settings.algorithm,
+    )
+
+
+@pytest.fixture(autouse=True)
+def admin_emails(monkeypatch):
+    monkeypatch.setattr(settings, "profiling_admin_emails", [ADMIN])
+
+
+def test_sampling_profiler_collapses_stacks_of_other_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy")
+    worker.start()
+    try:
+        with SamplingProfiler(interval=0.001) as profiler:
+            time.sleep(0.2)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profiler.samples > 10
+    lines = profiler.collapsed().splitlines()
+    busy = [line for line in lines if line.startswith("busy;")]
+    assert busy and all("busy_loop (" in line for line in busy)
+    assert not any(line.startswith("profiler;") for line in lines)
+    stack, count = busy[0].rsplit(" ", 1)
+    assert int(count) > 0
+
+
+def test_only_one_profile_runs_at_a_time():
+    with SamplingProfiler():
+        with pytest.raises(ProfilerBusy):
+            SamplingProfiler().start()
+    with SamplingProfiler():
+        pass
+
+
+async def test_memory_profile_reports_allocations_of_the_window():
+    buffers = []
+
+    async def allocate():
+        await asyncio.sleep(0.05)
+        buffers.extend(allocate_buffers())
+
+    _, collapsed = await asyncio.gather(allocate(), memory_profile(0.2))
+
+    heaviest = collapsed.splitlines()[0]
+    assert "test_profiling.py" in heaviest
+    assert int(heaviest.rsplit(" ", 1)[1]) >= 16 * 64 * 1024
+
+
+@pytest.fixture()
+def client():
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        time.sleep(0.05)
+        return {"ok": True}
+
+    async def current_user():
+        return UserOut(
+            id=1,
+            username="profiler",
+            email="user@example.com",
+            password="Password1!",
+            salt="salt",
+            created_at=datetime.now(),
+            avatar="avatar",
+        )
+
+    app.include_router(profiling.router)
+    app.add_middleware(ProfileRequestMiddleware)
+    app.dependency_overrides[auth_service.get_current_user] = current_user
+    return TestClient(app)
+
+
+def test_profiling_endpoints_are_admin_only(client):
+    response = client.get("/profiling/cpu", params={"seconds": 0.01})
+
+    assert response.status_code == 403
+
+
+def test_cpu_profile_endpoint(client, monkeypatch):
+    monkeypatch.setattr(settings, "profiling_admin_emails", ["user@example.com"])
+
+    response = client.get("/profiling/cpu", params={"seconds": 0.1})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert " (" in response.text
+
+
+def test_x_profile_returns_the_profile_of_an_admin_request(client):
+    response = client.get(
+        "/slow",
+        headers={"X-Profile": "1", "Authorization": f"Bearer {access_token(ADMIN)}"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["x-profile-status"] == "200"
+    assert "slow (" in response.text
+
+
+def test_x_profile_is_ignored_for_other_users(client):
+    response = client.get(
+        "/slow",
+        headers={
+            "X-Profile": "1",
+            "Authorization": f"Bearer {access_token('user@example.com')}",
+        },
+    )
+
+    assert response.json() == {"ok": True}
+    assert "x-profile-status" not in response.headers
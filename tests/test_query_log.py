@@ -0,0 +1,132 @@
+import contextvars
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+
+from src.database.instrumentation import (
+    QueryLogMiddleware,
+    instrument_engine,
+    normalize_sql,
+    start_query_stats,
+)
+from src.services.metrics import PrometheusMiddleware
+from tests.plugins.query_budget import over_budget
+
+LOGGER = "src.database.instrumentation"
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    engine = instrument_engine(create_engine(f"sqlite:///{tmp_path}/query_log.db"))
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def client(engine):
+    app = FastAPI()
+
+    @app.get("/items/{count}")
+    async def read_items(count: int):
+        with engine.connect() as connection:
+            for item_id in range(count):
+                connection.execute(
+                    text("SELECT id FROM items WHERE id = :id"), {"id": item_id}
+                )
+        return {"count": count}
+
+    app.add_middleware(QueryLogMiddleware, max_queries=10, repeated_queries=5)
+    app.add_middleware(PrometheusMiddleware)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize(
+    "statement, normalized",
+    [
+        (
+            "SELECT users.id \nFROM users \nWHERE users.email = %(email_1)s",
+            "SELECT users.id FROM users WHERE users.email = ?",
+        ),
+        (
+            "SELECT * FROM contacts WHERE id IN (%(id_1_1)s, %(id_1_2)s) LIMIT 10",
+            "SELECT * FROM contacts WHERE id IN (?, ...) LIMIT ?",
+        ),
+        (
+            "UPDATE users SET name = 'O''Brien' WHERE id = 7",
+            "UPDATE users SET name = ? WHERE id = ?",
+        ),
+        (
+            "SELECT contacts_1.id FROM contacts_1",
+            "SELECT contacts_1.id FROM contacts_1",
+        ),
+    ],
+)
+def test_normalize_sql(statement, normalized):
+    assert normalize_sql(statement) == normalized
+
+
+def test_failed_statement_is_timed_and_counted(engine):
+    def insert_twice():
+        stats = start_query_stats()
+        with engine.connect() as connection:
+            insert = text("INSERT INTO items (id) VALUES (1)")
+            connection.execute(insert)
+            with pytest.raises(IntegrityError):
+                connection.execute(insert)
+            assert connection.info["query_start_time"] == []
+        return stats
+
+    stats = contextvars.copy_context().run(insert_twice)
+
+    assert stats.count == 2
+    assert stats.statements["INSERT INTO items (id) VALUES (?)"].count == 2
+
+
+def test_request_within_thresholds_is_not_logged(client, caplog):
+    with caplog.at_level(logging.WARNING, logger=LOGGER):
+        assert client.get("/items/2").status_code == 200
+
+    assert caplog.records == []
+
+
+def test_repeated_statement_is_logged_as_n_plus_one(client, caplog):
+    with caplog.at_level(logging.WARNING, logger=LOGGER):
+        assert client.get("/items/6").status_code == 200
+
+    (record,) = caplog.records
+    assert record.getMessage() == (
+        "GET /items/{count}: possible N+1, 6 times: SELECT id FROM items WHERE id = ?"
+    )
+
+
+def test_too_many_queries_are_logged_and_counted_once(client, caplog):
+    route = "/items/{count}"
+    before = REGISTRY.get_sample_value("db_queries_per_request_sum", {"route": route})
+
+    with caplog.at_level(logging.WARNING, logger=LOGGER):
+        assert client.get("/items/11").status_code == 200
+
+    assert "11 queries" in caplog.records[0].getMessage()
+    after = REGISTRY.get_sample_value("db_queries_per_request_sum", {"route": route})
+    assert after - (before or 0) == 11
+
+
+def test_over_budget():
+    budgets = {"GET /items/{count}": 3}
+    requests = [("GET /items/{count}", 3), ("GET /items/{count}", 4), ("GET /", 9)]
+
+    assert over_budget(budgets, requests) == [
+        "GET /items/{count} ran 4 queries, the budget is 3"
+    ]
+
+
+@pytest.mark.query_budget("GET /items/{count}", 3)
+def test_query_budget_marker(client):
+    assert client.get("/items/3").status_code == 200
@@ -0,0 +1,65 @@
+import subprocess
+import sys
+
+from sqlalchemy import text
+
+from src.conf.config import settings
+from src.services.resources import Resources
+
+
+def make_resources(tmp_path, **update):
+    return Resources(
+        settings.model_copy(
+            update={
+                "sqlalchemy_database_url": f"sqlite:///{tmp_path}/resources.db",
+                **update,
+            }
+        )
+    )
+
+
+def test_importing_the_application_creates_no_client():
+    code = (
+        "import main\n"
+        "from src.services.resources import resources\n"
+        "print(sorted(resources.__dict__.keys() - {'_settings'}))\n"
+    )
+
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_clients_are_created_on_first_use(tmp_path):
+    resources = make_resources(tmp_path)
+
+    assert not resources.created("engine")
+    with resources.session() as session:
+        assert session.execute(text("SELECT 1")).scalar() == 1
+
+    assert resources.created("engine")
+    assert resources.engine is resources.engine
+    assert not resources.created("redis")
+
+
+def test_without_a_replica_the_replica_clients_are_none(tmp_path):
+    resources = make_resources(tmp_path, sqlalchemy_replica_url=None)
+
+    assert resources.replica_session() is None
+    assert resources.recent_writes is None
+
+
+async def test_close_disposes_the_clients_and_allows_recreating_them(tmp_path):
+    resources = make_resources(tmp_path)
+    engine = resources.engine
+    with resources.session() as session:
+        session.execute(text("SELECT 1"))
+
+    await resources.close()
+
+    assert not resources.created("engine")
+    assert engine.pool.checkedin() == 0
+    assert resources.engine is not engine
+    await resources.close()
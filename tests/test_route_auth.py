@@ -3,19 +3,25 @@ from unittest.mock import MagicMock, patch
 from fastapi.security import HTTPAuthorizationCredentials
 
 from src.services.auth import auth_service
-from src.database.models import User
+from src.database.models import User, EmailOutbox
 
 
-async def test_signup_success(client, user, monkeypatch):
+@pytest.mark.query_budget("POST /api/auth/signup", 5)
+async def test_signup_success(client, session, user):
     with patch.object(auth_service, "redis_base") as mock_redis:
         mock_redis.get.return_value = None
-        mock_send_email = MagicMock()
-        monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
         response = client.post("/api/auth/signup", json=user)
         assert response.status_code == 201, response.text
         data = response.json()
         assert data["user"]["email"] == user.get("email")
         assert data["detail"] == "User successfully created"
+        outbox_email = (
+            session.query(EmailOutbox)
+            .filter(EmailOutbox.recipient == user.get("email"))
+            .one()
+        )
+        assert outbox_email.request_type == "Confirmation email"
+        assert outbox_email.status == "pending"
 
 
 async def test_signup_failure_user_already_exists(client, user):
@@ -37,6 +43,7 @@ async def test_login_user_not_confirmed(client, user):
     assert data["detail"] == "Email not confirmed"
 
 
+@pytest.mark.query_budget("POST /api/auth/login", 3)
 async def test_login_success(client, session, user):
     current_user: User = (
         session.query(User).filter(User.email == user.get("email")).first()
@@ -0,0 +1,42 @@
+import os
+import statistics
+
+import pytest
+
+from benchmarks.startup import (
+    COLD_START_BUDGET_SECONDS,
+    LAZY_MODULES,
+    measure,
+    parse_importtime,
+)
+
+
+@pytest.fixture(scope="module")
+def reports():
+    return measure("main", runs=3)
+
+
+def test_parse_importtime():
+    output = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   _io\n"
+        "import time:      2500 |       2620 | main\n"
+    )
+
+    assert parse_importtime(output) == {"_io": (120, 120), "main": (2500, 2620)}
+
+
+def test_importing_the_application_does_not_import_the_lazy_dependencies(reports):
+    for report in reports:
+        assert [name for name in LAZY_MODULES if name in report] == []
+
+
+def test_importing_the_application_stays_within_the_cold_start_budget(reports):
+    # slower machines may raise the budget, e.g. a shared CI runner
+    budget = float(
+        os.environ.get("COLD_START_BUDGET_SECONDS", COLD_START_BUDGET_SECONDS)
+    )
+
+    seconds = statistics.median(report["main"][1] for report in reports) / 1e6
+
+    assert seconds <= budget
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+import cloudinary.uploader
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from src.services.storage import CloudinaryStorage, LocalStorage
+from src.services.uploads import UploadSizeLimitMiddleware, read_upload
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+MAX_BYTES = 1024
+
+
+@pytest.fixture()
+def client():
+    app = FastAPI()
+    app.add_middleware(
+        UploadSizeLimitMiddleware, max_bytes=MAX_BYTES * 4, paths=["/avatar"]
+    )
+
+    @app.post("/avatar")
+    async def upload_avatar(file: UploadFile = File()):
+        data, content_type = await read_upload(file, MAX_BYTES)
+        return {"size": len(data), "content_type": content_type}
+
+    return TestClient(app)
+
+
+def test_read_upload_detects_image_type(client):
+    response = client.post("/avatar", files={"file": ("a.png", PNG, "image/jpeg")})
+    assert response.status_code == 200
+    assert response.json() == {"size": len(PNG), "content_type": "image/png"}
+
+
+def test_read_upload_rejects_other_types(client):
+    response = client.post(
+        "/avatar", files={"file": ("a.png", b"<svg></svg>", "image/png")}
+    )
+    assert response.status_code == 415
+
+
+def test_read_upload_rejects_large_files(client):
+    response = client.post(
+        "/avatar", files={"file": ("a.png", PNG + b"\x00" * MAX_BYTES, "image/png")}
+    )
+    assert response.status_code == 413
+
+
+def test_middleware_rejects_large_bodies_by_content_length(client):
+    response = client.post(
+        "/avatar", files={"file": ("a.png", PNG + b"\x00" * MAX_BYTES * 4, "image/png")}
+    )
+    assert response.status_code == 413
+    assert "Request body is larger" in response.json()["detail"]
+
+
+def test_middleware_cuts_off_streamed_bodies(client):
+    def body():
+        for _ in range(10):
+            yield b"\x00" * MAX_BYTES
+
+    response = client.post(
+        "/avatar",
+        content=body(),
+        headers={"content-type": "multipart/form-data; boundary=x"},
+    )
+    assert response.status_code == 413
+
+
+async def test_local_storage_writes_file(tmp_path):
+    storage = LocalStorage(tmp_path, "/static/avatars/")
+    url = await storage.upload("Fastapi_Contact_App/testuser", PNG, "image/png")
+    storage.close()
+
+    assert url == "/static/avatars/Fastapi_Contact_App/testuser"
+    assert (tmp_path / "Fastapi_Contact_App" / "testuser").read_bytes() == PNG
+
+
+async def test_local_storage_concurrent_uploads_of_one_key(tmp_path):
+    storage = LocalStorage(tmp_path, "/static/avatars/", upload_workers=8)
+    payloads = [bytes([i]) * 1_000_000 for i in range(32)]
+    await asyncio.gather(
+        *(storage.upload("user/avatar", data, "image/png") for data in payloads)
+    )
+    storage.close()
+
+    assert (tmp_path / "user" / "avatar").read_bytes() in payloads
+    assert [path.name for path in (tmp_path / "user").iterdir()] == ["avatar"]
+
+
+async def test_local_storage_rejects_keys_outside_root(tmp_path):
+    storage = LocalStorage(tmp_path / "avatars", "/static/avatars")
+    with pytest.raises(ValueError):
+        await storage.upload("../outside", PNG, "image/png")
+    storage.close()
+
+
+async def test_cloudinary_upload_runs_off_the_event_loop(monkeypatch):
+    calls = []
+
+    def upload(data, **kwargs):
+        calls.append((threading.current_thread(), data, kwargs))
+        return {"version": 7}
+
+    monkeypatch.setattr(cloudinary.uploader, "upload", upload)
+    storage = CloudinaryStorage("cloud", "key", "secret", upload_workers=1)
+    url = await storage.upload("Fastapi_Contact_App/testuser", PNG, "image/png")
+    storage.close()
+
+    ((thread, data, kwargs),) = calls
+    assert thread is not threading.main_thread()
+    assert thread.name.startswith("storage")
+    assert data == PNG
+    assert kwargs == {"public_id": "Fastapi_Contact_App/testuser", "overwrite": True}
+    assert "v7/Fastapi_Contact_App/testuser" in url
+    assert "c_fill,h_250,w_250" in url
@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import StatusCode
+from sqlalchemy import create_engine, text
+
+from src.conf.config import settings
+from src.services.tracing import (
+    FileSpanExporter,
+    TracingMiddleware,
+    configure_tracing,
+    trace_engine,
+    trace_methods,
+)
+
+exporter = InMemorySpanExporter()
+provider = TracerProvider()
+provider.add_span_processor(SimpleSpanProcessor(exporter))
+trace.set_tracer_provider(provider)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+@pytest.fixture(autouse=True)
+def spans():
+    exporter.clear()
+    yield exporter
+
+
+@trace_methods
+class Repository:
+    async def get_item(self, item_id: int) -> dict:
+        return {"id": item_id}
+
+    async def delete_item(self, item_id: int) -> None:
+        raise LookupError(item_id)
+
+    async def _private(self) -> None:
+        pass
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    engine = trace_engine(create_engine(f"sqlite:///{tmp_path}/tracing.db"))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def client(engine):
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return await Repository().get_item(item_id)
+
+    app.add_middleware(TracingMiddleware)
+    return TestClient(app)
+
+
+def finished(spans):
+    return {span.name: span for span in spans.get_finished_spans()}
+
+
+def test_request_span_continues_trace_and_nests_children(client, spans):
+    response = client.get(
+        "/items/1",
+        headers={"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-01"},
+    )
+
+    assert response.status_code == 200
+    by_name = finished(spans)
+    request = by_name["GET /items/{item_id}"]
+    assert format(request.context.trace_id, "032x") == TRACE_ID
+    assert request.attributes["http.route"] == "/items/{item_id}"
+    assert request.attributes["http.response.status_code"] == 200
+    assert by_name["SELECT"].parent.span_id == request.context.span_id
+    assert by_name["SELECT"].attributes["db.statement"] == "SELECT 1"
+    assert by_name["Repository.get_item"].parent.span_id == request.context.span_id
+
+
+def test_trace_methods_records_errors_and_skips_private_methods(spans):
+    repository = Repository()
+    with pytest.raises(LookupError):
+        asyncio.run(repository.delete_item(1))
+    asyncio.run(repository._private())
+
+    by_name = finished(spans)
+    assert set(by_name) == {"Repository.delete_item"}
+    assert by_name["Repository.delete_item"].status.status_code == StatusCode.ERROR
+
+
+def test_failed_statement_ends_its_span(engine, spans):
+    with engine.connect() as connection:
+        with pytest.raises(Exception):
+            connection.execute(text("SELECT * FROM missing"))
+        assert not connection.info.get("query_spans")
+
+    (span,) = spans.get_finished_spans()
+    assert span.status.status_code == StatusCode.ERROR
+
+
+def test_file_exporter_writes_json_lines(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    file_provider = TracerProvider()
+    file_provider.add_span_processor(SimpleSpanProcessor(FileSpanExporter(path)))
+
+    with file_provider.get_tracer("test").start_as_current_span("parent"):
+        with file_provider.get_tracer("test").start_as_current_span("child"):
+            pass
+    file_provider.shutdown()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["child", "parent"]
+    assert lines[0]["parent_id"] == lines[1]["context"]["span_id"]
+
+
+def test_configure_tracing_is_disabled_by_default():
+    assert (
+        configure_tracing(settings.model_copy(update={"tracing_exporter": None}))
+        is None
+    )
+    with pytest.raises(ValueError):
+        configure_tracing(settings.model_copy(update={"tracing_exporter": "zipkin"}))
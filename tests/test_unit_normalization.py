@@ -0,0 +1,65 @@
+import unittest
+
+from pydantic import ValidationError
+from pydantic_core import PydanticCustomError
+
+from src.schemas import ContactIn
+from src.services.normalization import (
+    normalize_phone,
+    normalize_email,
+    clear_normalizer_caches,
+    _parse_phone,
+)
+from tests.data_set_for_tests import _first_name, _last_name, _birth_date
+
+
+class TestNormalization(unittest.TestCase):
+
+    def setUp(self):
+        clear_normalizer_caches()
+
+    def test_normalize_phone_e164(self):
+        self.assertEqual("+48654789654", normalize_phone("654789654"))
+        self.assertEqual("+48654789654", normalize_phone("+48 654-789-654"))
+        self.assertEqual("+48654789654", normalize_phone("(+48) 654.789.654"))
+
+    def test_normalize_phone_is_cached(self):
+        normalize_phone("+48 654 789 654")
+        normalize_phone("+48654789654")
+        info = _parse_phone.cache_info()
+        self.assertEqual(1, info.misses)
+        self.assertEqual(1, info.hits)
+
+    def test_normalize_phone_invalid(self):
+        with self.assertRaises(PydanticCustomError):
+            normalize_phone("123")
+
+    def test_normalize_email(self):
+        self.assertEqual("John@example.com", normalize_email("John@EXAMPLE.com"))
+        with self.assertRaises(PydanticCustomError):
+            normalize_email("not an email")
+
+    def test_contact_in_uses_normalizers(self):
+        contact = ContactIn(
+            first_name=_first_name,
+            last_name=_last_name,
+            email="contact@EXAMPLE.com",
+            phone="654 789 654",
+            birth_date=_birth_date,
+        )
+        self.assertEqual("contact@example.com", contact.email)
+        self.assertEqual("+48654789654", contact.phone)
+
+    def test_contact_in_invalid_phone(self):
+        with self.assertRaises(ValidationError):
+            ContactIn(
+                first_name=_first_name,
+                last_name=_last_name,
+                email="contact@example.com",
+                phone="123",
+                birth_date=_birth_date,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
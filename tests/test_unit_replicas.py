@@ -0,0 +1,97 @@
+import unittest
+from unittest.mock import MagicMock
+
+from redis.exceptions import RedisError
+from sqlalchemy.orm import Session
+
+from src.database.replicas import RecentWrites
+from src.repository.contacts import PostgresContactRepository
+from src.repository.users import PostgresUserRepository
+from src.services.circuit_breaker import CircuitBreaker
+from tests.data_set_for_tests import user_out, user, contact, contact_in
+
+
+def mock_refresh(contact_to_refresh):
+    contact_to_refresh.id = 1
+
+
+class TestRecentWrites(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = MagicMock()
+        self.recent_writes = RecentWrites(self.redis, 5)
+
+    def test_mark(self):
+        self.recent_writes.mark(user_out.email)
+        self.redis.set.assert_called_once_with(
+            f"recent_write:{user_out.email}", 1, ex=5
+        )
+
+    def test_is_recent(self):
+        self.redis.exists.return_value = 0
+        self.assertFalse(self.recent_writes.is_recent(user_out.email))
+        self.redis.exists.return_value = 1
+        self.assertTrue(self.recent_writes.is_recent(user_out.email))
+
+    def test_is_recent_redis_error_uses_primary(self):
+        self.redis.exists.side_effect = RedisError
+        self.assertTrue(self.recent_writes.is_recent(user_out.email))
+
+    def test_open_breaker_skips_redis_and_uses_primary(self):
+        breaker = CircuitBreaker("redis", failure_threshold=1, reset_seconds=60)
+        recent_writes = RecentWrites(self.redis, 5, breaker)
+        self.redis.exists.side_effect = RedisError
+        self.assertTrue(recent_writes.is_recent(user_out.email))
+        self.assertTrue(recent_writes.is_recent(user_out.email))
+        recent_writes.mark(user_out.email)
+        self.redis.exists.assert_called_once()
+        self.redis.set.assert_not_called()
+
+
+class TestReplicaRouting(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.session = MagicMock(spec=Session)
+        self.session.refresh = mock_refresh
+        self.read_session = MagicMock(spec=Session)
+        self.recent_writes = MagicMock(spec=RecentWrites)
+        self.recent_writes.is_recent.return_value = False
+        self.contacts_repository = PostgresContactRepository(
+            self.session, self.read_session, self.recent_writes
+        )
+        self.users_repository = PostgresUserRepository(
+            self.session, self.read_session, self.recent_writes
+        )
+
+    async def test_get_contact_reads_from_replica(self):
+        self.read_session.query().filter().first.return_value = contact
+        await self.contacts_repository.get_contact(contact.id, user_out)
+        self.session.query.assert_not_called()
+
+    async def test_get_contacts_after_write_reads_from_primary(self):
+        self.recent_writes.is_recent.return_value = True
+        self.session.query().filter().order_by().all.return_value = [contact]
+        await self.contacts_repository.get_contacts(None, None, None, user_out)
+        self.read_session.query.assert_not_called()
+
+    async def test_create_contact_marks_write(self):
+        await self.contacts_repository.create_contact(contact_in, user_out)
+        self.recent_writes.mark.assert_called_once_with(user_out.email)
+
+    async def test_get_user_by_email_reads_from_replica(self):
+        self.read_session.query().filter().first.return_value = user
+        actual_user = await self.users_repository.get_user_by_email(user.email)
+        self.assertEqual(user, actual_user)
+        self.session.query.assert_not_called()
+
+    async def test_update_token_writes_to_primary(self):
+        primary_user = MagicMock()
+        self.session.query().filter().first.return_value = primary_user
+        await self.users_repository.update_token(user, "token")
+        self.assertEqual("token", primary_user.refresh_token)
+        self.session.commit.assert_called_once()
+        self.recent_writes.mark.assert_called_once_with(primary_user.email)
+
+
+if __name__ == "__main__":
+    unittest.main()
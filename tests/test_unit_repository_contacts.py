@@ -3,6 +3,7 @@ from unittest.mock import MagicMock, patch
 from datetime import datetime, date
 
 from fastapi import HTTPException, status
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import Session
 
 from src.repository.contacts import PostgresContactRepository
@@ -32,7 +33,7 @@ class TestPostgresContactRepository(unittest.IsolatedAsyncioTestCase):
     async def test_get_contacts_success(self):
         contacts_to_query = [contact, contact_2]
         contacts_out = [contact_out, contact_out_2]
-        self.session.query().filter().all.return_value = contacts_to_query
+        self.session.query().filter().order_by().all.return_value = contacts_to_query
         for test_case in get_contacts_success_test_cases:
             actual_contacts = await self.users_repository.get_contacts(
                 search_name=test_case["search_name"],
@@ -53,6 +54,56 @@ class TestPostgresContactRepository(unittest.IsolatedAsyncioTestCase):
                 )
             self.assertEqual(context.exception.status_code, status.HTTP_400_BAD_REQUEST)
 
+    async def test_get_contacts_search_phone_success(self):
+        self.session.query().filter().order_by().all.return_value = [contact]
+        actual_contacts = await self.users_repository.get_contacts(
+            search_name=None,
+            search_email=None,
+            upcoming_birthdays=None,
+            user=user_out,
+            search_phone="654 789 654",
+        )
+        self.assertEqual([contact_out], actual_contacts)
+
+    async def test_get_contacts_search_phone_invalid(self):
+        with self.assertRaises(HTTPException) as context:
+            await self.users_repository.get_contacts(
+                search_name=None,
+                search_email=None,
+                upcoming_birthdays=None,
+                user=user_out,
+                search_phone="123",
+            )
+        self.assertEqual(context.exception.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_get_contacts_info_filters(self):
+        self.session.query().filter().order_by().all.return_value = [contact]
+        actual_contacts = await self.users_repository.get_contacts(
+            search_name=None,
+            search_email=None,
+            upcoming_birthdays=None,
+            user=user_out,
+            info_filters={"company": "GoIT"},
+        )
+        self.assertEqual([contact_out], actual_contacts)
+        condition = self.session.query().filter.call_args.args[0]
+        sql = str(condition.compile(dialect=postgresql.dialect()))
+        self.assertIn("contacts.additional_info @>", sql)
+
+    async def test_get_contacts_upcoming_birthdays_filters_in_sql(self):
+        self.session.query().filter().order_by().all.return_value = [contact]
+        actual_contacts = await self.users_repository.get_contacts(
+            search_name=None,
+            search_email=None,
+            upcoming_birthdays=True,
+            user=user_out,
+        )
+        self.assertEqual([contact_out], actual_contacts)
+        condition = self.session.query().filter.call_args.args[0]
+        sql = str(condition.compile(dialect=postgresql.dialect()))
+        self.assertIn("EXTRACT(month FROM contacts.birth_date)", sql)
+        self.assertIn("IN (__[POSTCOMPILE_", sql)
+
     async def test_get_contact_success(self):
         self.session.query().filter().first.return_value = contact
         actual_contact = await self.users_repository.get_contact(